@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+
+###############################################################################
+# Checks the simulators against the closed-form answers of analytic.py.
+#
+# Every model here is a Jackson network, so a long enough run of any correct
+# simulator has to come close to the analytic mean wait. Each model is run
+# for DURATION on each of its engines and the simulated average wait (total
+# queuing per entity) is compared with the solver's. A relative error over
+# TOLERANCE is flagged; rerun with another SEED before suspecting the
+# simulator, as the runs are random.
+#
+# - nurse: nurse-example.py's single nurse (arrivals and consultations at
+#   the nurse-example-oo defaults, since nurse-example.py's own 5 and 6
+#   minutes overload the nurse), on the Lindley engine and network.py.
+# - registration: nurse-with-registration-example.py's two stations in
+#   series, on the tandem engine and network.py.
+# - route-to-doctor: route-to-doctor.py's clinic, on SimPy and network.py.
+# - feedback: two nurses who send a fifth of their patients back to the
+#   queue, a route only network.py can run.
+###############################################################################
+
+import importlib.util
+from pathlib import Path
+
+import numpy as np
+
+from queueing_sims import lindley, tandem
+from queueing_sims.analytic import solve
+from queueing_sims.distributions import Exponential, RandomStreams
+from queueing_sims.network import Network, Station
+
+DURATION = 2_000_000 # Minutes of simulated time per run.
+SEED = 42
+TOLERANCE = 0.05
+
+NURSE_ARRIVAL_TIME = 7
+NURSE_CONSULT_TIME = 6
+
+def load_script(*parts):
+  """Imports a hyphenated script relative to queueing_sims."""
+  path = Path(__file__).parent.joinpath(*parts)
+  spec = importlib.util.spec_from_file_location(path.stem.replace("-", "_"), path)
+  module = importlib.util.module_from_spec(spec)
+  spec.loader.exec_module(module)
+  return module
+
+def nurse():
+  network = Network([Station("nurse", 1, Exponential(NURSE_CONSULT_TIME))], Exponential(NURSE_ARRIVAL_TIME),
+    routing = [[0]])
+  def run_lindley(rng):
+    inter_arrival_times, consult_times = lindley.exponential_samples(NURSE_ARRIVAL_TIME, NURSE_CONSULT_TIME,
+      DURATION, rng)
+    return lindley.simulate(inter_arrival_times, consult_times, DURATION)["P_TOTAL_WAIT_FOR_NURSE_TIME"].mean()
+  return network, {"lindley": run_lindley}
+
+def registration():
+  model = load_script("linear-examples", "nurse-with-registration-example.py")
+  network = Network([
+    Station(model.STATIONS[0], model.NUM_RECPTIONISTS, Exponential(model.AVG_REGISTRATION_TIME)),
+    Station(model.STATIONS[1], model.NUM_NURSES, Exponential(model.AVG_EVALUATION_TIME))
+  ], Exponential(model.AVG_PATIENT_ARRIVAL_TIME), routing = [[0, 1], [0, 0]])
+  def run_tandem(rng):
+    inter_arrival_times, registration_times = lindley.exponential_samples(model.AVG_PATIENT_ARRIVAL_TIME,
+      model.AVG_REGISTRATION_TIME, DURATION, rng)
+    evaluation_times = rng.exponential(model.AVG_EVALUATION_TIME, len(inter_arrival_times))
+    result = tandem.simulate(inter_arrival_times, [registration_times, evaluation_times],
+      [model.NUM_RECPTIONISTS, model.NUM_NURSES])
+    seen = result.waits[-1].stop_wait < DURATION
+    return sum(waits.total_wait[seen] for waits in result.waits).mean()
+  return network, {"tandem": run_tandem}
+
+def route_to_doctor():
+  model = load_script("non-linear-examples", "route-to-doctor.py")
+  parameters = model.Parameters(sim_duration = DURATION, engine = "simpy")
+  return model.build_network(parameters), {"simpy": lambda rng: model.run_model(1, rng, parameters).average_wait}
+
+def feedback():
+  network = Network([Station("nurses", 2, Exponential(10))], Exponential(8), routing = [[0.2]])
+  return network, {}
+
+MODELS = {"nurse": nurse, "registration": registration, "route-to-doctor": route_to_doctor, "feedback": feedback}
+
+def main():
+  print(f"Average waits over {DURATION:,} minutes against the analytic answer.")
+  print(f"{'Model':<16} {'Engine':<8} {'Analytic':>9} {'Simulated':>10} {'Error':>7}")
+  failures = 0
+  for name, build in MODELS.items():
+    network, engines = build()
+    solution = solve(network)
+    engines["network"] = lambda rng: network.simulate(DURATION, RandomStreams(rng)).waited.mean
+    for engine, run in engines.items():
+      simulated = run(np.random.default_rng(SEED))
+      error = simulated / solution.mean_wait - 1
+      flag = "" if abs(error) <= TOLERANCE else "  <- off by more than the tolerance"
+      failures += bool(flag)
+      print(f"{name:<16} {engine:<8} {solution.mean_wait:>9.3f} {simulated:>10.3f} {error:>+7.1%}{flag}")
+  if failures:
+    print(f"{failures} run(s) were off by more than {TOLERANCE:.0%}.")
+
+if __name__ == "__main__":
+  main()
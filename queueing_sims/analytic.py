@@ -0,0 +1,158 @@
+###############################################################################
+# Closed-form results for the queueing networks of network.py.
+#
+# solve() takes the same Network a simulation runs and returns the long run
+# mean waits, queue lengths and utilizations of every station:
+# - The traffic equations give each station's arrival rate: the external
+#   arrivals it gets plus what the routing matrix sends it from the others.
+# - Each station is then an M/M/c queue, solved with the Erlang C formula.
+#
+# That's exact when the network is a Jackson network: Poisson external
+# arrivals and exponential service everywhere (the models' Exponential
+# distributions), which solve() reports as product_form. Otherwise the
+# numbers only use the means and are a screening estimate, not an answer.
+# A station that gets work faster than it can serve it is unstable, and its
+# waits and queues are infinite.
+#
+# A solution takes microseconds, so screen() can run thousands of sweep
+# points and pick the ones worth simulating: the promising ones, and any
+# that aren't product form since their solution is only an estimate.
+#
+# Usage
+#   solution = solve(build_network(Parameters()))
+#   print(solution.report())
+#   screened = screen(build_network, Parameters(), {"num_nurses": [1, 2, 3]},
+#                     lambda solution: solution.mean_wait < 10)
+#   points = screened[screened["simulate"]][["num_nurses"]].to_dict("records")
+#   results = sweep(run_model, Parameters(), {}, 10, 42, points = points)
+###############################################################################
+
+import math
+from typing import Callable, NamedTuple
+
+import numpy as np
+import pandas as pd
+
+from queueing_sims.distributions import Empirical, Exponential, Trace, Uniform
+from queueing_sims.network import Network
+from queueing_sims.sweeps import grid_points
+
+class StationSolution(NamedTuple):
+  name: str
+  capacity: int
+  arrival_rate: float # Arrivals per unit of time, external and routed.
+  utilization: float # The fraction of the servers busy. 1 or more is unstable.
+  wait_probability: float # The chance an arrival has to queue (Erlang C).
+  mean_wait: float # Time spent queuing per visit.
+  mean_queue_length: float
+  mean_in_station: float # Queuing and in service.
+
+class NetworkSolution(NamedTuple):
+  arrival_rate: float # External arrivals per unit of time.
+  stations: list # StationSolutions, in the order of the network's stations.
+  product_form: bool # Whether the solution is exact rather than an estimate.
+  stable: bool
+  mean_wait: float # Total time queuing per entity, over all its visits.
+  mean_sojourn: float # Time in the network per entity.
+  mean_in_network: float
+
+  def station(self, name: str) -> StationSolution:
+    return next(solution for solution in self.stations if solution.name == name)
+
+  @property
+  def max_utilization(self) -> float:
+    return max(solution.utilization for solution in self.stations)
+
+  def report(self) -> str:
+    kind = "exact (product form)" if self.product_form else "an estimate (not product form)"
+    lines = [f"{self.arrival_rate:.4g} arrivals per unit of time. The solution is {kind}.",
+      f"Each entity spends {self.mean_sojourn:.3f} in the network, {self.mean_wait:.3f} of it queuing.",
+      f"{'Station':<24} {'Servers':>7} {'Arrival rate':>12} {'Busy':>6} {'P(wait)':>7} {'Avg wait':>9} "
+      f"{'Avg queue':>9}"]
+    for solution in self.stations:
+      lines.append(f"{solution.name:<24} {solution.capacity:>7} {solution.arrival_rate:>12.4g} "
+        f"{solution.utilization:>6.1%} {solution.wait_probability:>7.3f} {solution.mean_wait:>9.3f} "
+        f"{solution.mean_queue_length:>9.2f}")
+    return "\n".join(lines)
+
+def erlang_c(servers: int, offered_load: float) -> float:
+  """
+  The probability an arrival has to queue at an M/M/c station with offered
+  load arrival rate x mean service time. 1 when the station is unstable.
+  """
+  if offered_load >= servers:
+    return 1.0
+  # Erlang B by its recurrence, which doesn't overflow like the factorials do.
+  blocking = 1.0
+  for server in range(1, servers + 1):
+    blocking = offered_load * blocking / (server + offered_load * blocking)
+  utilization = offered_load / servers
+  return blocking / (1 - utilization * (1 - blocking))
+
+def mmc(name: str, servers: int, arrival_rate: float, mean_service: float) -> StationSolution:
+  """An M/M/c station on its own."""
+  offered_load = arrival_rate * mean_service
+  utilization = offered_load / servers
+  if utilization >= 1:
+    return StationSolution(name, servers, arrival_rate, utilization, 1.0, math.inf, math.inf, math.inf)
+  wait_probability = erlang_c(servers, offered_load) if arrival_rate > 0 else 0.0
+  mean_wait = wait_probability * mean_service / (servers - offered_load)
+  mean_queue_length = arrival_rate * mean_wait
+  return StationSolution(name, servers, arrival_rate, utilization, wait_probability, mean_wait,
+    mean_queue_length, mean_queue_length + offered_load)
+
+def mean(distribution) -> float:
+  """The mean of a distribution from distributions.py."""
+  if isinstance(distribution, Uniform):
+    return (distribution.low + distribution.high) / 2
+  if isinstance(distribution, Empirical):
+    return float(distribution.values @ distribution.probabilities)
+  if isinstance(distribution, Trace):
+    return float(distribution.values.mean())
+  return distribution.mean
+
+def arrival_rates(network: Network) -> np.ndarray:
+  """Every station's total arrival rate, from the traffic equations."""
+  external = network.entry / mean(network.arrivals)
+  try:
+    return np.linalg.solve(np.eye(len(network.stations)) - network.routing.T, external)
+  except np.linalg.LinAlgError:
+    raise ValueError("The routing never lets some entities leave the network.") from None
+
+def solve(network: Network) -> NetworkSolution:
+  """The long run averages of network, exact if it's a Jackson network."""
+  external_rate = 1 / mean(network.arrivals)
+  rates = arrival_rates(network)
+  stations = [mmc(station.name, station.capacity, rate, mean(station.service))
+    for station, rate in zip(network.stations, rates)]
+  product_form = isinstance(network.arrivals, Exponential) and all(
+    isinstance(station.service, Exponential) for station in network.stations)
+  stable = all(solution.utilization < 1 for solution in stations)
+  # Little's law over the whole network turns the numbers in it into times.
+  mean_in_network = sum(solution.mean_in_station for solution in stations)
+  mean_waiting = sum(solution.mean_queue_length for solution in stations)
+  return NetworkSolution(external_rate, stations, product_form, stable, mean_waiting / external_rate,
+    mean_in_network / external_rate, mean_in_network)
+
+def screen(build_network: Callable, base_parameters: NamedTuple, grid: dict,
+           promising: Callable) -> pd.DataFrame:
+  """
+  Solves the network build_network(parameters) makes for every point of
+  grid, as sweep() would run them. The result has a row per point: the
+  grid's columns, the solution's totals and simulate, which is true for
+  the points promising(solution) picks and for those that aren't product
+  form. Unstable points are never promising.
+  """
+  rows = []
+  for point in grid_points(grid):
+    solution = solve(build_network(base_parameters._replace(**point)))
+    rows.append({
+      **point,
+      "product_form": solution.product_form,
+      "stable": solution.stable,
+      "max_utilization": solution.max_utilization,
+      "mean_wait": solution.mean_wait,
+      "mean_sojourn": solution.mean_sojourn,
+      "simulate": not solution.product_form or (solution.stable and bool(promising(solution)))
+    })
+  return pd.DataFrame(rows)
@@ -0,0 +1,268 @@
+###############################################################################
+# Arrivals that come in waves: non-homogeneous Poisson processes.
+#
+# Real traffic isn't a constant rate. Registration opens and a surge
+# arrives, clinics get a morning rush, sites see a daily cycle. A rate
+# function says how many arrivals to expect per unit of time at every
+# moment:
+# - PiecewiseRate(starts, rates, period): rates[i] from starts[i] until the
+#   next start, repeating every period if one is given. from_counts() and
+#   from_arrival_times() build one from a trace of observed traffic.
+# - SinusoidalRate(mean, amplitude, period, phase): a smooth daily cycle.
+#   If amplitude > mean the rate is clipped at zero for part of the cycle,
+#   and cumulative and average_rate count only the time above zero.
+# Any object with the same methods works too: cumulative(t), the expected
+# number of arrivals in [0, t], and either inverse_cumulative(y) or
+# rate(t) and max_rate. They all take and return arrays.
+#
+# NonHomogeneousPoisson(rate) is a distribution for a Stream (see
+# distributions.py) whose variates are the gaps between arrivals. Like
+# Trace it's stateful, so give every stream its own. Its blocks are drawn
+# the vectorized way, never one arrival at a time:
+# - Inversion, when the rate can invert its cumulative: the arrival times
+#   of a unit rate process (a cumulative sum of exponentials) are mapped
+#   back through the inverse of the cumulative rate. A block is a few
+#   array operations and a binary search.
+# - Thinning otherwise: candidates are drawn at max_rate and each is kept
+#   with probability rate(t) / max_rate, a block at a time.
+# Either way the block's arrival times are turned back into gaps, so a
+# model that takes a mean inter-arrival time takes a rate just as well.
+#
+# inter_arrival_distribution() is what the models call: an Exponential for
+# a mean inter-arrival time, as before, or a NonHomogeneousPoisson for a
+# rate. expected_arrivals() is how many arrivals to draw ahead for a span.
+#
+# Usage
+#   # 12 candidates a minute, 600 a minute for the hour after registration
+#   # opens at 9:00, then 60 a minute.
+#   opening = PiecewiseRate([0, 9 * 60, 10 * 60], [12, 600, 60])
+#   parameters = ModelParameters(candidate_arrival_time = opening)
+#   # A daily cycle between 2 and 18 patients an hour, peaking at noon.
+#   daily = SinusoidalRate(10 / 60, 8 / 60, 24 * 60, phase = -math.pi / 2)
+###############################################################################
+
+import math
+from numbers import Real
+from typing import NamedTuple, Optional
+
+import numpy as np
+
+from queueing_sims.distributions import Exponential, uniforms
+
+class PiecewiseRate:
+  """
+  rates[i] arrivals per unit of time from starts[i] until starts[i + 1].
+  The last rate lasts forever, or until period when the rates repeat.
+  """
+  def __init__(self, starts, rates, period: Optional[float] = None) -> None:
+    self.starts = np.asarray(starts, dtype=np.float64)
+    self.rates = np.asarray(rates, dtype=np.float64)
+    if len(self.starts) == 0 or len(self.starts) != len(self.rates):
+      raise ValueError("There must be a rate for every start, and at least one.")
+    if self.starts[0] != 0 or np.any(np.diff(self.starts) <= 0):
+      raise ValueError("The starts must begin at 0 and increase.")
+    if np.any(self.rates < 0):
+      raise ValueError("The rates can't be negative.")
+    if period is not None and period <= self.starts[-1]:
+      raise ValueError("The period must be after the last start.")
+    self.period = period
+    # The expected arrivals before each start.
+    self._cumulative = np.concatenate(([0.0], np.cumsum(self.rates[:-1] * np.diff(self.starts))))
+    self._per_period = None
+    if period is not None:
+      self._per_period = float(self._cumulative[-1] + self.rates[-1] * (period - self.starts[-1]))
+      if self._per_period == 0:
+        raise ValueError("A repeating rate needs some arrivals every period.")
+
+  @classmethod
+  def from_counts(cls, counts, width: float, loop: bool = False) -> "PiecewiseRate":
+    """
+    The rate of a trace of arrival counts per interval of width. When the
+    trace is over arrivals stop, unless loop repeats it.
+    """
+    counts = np.asarray(counts, dtype=np.float64)
+    starts = np.arange(len(counts)) * width
+    if loop:
+      return cls(starts, counts / width, period = len(counts) * width)
+    return cls(np.append(starts, len(counts) * width), np.append(counts / width, 0.0))
+
+  @classmethod
+  def from_arrival_times(cls, times, width: float, loop: bool = False) -> "PiecewiseRate":
+    """The rate of recorded arrival times, counted in intervals of width from time zero."""
+    times = np.asarray(times, dtype=np.float64)
+    intervals = max(math.ceil(times.max() / width), 1) if len(times) else 1
+    counts = np.bincount(np.minimum(times // width, intervals - 1).astype(np.int64), minlength = intervals)
+    return cls.from_counts(counts, width, loop)
+
+  # Compared, hashed and shown by value, like SinusoidalRate, so a rate can
+  # be a sweep parameter.
+  def _asdict(self) -> dict:
+    return {"starts": self.starts.tolist(), "rates": self.rates.tolist(), "period": self.period}
+
+  def __repr__(self) -> str:
+    return f"PiecewiseRate({self.starts.tolist()}, {self.rates.tolist()}, period={self.period!r})"
+
+  def __eq__(self, other) -> bool:
+    if not isinstance(other, PiecewiseRate):
+      return NotImplemented
+    return self._asdict() == other._asdict()
+
+  def __hash__(self) -> int:
+    return hash((tuple(self.starts.tolist()), tuple(self.rates.tolist()), self.period))
+
+  @property
+  def max_rate(self) -> float:
+    return float(self.rates.max())
+
+  @property
+  def average_rate(self) -> float:
+    """The average over a period, or over the starts if the rates don't repeat."""
+    if self.period is not None:
+      return self._per_period / self.period
+    if self.starts[-1] == 0:
+      return float(self.rates[0])
+    return float(self._cumulative[-1] / self.starts[-1])
+
+  def _fold(self, t: np.ndarray) -> tuple:
+    """The periods before t and where t is in its period."""
+    if self.period is None:
+      return 0.0, t
+    return np.divmod(t, self.period)
+
+  def rate(self, t) -> np.ndarray:
+    _, t = self._fold(np.asarray(t, dtype=np.float64))
+    return self.rates[np.searchsorted(self.starts, t, side="right") - 1]
+
+  def cumulative(self, t) -> np.ndarray:
+    periods, t = self._fold(np.asarray(t, dtype=np.float64))
+    index = np.searchsorted(self.starts, t, side="right") - 1
+    value = self._cumulative[index] + self.rates[index] * (t - self.starts[index])
+    return value if self.period is None else value + periods * self._per_period
+
+  def inverse_cumulative(self, y) -> np.ndarray:
+    """The time the expected arrivals reach y; infinite if they never do."""
+    y = np.asarray(y, dtype=np.float64)
+    periods = 0.0
+    if self.period is not None:
+      periods, y = np.divmod(y, self._per_period)
+    # Right of any run of equal cumulatives, so a zero rate is skipped.
+    index = np.searchsorted(self._cumulative, y, side="right") - 1
+    rates = self.rates[index]
+    offset = np.divide(y - self._cumulative[index], rates, out=np.full(y.shape, math.inf), where=rates > 0)
+    return self.starts[index] + offset + periods * (self.period or 0.0)
+
+class SinusoidalRate(NamedTuple):
+  """max(mean + amplitude x sin(2 pi t / period + phase), 0) arrivals per unit of time."""
+  mean: float
+  amplitude: float
+  period: float
+  phase: float = 0.0
+
+  @property
+  def max_rate(self) -> float:
+    return max(self.mean + abs(self.amplitude), 0.0)
+
+  @property
+  def average_rate(self) -> float:
+    _, _, before = self._cycle()
+    return float(before[-1] / (2 * math.pi))
+
+  def rate(self, t) -> np.ndarray:
+    t = np.asarray(t, dtype=np.float64)
+    return np.maximum(self.mean + self.amplitude * np.sin(2 * math.pi * t / self.period + self.phase), 0.0)
+
+  def cumulative(self, t) -> np.ndarray:
+    t = np.asarray(t, dtype=np.float64)
+    angle = 2 * math.pi * t / self.period + self.phase
+    return (self._integral(angle) - self._integral(self.phase)) * self.period / (2 * math.pi)
+
+  def _antiderivative(self, angle):
+    return self.mean * angle - self.amplitude * np.cos(angle)
+
+  def _cycle(self) -> tuple:
+    """
+    The stretches of one cycle, as angles from 0 to 2 pi, where the rate
+    crosses zero, whether the rate is above zero in each, and the integral
+    of the rate over the angle before each.
+    """
+    ratio = -self.mean / self.amplitude if self.amplitude else math.inf
+    crossings = [math.asin(ratio), math.pi - math.asin(ratio)] if abs(ratio) < 1 else []
+    bounds = np.unique(np.concatenate(([0.0, 2 * math.pi], np.mod(crossings, 2 * math.pi))))
+    positive = self.mean + self.amplitude * np.sin((bounds[:-1] + bounds[1:]) / 2) > 0
+    pieces = np.where(positive, np.diff(self._antiderivative(bounds)), 0.0)
+    return bounds, positive, np.concatenate(([0.0], np.cumsum(pieces)))
+
+  def _integral(self, angle) -> np.ndarray:
+    """The integral of the clipped rate over the angle from 0 to angle."""
+    bounds, positive, before = self._cycle()
+    cycles, angle = np.divmod(angle, 2 * math.pi)
+    index = np.minimum(np.searchsorted(bounds, angle, side="right") - 1, len(positive) - 1)
+    inside = np.where(positive[index], self._antiderivative(angle) - self._antiderivative(bounds[index]), 0.0)
+    return cycles * before[-1] + before[index] + inside
+
+class NonHomogeneousPoisson:
+  """The gaps between the arrivals of a Poisson process with a time-varying rate, from start."""
+  def __init__(self, rate, start: float = 0.0) -> None:
+    if not hasattr(rate, "inverse_cumulative") and not rate.max_rate > 0:
+      raise ValueError("Thinning needs a max_rate greater than 0.")
+    self.rate = rate
+    self._time = start # The last arrival handed out.
+    self._accepted = 1.0 # The fraction of candidates thinning kept last time.
+
+  @property
+  def mean(self) -> float:
+    """The long run mean gap, as the analytic solver sees it."""
+    return 1 / self.rate.average_rate
+
+  def sample(self, rng: np.random.Generator, size: int, antithetic: bool = False) -> np.ndarray:
+    if math.isinf(self._time): # The rate has dropped to zero for good.
+      return np.full(size, math.inf)
+    if hasattr(self.rate, "inverse_cumulative"):
+      # Unit rate arrivals, mapped back through the cumulative rate.
+      steps = uniforms(rng, size, antithetic)
+      np.log(steps, out=steps)
+      targets = self.rate.cumulative(self._time) - np.cumsum(steps)
+      times = self.rate.inverse_cumulative(targets)
+    else:
+      times = self._thin(rng, size, antithetic)
+    with np.errstate(invalid="ignore"): # inf - inf once the arrivals stop.
+      gaps = np.diff(times, prepend=self._time)
+    gaps[np.isinf(times)] = math.inf
+    self._time = float(times[-1])
+    return gaps
+
+  def _thin(self, rng: np.random.Generator, size: int, antithetic: bool) -> np.ndarray:
+    """size arrival times after the last one, by thinning blocks of candidates drawn at max_rate."""
+    max_rate = self.rate.max_rate
+    clock = self._time
+    kept = []
+    needed = size
+    while needed:
+      # Enough candidates for what's left if the acceptance holds, and then some.
+      count = int(needed / max(self._accepted, 0.01) * 1.1) + 64
+      steps = uniforms(rng, count, antithetic)
+      np.log(steps, out=steps)
+      candidates = clock - np.cumsum(steps) / max_rate
+      accepted = candidates[uniforms(rng, count, antithetic) * max_rate <= self.rate.rate(candidates)]
+      self._accepted = max(len(accepted) / count, 0.001)
+      kept.append(accepted[:needed])
+      needed -= len(kept[-1])
+      # A Poisson process can restart at any arrival, so carry on from the
+      # last candidate looked at: the last one kept if the block had extra.
+      clock = accepted[len(kept[-1]) - 1] if needed == 0 else candidates[-1]
+    return np.concatenate(kept)
+
+def inter_arrival_distribution(arrivals):
+  """
+  The distribution of the gaps between arrivals: exponential for a mean
+  inter-arrival time, or a fresh NonHomogeneousPoisson for a rate.
+  """
+  if isinstance(arrivals, Real):
+    return Exponential(arrivals)
+  return NonHomogeneousPoisson(arrivals)
+
+def expected_arrivals(arrivals, start: float, end: float) -> float:
+  """The expected number of arrivals in [start, end), for a mean inter-arrival time or a rate."""
+  if isinstance(arrivals, Real):
+    return (end - start) / arrivals
+  return float(arrivals.cumulative(end) - arrivals.cumulative(start))
@@ -0,0 +1,130 @@
+###############################################################################
+# Compact FIFO backlogs for simulations where a Store holds nothing but the
+# arrival time of each waiting request.
+#
+# A simpy.Store keeps its items in a Python list, so every pending request
+# is a boxed float plus a list slot, and taking the oldest one is
+# list.pop(0), which shifts the whole backlog. When arrivals outpace the
+# rate limit, the backlog grows to hundreds of thousands of requests.
+#
+# - TimestampRing: a FIFO of float64 timestamps in a NumPy ring buffer. It
+#   doubles when full and halves when a quarter full, so memory is about
+#   8 bytes per waiting request. Appending and popping the oldest are O(1).
+#   extend() and pop_many() move whole arrays of timestamps at once.
+# - TimestampStore: a simpy.Store whose items are a TimestampRing. It's a
+#   drop in replacement for a Store of arrival times and still gives exact
+#   per-request wait times.
+# - CountingStore: a simpy.Container with the put/get interface of a Store,
+#   for when only the number of waiting requests matters. get() yields None
+#   instead of an arrival time, so no per-request delays can be computed.
+###############################################################################
+
+import numpy as np
+import simpy
+
+class TimestampRing:
+  def __init__(self, capacity: int = 1024) -> None:
+    # Keep the capacity a power of two so wrapping around is a bit mask.
+    self._minimum_capacity = 1 << max(capacity - 1, 0).bit_length()
+    self._buffer = np.empty(self._minimum_capacity)
+    self._mask = self._minimum_capacity - 1
+    self._head = 0 # The index of the oldest timestamp.
+    self._size = 0
+
+  def __len__(self) -> int:
+    return self._size
+
+  def __bool__(self) -> bool:
+    return self._size > 0
+
+  def append(self, timestamp: float) -> None:
+    if self._size > self._mask:
+      self._resize(2 * len(self._buffer))
+    self._buffer[(self._head + self._size) & self._mask] = timestamp
+    self._size += 1
+
+  def extend(self, timestamps) -> None:
+    """Appends an array of timestamps, oldest first."""
+    timestamps = np.asarray(timestamps, dtype=np.float64)
+    count = len(timestamps)
+    if self._size + count > len(self._buffer):
+      self._resize(1 << (self._size + count - 1).bit_length())
+    start = (self._head + self._size) & self._mask
+    first = min(count, len(self._buffer) - start)
+    self._buffer[start:start + first] = timestamps[:first]
+    self._buffer[:count - first] = timestamps[first:]
+    self._size += count
+
+  def pop_many(self, count: int) -> np.ndarray:
+    """Removes and returns the oldest count timestamps (fewer if there aren't that many) as a new array."""
+    count = min(count, self._size)
+    end = self._head + count
+    if end <= len(self._buffer):
+      timestamps = self._buffer[self._head:end].copy()
+    else:
+      timestamps = np.concatenate((self._buffer[self._head:], self._buffer[:end - len(self._buffer)]))
+    self._head = end & self._mask
+    self._size -= count
+    # Shrink by as many halvings as pop() would have made one at a time.
+    capacity = len(self._buffer)
+    while self._size <= (capacity - 1) >> 2 and capacity > self._minimum_capacity:
+      capacity //= 2
+    if capacity != len(self._buffer):
+      self._resize(capacity)
+    return timestamps
+
+  def pop(self, index: int = 0) -> float:
+    """Removes and returns the oldest timestamp. Only index 0 is supported."""
+    if index != 0:
+      raise IndexError("A TimestampRing can only pop its oldest timestamp.")
+    if self._size == 0:
+      raise IndexError("pop from an empty TimestampRing")
+    timestamp = self._buffer.item(self._head)
+    self._head = (self._head + 1) & self._mask
+    self._size -= 1
+    if self._size <= self._mask >> 2 and self._mask >= self._minimum_capacity:
+      self._resize(len(self._buffer) // 2)
+    return timestamp
+
+  def __getitem__(self, index: int) -> float:
+    if not -self._size <= index < self._size:
+      raise IndexError("TimestampRing index out of range")
+    return self._buffer.item((self._head + index % self._size) & self._mask)
+
+  def to_array(self) -> np.ndarray:
+    """The waiting timestamps, oldest first, as a new array."""
+    return np.concatenate(self._segments())
+
+  @property
+  def nbytes(self) -> int:
+    return self._buffer.nbytes
+
+  def _segments(self) -> tuple:
+    end = self._head + self._size
+    if end <= len(self._buffer):
+      return (self._buffer[self._head:end],)
+    return (self._buffer[self._head:], self._buffer[:end - len(self._buffer)])
+
+  def _resize(self, capacity: int) -> None:
+    resized = np.empty(capacity)
+    position = 0
+    for segment in self._segments():
+      resized[position:position + len(segment)] = segment
+      position += len(segment)
+    self._buffer = resized
+    self._mask = capacity - 1
+    self._head = 0
+
+class TimestampStore(simpy.Store):
+  """A Store of arrival times backed by a TimestampRing."""
+  def __init__(self, env, capacity = float("inf")) -> None:
+    super().__init__(env, capacity)
+    self.items = TimestampRing()
+
+class CountingStore(simpy.Container):
+  """Counts waiting requests instead of storing them."""
+  def put(self, item = None):
+    return super().put(1)
+
+  def get(self):
+    return super().get(1)
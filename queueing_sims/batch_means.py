@@ -0,0 +1,186 @@
+###############################################################################
+# Confidence intervals for a steady-state mean from a single long run.
+#
+# Replications each repeat the warm-up. Batch means run once, drop the
+# warm-up once and split the rest of the output into batches. If the
+# batches are long enough their means are nearly independent, so the
+# spread of the batch means gives a confidence interval for the mean:
+# - Non-overlapping batch means: k batches, a Student t interval with
+#   k - 1 degrees of freedom.
+# - Overlapping batch means: every window of a batch's length, sliding one
+#   cell at a time. The same data gives a lower variance estimate, with
+#   about 1.5 (k - 1) degrees of freedom (Meketon and Schmeiser).
+#
+# Memory is bounded: BatchMeans only keeps the sums of at most max_cells
+# cells of cell_size consecutive observations. When the cells are full,
+# neighbours are merged and cell_size doubles, so a run of any length uses
+# the same memory. Batches are whole numbers of cells.
+#
+# The batch size is picked when an interval is asked for: the smallest
+# power of two cells per batch whose batch means have a lag-1
+# autocorrelation of at most max_lag1, while leaving at least min_batches
+# batches. If no batch size gets there the run is too short for the
+# output's correlation, and the estimate is marked as correlated; its
+# interval is likely too narrow.
+#
+# The warm-up is found with MSER (see warmup.py) on the cell means and
+# dropped before batching.
+#
+# precision_monitor() is a SimPy process that ends once the interval is
+# narrow enough, so a run can stop early with env.run(until=...).
+#
+# Usage
+#   batches = BatchMeans()
+#   ... batches.add(wait) for every patient ...
+#   estimate = batches.estimate()
+#   print(estimate.overlapping, estimate.batch_size, estimate.warmup)
+###############################################################################
+
+import math
+from typing import NamedTuple
+
+import numpy as np
+
+from queueing_sims.confidence import ConfidenceInterval, student_t_quantile
+from queueing_sims.warmup import mser
+
+MAX_CELLS = 1024
+MIN_BATCHES = 20
+MAX_LAG1 = 0.1
+
+class BatchMeansEstimate(NamedTuple):
+  nonoverlapping: ConfidenceInterval
+  overlapping: ConfidenceInterval
+  batch_size: int # Observations per batch.
+  batches: int # Non-overlapping batches.
+  lag1: float # The lag-1 autocorrelation of the non-overlapping batch means.
+  correlated: bool # True if no batch size got lag1 down to max_lag1.
+  warmup: int # Observations dropped from the start as warm-up.
+  observations: int # Observations after the warm-up.
+
+def lag1_autocorrelation(values: np.ndarray) -> float:
+  centered = values - values.mean()
+  denominator = float(centered @ centered)
+  if denominator == 0:
+    return 0.0
+  return float(centered[:-1] @ centered[1:]) / denominator
+
+class BatchMeans:
+  """Accumulates a series in bounded memory for batch means intervals."""
+  def __init__(self, max_cells: int = MAX_CELLS, min_batches: int = MIN_BATCHES, max_lag1: float = MAX_LAG1,
+               truncate_warmup: bool = True) -> None:
+    if max_cells < 2 * min_batches or max_cells % 2:
+      raise ValueError("max_cells must be even and at least 2 x min_batches.")
+    self.max_cells = max_cells
+    self.min_batches = min_batches
+    self.max_lag1 = max_lag1
+    self.truncate_warmup = truncate_warmup
+    self.cell_size = 1
+    self._cells = [] # The sum of every full cell.
+    self._sum = 0.0 # The cell being filled.
+    self._filled = 0
+
+  @property
+  def count(self) -> int:
+    return len(self._cells) * self.cell_size + self._filled
+
+  def add(self, value) -> None:
+    self._sum += value
+    self._filled += 1
+    if self._filled == self.cell_size:
+      self._cells.append(self._sum)
+      self._sum = 0.0
+      self._filled = 0
+      if len(self._cells) == self.max_cells:
+        self._merge()
+
+  def extend(self, values) -> None:
+    values = np.asarray(values, dtype=np.float64)
+    while len(values):
+      if self._filled or len(values) < self.cell_size:
+        # Top up the partial cell one value at a time.
+        room = self.cell_size - self._filled
+        for value in values[:room].tolist():
+          self.add(value)
+        values = values[room:]
+        continue
+      # Whole cells at once, up to the next merge.
+      cells = min(len(values) // self.cell_size, self.max_cells - len(self._cells))
+      used = cells * self.cell_size
+      self._cells.extend(values[:used].reshape(cells, self.cell_size).sum(axis=1).tolist())
+      values = values[used:]
+      if len(self._cells) == self.max_cells:
+        self._merge()
+
+  def _merge(self) -> None:
+    """Halves the number of cells by adding up neighbours."""
+    cells = self._cells
+    self._cells = [cells[index] + cells[index + 1] for index in range(0, len(cells), 2)]
+    self.cell_size *= 2
+
+  def _cell_means(self) -> tuple:
+    """The means of the full cells after the warm-up and the observations dropped."""
+    means = np.array(self._cells) / self.cell_size
+    warmup = 0
+    if self.truncate_warmup and len(means) >= 4:
+      warmup = mser(means, batch_size = 1).index
+    return means[warmup:], warmup * self.cell_size
+
+  def estimate(self, confidence: float = 0.95) -> BatchMeansEstimate:
+    means, warmup = self._cell_means()
+    cells = len(means)
+    if cells < 2 * self.min_batches:
+      # Not enough data yet: infinitely wide intervals.
+      mean = float(means.mean()) if cells else math.nan
+      unknown = ConfidenceInterval(mean, math.inf, confidence, 0)
+      return BatchMeansEstimate(unknown, unknown, self.cell_size, 0, math.nan, True, warmup, cells * self.cell_size)
+
+    # The smallest batch that leaves the batch means uncorrelated enough.
+    per_batch = 1
+    while True:
+      batches = cells // per_batch
+      # Drop leftover cells from the start, the furthest from steady state.
+      batch_means = means[cells - batches * per_batch:].reshape(batches, per_batch).mean(axis=1)
+      lag1 = lag1_autocorrelation(batch_means)
+      if lag1 <= self.max_lag1 or cells // (2 * per_batch) < self.min_batches:
+        break
+      per_batch *= 2
+    correlated = lag1 > self.max_lag1
+    used = means[cells - batches * per_batch:]
+    mean = float(used.mean())
+
+    t = student_t_quantile((1 + confidence) / 2, batches - 1)
+    nonoverlapping = ConfidenceInterval(mean, t * float(batch_means.std(ddof=1)) / math.sqrt(batches),
+      confidence, batches)
+
+    # Every window of per_batch cells, from cumulative sums.
+    cumulative = np.concatenate(([0.0], np.cumsum(used)))
+    windows = (cumulative[per_batch:] - cumulative[:-per_batch]) / per_batch
+    total = len(used)
+    variance = per_batch / (total - per_batch) * float(np.mean((windows - mean) ** 2))
+    t = student_t_quantile((1 + confidence) / 2, 1.5 * (batches - 1))
+    overlapping = ConfidenceInterval(mean, t * math.sqrt(variance), confidence, batches)
+
+    return BatchMeansEstimate(nonoverlapping, overlapping, per_batch * self.cell_size, batches, lag1, correlated,
+      warmup, total * self.cell_size)
+
+  def interval(self, confidence: float = 0.95, overlapping: bool = True) -> ConfidenceInterval:
+    estimate = self.estimate(confidence)
+    return estimate.overlapping if overlapping else estimate.nonoverlapping
+
+  def is_precise(self, relative_precision: float, confidence: float = 0.95, overlapping: bool = True) -> bool:
+    """Whether the interval is within relative_precision of the mean and the batches are uncorrelated."""
+    estimate = self.estimate(confidence)
+    interval = estimate.overlapping if overlapping else estimate.nonoverlapping
+    return not estimate.correlated and interval.relative_half_width <= relative_precision
+
+def precision_monitor(env, batches: BatchMeans, relative_precision: float, check_every: float, until: float,
+                      confidence: float = 0.95):
+  """
+  A SimPy process that ends once batches is precise enough, checking every
+  check_every, or at until. Run it with env.run(until=env.process(...)).
+  """
+  while env.now < until:
+    yield env.timeout(min(check_every, until - env.now))
+    if batches.is_precise(relative_precision, confidence):
+      return
@@ -0,0 +1,313 @@
+#!/usr/bin/env python3
+
+###############################################################################
+# A benchmark of every model, at several scales, with regression tracking.
+#
+# Each benchmark runs a model (and engine) until about `scale` entities have
+# arrived and reports:
+# - wall_seconds: the fastest of --repeats runs.
+# - events_per_second: SimPy events processed per wall-clock second.
+#   simpy.Environment is swapped for one that counts its steps, so every
+#   model is counted without changing it. None for the NumPy engines, which
+#   have no events.
+# - entities_per_second: requests, patients or candidates per second. This
+#   is what compare checks, since it's defined for every engine.
+# - peak_rss_mb: the peak resident memory of the process. Every benchmark
+#   runs in a fresh process so it only sees its own peak.
+# - traced_bytes_per_entity: the peak memory Python allocated per entity,
+#   from tracemalloc. CPython doesn't count allocations cheaply, and tracing
+#   slows a run down several times, so this comes from a separate run
+#   capped at TRACED_SCALE entities.
+#
+# Usage
+#   benchmark-suite.py run --output baseline.json
+#   benchmark-suite.py run --scales 1e3 1e5 1e7 --models tandem/numpy --output current.json
+#   benchmark-suite.py compare baseline.json current.json
+#
+# compare exits with status 1 if a benchmark's throughput fell or its peak
+# memory grew by more than --tolerance, or if it fails now but ran in the
+# baseline.
+###############################################################################
+
+import argparse
+import datetime
+import functools
+import importlib.util
+import json
+import multiprocessing
+import platform
+import resource
+import sys
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import simpy
+
+SCALES = [1e3, 1e4, 1e5] # Entities per run. Pass --scales to go up to 1e7.
+REPEATS = 3
+TRACED_SCALE = 10_000
+SEED = 42
+TOLERANCE = 0.1 # The fraction throughput may fall, or memory grow, before compare fails.
+MEMORY_FLOOR_MB = 5 # Memory growth smaller than this is never a regression.
+
+class CountingEnvironment(simpy.Environment):
+  """Counts the events it processes."""
+  events_processed = 0 # Across every environment in the process.
+
+  def step(self) -> None:
+    CountingEnvironment.events_processed += 1
+    super().step()
+
+@functools.lru_cache(maxsize = None)
+def load_script(*parts):
+  """Imports a hyphenated script relative to queueing_sims."""
+  path = Path(__file__).parent.parent.joinpath(*parts)
+  spec = importlib.util.spec_from_file_location(path.stem.replace("-", "_"), path)
+  module = importlib.util.module_from_spec(spec)
+  spec.loader.exec_module(module)
+  return module
+
+###############################################################################
+# The benchmarks. Each runs about `entities` entities and returns how many
+# actually arrived. Servers are kept below 90% busy so queues stay bounded.
+###############################################################################
+
+def fixed_window_simpy(entities, rng) -> int:
+  from queueing_sims import fixed_window
+  parameters = fixed_window.Parameters()
+  parameters = parameters._replace(duration = entities * parameters.avg_arrival_speed)
+  return fixed_window.run_model(1, rng, parameters).requests_submitted
+
+def fixed_window_numpy(entities, rng) -> int:
+  from queueing_sims import fixed_window, fixed_window_vectorized
+  from queueing_sims.distributions import RandomStreams
+  parameters = fixed_window.Parameters()
+  metrics = fixed_window_vectorized.simulate(entities * parameters.avg_arrival_speed, parameters.window_size,
+    parameters.max_threshold, parameters.avg_arrival_speed, streams = RandomStreams(rng))
+  return metrics["requests_submitted"]
+
+def _nurse(entities, rng, engine) -> int:
+  model = load_script("linear-examples", "nurse-example-oo.py")
+  arrival_time, consult_time = 7, 6
+  parameters = model.Parameters(arrival_time, consult_time, 1, entities * arrival_time, 1, engine = engine)
+  sim = model.NurseConsultationModel(parameters, 1, rng)
+  sim.run()
+  return len(sim.results)
+
+def nurse_simpy(entities, rng) -> int:
+  return _nurse(entities, rng, "simpy")
+
+def nurse_lindley(entities, rng) -> int:
+  return _nurse(entities, rng, "lindley")
+
+def tandem_simpy(entities, rng) -> int:
+  from queueing_sims.distributions import RandomStreams
+  from queueing_sims.streaming_stats import RunningStats
+  model = load_script("linear-examples", "nurse-with-registration-example.py")
+  env = simpy.Environment()
+  receptionists = simpy.Resource(env, capacity = model.NUM_RECPTIONISTS)
+  nurses = simpy.Resource(env, capacity = model.NUM_NURSES)
+  waits = RunningStats()
+  env.process(model.patient_builder(env, model.AVG_PATIENT_ARRIVAL_TIME, model.AVG_REGISTRATION_TIME,
+    model.AVG_EVALUATION_TIME, receptionists, nurses, RandomStreams(rng), waits))
+  env.run(until = entities * model.AVG_PATIENT_ARRIVAL_TIME)
+  return waits.count
+
+def tandem_numpy(entities, rng) -> int:
+  from queueing_sims import tandem
+  model = load_script("linear-examples", "nurse-with-registration-example.py")
+  inter_arrival_times = rng.exponential(model.AVG_PATIENT_ARRIVAL_TIME, entities)
+  registration_times = rng.exponential(model.AVG_REGISTRATION_TIME, entities)
+  evaluation_times = rng.exponential(model.AVG_EVALUATION_TIME, entities)
+  tandem.simulate(inter_arrival_times, [registration_times, evaluation_times],
+    [model.NUM_RECPTIONISTS, model.NUM_NURSES])
+  return entities
+
+def _route_to_doctor(entities, rng, engine) -> int:
+  model = load_script("non-linear-examples", "route-to-doctor.py")
+  parameters = model.Parameters(sim_duration = entities * model.AVG_PATIENT_ARRIVAL_TIME, engine = engine)
+  return model.run_model(1, rng, parameters).patients_seen
+
+def route_to_doctor_simpy(entities, rng) -> int:
+  return _route_to_doctor(entities, rng, "simpy")
+
+def route_to_doctor_network(entities, rng) -> int:
+  return _route_to_doctor(entities, rng, "network")
+
+def vaccine(entities, rng) -> int:
+  model = load_script("vaccine-apt-scheduling.py")
+  parameters = model.ModelParameters()
+  parameters = parameters._replace(sim_duration = entities * parameters.candidate_arrival_time)
+  return model.run_model(1, rng, parameters).candidates_arrived
+
+BENCHMARKS = {
+  "fixed-window/simpy": fixed_window_simpy,
+  "fixed-window/numpy": fixed_window_numpy,
+  "nurse/simpy": nurse_simpy,
+  "nurse/lindley": nurse_lindley,
+  "tandem/simpy": tandem_simpy,
+  "tandem/numpy": tandem_numpy,
+  "route-to-doctor/simpy": route_to_doctor_simpy,
+  "route-to-doctor/network": route_to_doctor_network,
+  "vaccine/simpy": vaccine
+}
+
+###############################################################################
+# Measuring
+###############################################################################
+
+def peak_rss_mb() -> float:
+  peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+  # Linux reports kilobytes, macOS bytes.
+  return peak / 2**20 if sys.platform == "darwin" else peak / 2**10
+
+def measure(name: str, scale: int, repeats: int) -> dict:
+  """Runs one benchmark at one scale. Called in a fresh process."""
+  simpy.Environment = CountingEnvironment
+  benchmark = BENCHMARKS[name]
+  result = {"benchmark": name, "scale": scale}
+  try:
+    # A tiny run first, so importing the model isn't timed.
+    benchmark(10, np.random.default_rng(SEED))
+    best = None
+    for _ in range(repeats):
+      CountingEnvironment.events_processed = 0
+      started = time.perf_counter()
+      entities = benchmark(scale, np.random.default_rng(SEED))
+      elapsed = time.perf_counter() - started
+      if best is None or elapsed < best[0]:
+        best = (elapsed, entities, CountingEnvironment.events_processed)
+    elapsed, entities, events = best
+    result.update({
+      "entities": entities,
+      "wall_seconds": elapsed,
+      "events": events or None,
+      "events_per_second": events / elapsed if events else None,
+      "entities_per_second": entities / elapsed,
+      "peak_rss_mb": peak_rss_mb()
+    })
+
+    traced_scale = min(scale, TRACED_SCALE)
+    tracemalloc.start()
+    traced_entities = benchmark(traced_scale, np.random.default_rng(SEED))
+    _, traced_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    result["traced_bytes_per_entity"] = traced_peak / max(traced_entities, 1)
+  except Exception as error:
+    result["error"] = f"{type(error).__name__}: {error}"
+  return result
+
+def environment() -> dict:
+  return {
+    "date": datetime.datetime.now().isoformat(timespec="seconds"),
+    "python": platform.python_version(),
+    "platform": platform.platform(),
+    "processor": platform.processor(),
+    "numpy": np.__version__,
+    "simpy": simpy.__version__
+  }
+
+def print_results(results: list) -> None:
+  print(f"{'Benchmark':<24} {'Scale':>10} {'Seconds':>9} {'Events/s':>12} {'Entities/s':>12} "
+        f"{'Peak RSS MB':>12} {'Bytes/entity':>13}")
+  for result in results:
+    line = f"{result['benchmark']:<24} {result['scale']:>10,}"
+    if "error" in result:
+      print(f"{line}  failed: {result['error']}")
+      continue
+    events_per_second = result["events_per_second"]
+    events_per_second = "-" if events_per_second is None else f"{events_per_second:,.0f}"
+    print(f"{line} {result['wall_seconds']:>9.3f} {events_per_second:>12} {result['entities_per_second']:>12,.0f} "
+          f"{result['peak_rss_mb']:>12.1f} {result['traced_bytes_per_entity']:>13,.0f}")
+
+def run(args) -> None:
+  names = args.models or list(BENCHMARKS)
+  unknown = set(names) - set(BENCHMARKS)
+  if unknown:
+    raise SystemExit(f"Unknown benchmarks: {', '.join(sorted(unknown))}. Choose from {', '.join(BENCHMARKS)}.")
+  results = []
+  context = multiprocessing.get_context("spawn")
+  for name in names:
+    for scale in args.scales:
+      with ProcessPoolExecutor(max_workers = 1, mp_context = context) as executor:
+        result = executor.submit(measure, name, int(scale), args.repeats).result()
+      results.append(result)
+      if args.verbose:
+        print_results([result])
+  print_results(results)
+  if args.output:
+    with open(args.output, "w") as file:
+      json.dump({"environment": environment(), "results": results}, file, indent=2)
+    print(f"Saved to {args.output}")
+
+###############################################################################
+# Comparing
+###############################################################################
+
+def compare(args) -> None:
+  with open(args.baseline) as file:
+    baseline = {(result["benchmark"], result["scale"]): result for result in json.load(file)["results"]}
+  with open(args.current) as file:
+    current = json.load(file)["results"]
+
+  regressions = 0
+  print(f"{'Benchmark':<24} {'Scale':>10} {'Entities/s':>12} {'Change':>8} {'Peak RSS MB':>12} {'Change':>8}  Verdict")
+  for result in current:
+    key = (result["benchmark"], result["scale"])
+    line = f"{result['benchmark']:<24} {result['scale']:>10,}"
+    before = baseline.get(key)
+    if before is not None and "error" not in before and "error" in result:
+      # It used to run, so failing now is the worst regression of all.
+      regressions += 1
+      print(f"{line}  REGRESSION: failed: {result['error']}")
+      continue
+    if before is None or "error" in before or "error" in result:
+      reason = "not in the baseline" if before is None else result.get("error") or before.get("error")
+      print(f"{line}  skipped: {reason}")
+      continue
+    speed = result["entities_per_second"] / before["entities_per_second"] - 1
+    memory = result["peak_rss_mb"] - before["peak_rss_mb"]
+    memory_change = memory / before["peak_rss_mb"]
+    problems = []
+    if speed < -args.tolerance:
+      problems.append("slower")
+    if memory_change > args.tolerance and memory > MEMORY_FLOOR_MB:
+      problems.append("more memory")
+    regressions += bool(problems)
+    verdict = "REGRESSION: " + ", ".join(problems) if problems else "ok"
+    print(f"{line} {result['entities_per_second']:>12,.0f} {speed:>+8.1%} "
+          f"{result['peak_rss_mb']:>12.1f} {memory_change:>+8.1%}  {verdict}")
+
+  if regressions:
+    print(f"{regressions} regression(s): new failures or changes beyond ±{args.tolerance:.0%}.")
+    sys.exit(1)
+
+def main():
+  parser = argparse.ArgumentParser(description = "Benchmarks every model and tracks regressions.")
+  commands = parser.add_subparsers(dest = "command", required = True)
+
+  run_parser = commands.add_parser("run", help = "Runs the benchmarks.")
+  run_parser.add_argument("--models", nargs = "+", metavar = "BENCHMARK",
+    help = f"The benchmarks to run. Defaults to all of: {', '.join(BENCHMARKS)}.")
+  run_parser.add_argument("--scales", nargs = "+", type = float, default = SCALES,
+    help = "Entities per run, e.g. 1e3 1e7.")
+  run_parser.add_argument("--repeats", type = int, default = REPEATS, help = "Report the fastest of this many runs.")
+  run_parser.add_argument("--output", help = "Where to save the results as JSON.")
+  run_parser.add_argument("--verbose", action = "store_true", help = "Print each result as it finishes.")
+  run_parser.set_defaults(handler = run)
+
+  compare_parser = commands.add_parser("compare", help = "Flags regressions against a baseline.")
+  compare_parser.add_argument("baseline", help = "Results saved by run --output.")
+  compare_parser.add_argument("current", help = "Results saved by run --output.")
+  compare_parser.add_argument("--tolerance", type = float, default = TOLERANCE,
+    help = "The fraction throughput may fall, or peak memory grow, before it's a regression.")
+  compare_parser.set_defaults(handler = compare)
+
+  args = parser.parse_args()
+  args.handler(args)
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+
+###############################################################################
+# Measures how much the live dashboard in fixed-window-ui.py slows down the
+# simulation it shows, in SimPy events processed per wall-clock second:
+# - on: the simulation redraws the dashboard every UI_REFRESH_RATE ticks.
+# - throttled: a renderer thread draws the latest snapshot at a fixed
+#   wall-clock rate.
+# - off: headless, Rich isn't used at all.
+#
+# The dashboard is drawn to a terminal console writing to /dev/null, so the
+# cost of rendering is measured without depending on the real terminal.
+###############################################################################
+
+import datetime
+import importlib.util
+import os
+import time
+from pathlib import Path
+
+import simpy
+from rich.console import Console
+
+DURATION = datetime.timedelta(hours=10)
+REPEATS = 5 # The best of REPEATS runs is reported for each mode.
+
+class CountingEnvironment(simpy.Environment):
+  """Counts the events it processes."""
+  def __init__(self) -> None:
+    super().__init__()
+    self.events_processed = 0
+
+  def step(self) -> None:
+    self.events_processed += 1
+    super().step()
+
+def load_ui_model():
+  """Imports the hyphenated fixed-window-ui.py script."""
+  path = Path(__file__).parent.parent / "fixed-window-ui.py"
+  spec = importlib.util.spec_from_file_location("fixed_window_ui", path)
+  module = importlib.util.module_from_spec(spec)
+  spec.loader.exec_module(module)
+  return module
+
+def time_mode(model, ui_mode, console) -> tuple:
+  """Returns the events processed and the wall-clock seconds taken."""
+  env = CountingEnvironment()
+  started = time.perf_counter()
+  if ui_mode == "off":
+    model.run_headless(env)
+  else:
+    model.run_with_ui(ui_mode, env, console)
+  return env.events_processed, time.perf_counter() - started
+
+def main():
+  model = load_ui_model()
+  model.DURATION = DURATION
+  print(f"{DURATION} simulated, snapshot every {model.UI_REFRESH_RATE} ticks, "
+        f"{model.UI_FRAMES_PER_SECOND} frames/sec when throttled")
+  print(f"{'UI':<10} {'Events':>10} {'Seconds':>8} {'Events/sec':>11} {'vs off':>7}")
+  with open(os.devnull, "w") as devnull:
+    console = Console(file=devnull, force_terminal=True, width=120, height=40)
+    results = {}
+    for ui_mode in ("on", "throttled", "off"):
+      runs = [time_mode(model, ui_mode, console) for _ in range(REPEATS)]
+      results[ui_mode] = min(runs, key=lambda run: run[1])
+
+  off_rate = results["off"][0] / results["off"][1]
+  for ui_mode, (events, seconds) in results.items():
+    rate = events / seconds
+    print(f"{ui_mode:<10} {events:>10} {seconds:>8.2f} {rate:>11.0f} {rate / off_rate:>7.2f}")
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+
+###############################################################################
+# Compares every model on SimPy and on the lightweight kernel in kernel.py.
+#
+# Each model is loaded once and run with its module's simpy swapped for the
+# backend, which is what replacing its `import simpy` line does. Both
+# backends get the same seed, so they should give the same results; the
+# benchmark checks that and reports entities per second and the speedup.
+###############################################################################
+
+import importlib.util
+import time
+from pathlib import Path
+
+import numpy as np
+import simpy
+
+from queueing_sims import fixed_window, kernel
+from queueing_sims.backlog import TimestampRing
+from queueing_sims.distributions import RandomStreams
+from queueing_sims.streaming_stats import RunningStats
+
+ENTITIES = 100_000 # Entities per run, about.
+REPEATS = 3 # The best of REPEATS runs is reported for each backend.
+SEED = 42
+
+def load_script(*parts):
+  """Imports a hyphenated script relative to queueing_sims."""
+  path = Path(__file__).parent.parent.joinpath(*parts)
+  spec = importlib.util.spec_from_file_location(path.stem.replace("-", "_"), path)
+  module = importlib.util.module_from_spec(spec)
+  spec.loader.exec_module(module)
+  return module
+
+###############################################################################
+# The models. Each returns the number of entities and the results the two
+# backends should agree on.
+###############################################################################
+
+def run_fixed_window(backend, entities, rng) -> tuple:
+  # The same wiring as fixed_window.simulate with the "ring" backlog.
+  parameters = fixed_window.Parameters()
+  env = backend.Environment()
+  store = backend.Store(env)
+  store.items = TimestampRing()
+  metrics = fixed_window.new_metrics()
+  env.process(fixed_window.generate_requests(env, parameters.avg_arrival_speed, store, metrics, RandomStreams(rng)))
+  env.process(fixed_window.fixed_widow_processor(env, parameters.window_size, parameters.max_threshold, store, metrics))
+  env.run(until = entities * parameters.avg_arrival_speed)
+  return metrics["requests_submitted"], (metrics["requests_processed"], metrics["queue_delays"].mean)
+
+def run_nurse(model, entities, rng) -> tuple:
+  parameters = model.Parameters(7, 6, 1, entities * 7, 1)
+  sim = model.NurseConsultationModel(parameters, 1, rng)
+  sim.run()
+  return sim.patient_counter, (len(sim.results), sim.average_wait_time)
+
+def run_tandem(model, entities, rng) -> tuple:
+  env = model.simpy.Environment()
+  receptionists = model.simpy.Resource(env, capacity = model.NUM_RECPTIONISTS)
+  nurses = model.simpy.Resource(env, capacity = model.NUM_NURSES)
+  waits = RunningStats()
+  env.process(model.patient_builder(env, model.AVG_PATIENT_ARRIVAL_TIME, model.AVG_REGISTRATION_TIME,
+    model.AVG_EVALUATION_TIME, receptionists, nurses, RandomStreams(rng), waits))
+  env.run(until = entities * model.AVG_PATIENT_ARRIVAL_TIME)
+  return waits.count, (waits.count, waits.mean)
+
+def run_route_to_doctor(model, entities, rng) -> tuple:
+  result = model.run_model(1, rng, model.Parameters(sim_duration = entities * model.AVG_PATIENT_ARRIVAL_TIME))
+  return result.patients_seen, tuple(result)
+
+def run_vaccine(model, entities, rng) -> tuple:
+  parameters = model.ModelParameters()
+  parameters = parameters._replace(sim_duration = entities * parameters.candidate_arrival_time)
+  result = model.run_model(1, rng, parameters)
+  return result.candidates_arrived, tuple(result)
+
+MODELS = {
+  # Name => (the script to load or None, the function that runs it).
+  "fixed-window": (None, run_fixed_window),
+  "nurse": (("linear-examples", "nurse-example-oo.py"), run_nurse),
+  "tandem": (("linear-examples", "nurse-with-registration-example.py"), run_tandem),
+  "route-to-doctor": (("non-linear-examples", "route-to-doctor.py"), run_route_to_doctor),
+  "vaccine": (("vaccine-apt-scheduling.py",), run_vaccine)
+}
+
+def time_backend(script, run, backend) -> tuple:
+  """Returns the entities per second and the results of the fastest run."""
+  best = None
+  for _ in range(REPEATS):
+    if script is None:
+      target = backend
+    else:
+      target = script
+      script.simpy = backend
+    started = time.perf_counter()
+    entities, results = run(target, ENTITIES, np.random.default_rng(SEED))
+    elapsed = time.perf_counter() - started
+    if best is None or elapsed < best[0]:
+      best = (elapsed, entities, results)
+  elapsed, entities, results = best
+  return entities / elapsed, results
+
+def main():
+  print(f"About {ENTITIES:,} entities per run, the best of {REPEATS} runs.")
+  print(f"{'Model':<16} {'SimPy entities/s':>17} {'Kernel entities/s':>18} {'Speedup':>8}  Results")
+  for name, (path, run) in MODELS.items():
+    try:
+      script = None if path is None else load_script(*path)
+      simpy_rate, simpy_results = time_backend(script, run, simpy)
+      kernel_rate, kernel_results = time_backend(script, run, kernel)
+    except Exception as error:
+      print(f"{name:<16} failed: {type(error).__name__}: {error}")
+      continue
+    same = "identical" if np.allclose(simpy_results, kernel_results, rtol=1e-12) else (
+      f"DIFFERENT: {simpy_results} vs {kernel_results}")
+    print(f"{name:<16} {simpy_rate:>17,.0f} {kernel_rate:>18,.0f} {kernel_rate / simpy_rate:>7.2f}x  {same}")
+
+if __name__ == "__main__":
+  main()
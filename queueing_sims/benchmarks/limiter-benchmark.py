@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+
+###############################################################################
+# Head to head comparison of the rate limiter algorithms in limiters.py.
+#
+# Every algorithm sees the same exponential arrivals in each scenario and is
+# configured to allow MAX_THRESHOLD requests per WINDOW_SIZE seconds. For
+# each one it reports:
+# - Throughput: requests processed per minute of simulated time.
+# - Queue delay: mean, p95 and p99 seconds from arrival to processing.
+# - Burstiness: the most requests let through in any 1 second, and in any
+#   sliding window of WINDOW_SIZE seconds (a limiter is only strict if this
+#   is at most MAX_THRESHOLD).
+# - Wall clock cost: microseconds per simulated request for the whole SimPy
+#   run, and for just the limiter's acquire.
+###############################################################################
+
+import time
+
+import numpy as np
+
+from queueing_sims import limiters
+from queueing_sims.fixed_window_vectorized import exponential_arrival_times
+
+DURATION = 60 * 60 # 1 hour in seconds.
+WINDOW_SIZE = 60
+MAX_THRESHOLD = 100
+SCENARIOS = {
+  # Name => average seconds between requests.
+  "under limit (80/min)": 60 / 80,
+  "overloaded (500/min)": 60 / 500
+}
+
+class RecordingLimiter(limiters.RateLimiter):
+  """Wraps a limiter and remembers when it let each request through."""
+  def __init__(self, limiter: limiters.RateLimiter) -> None:
+    super().__init__(limiter.max_threshold, limiter.window_size)
+    self.limiter = limiter
+    self.admitted = []
+
+  def acquire(self, now: float) -> float:
+    wait = self.limiter.acquire(now)
+    self.admitted.append(now + wait)
+    return wait
+
+def max_in_any_interval(times: np.ndarray, width: float) -> int:
+  if len(times) == 0:
+    return 0
+  return int((np.searchsorted(times, times + width, side="left") - np.arange(len(times))).max())
+
+def time_acquire(limiter: limiters.RateLimiter, arrivals: np.ndarray) -> float:
+  """Microseconds per request spent in acquire, without SimPy."""
+  now = 0.0
+  started = time.perf_counter()
+  for arrival in arrivals.tolist():
+    if arrival > now:
+      now = arrival
+    now += limiter.acquire(now)
+  return (time.perf_counter() - started) / len(arrivals) * 1e6
+
+def main():
+  rng = np.random.default_rng(42)
+  for scenario, avg_arrival_speed in SCENARIOS.items():
+    inter_arrival_times = exponential_arrival_times(DURATION, avg_arrival_speed, rng)
+    arrivals = np.cumsum(inter_arrival_times)
+    arrivals = arrivals[arrivals < DURATION]
+    print(f"\n{scenario}: {len(arrivals)} requests over {DURATION} seconds, "
+          f"limit {MAX_THRESHOLD} per {WINDOW_SIZE} seconds")
+    print(f"{'Algorithm':<24} {'Processed/min':>13} {'Delay mean':>11} {'p95':>9} {'p99':>9} "
+          f"{'Max/1s':>7} {'Max/window':>11} {'us/req sim':>11} {'us/req limiter':>15}")
+
+    for name, limiter_class in limiters.LIMITERS.items():
+      recorder = RecordingLimiter(limiter_class(MAX_THRESHOLD, WINDOW_SIZE))
+      metrics = limiters.simulate(recorder, DURATION, inter_arrival_times = inter_arrival_times.tolist())
+      admitted = np.array(recorder.admitted)
+      admitted = admitted[admitted < DURATION]
+
+      started = time.perf_counter()
+      limiters.simulate(limiter_class(MAX_THRESHOLD, WINDOW_SIZE), DURATION,
+                        inter_arrival_times = inter_arrival_times.tolist())
+      sim_cost = (time.perf_counter() - started) / metrics["requests_submitted"] * 1e6
+      limiter_cost = time_acquire(limiter_class(MAX_THRESHOLD, WINDOW_SIZE), arrivals)
+
+      delays = metrics["queue_delays"]
+      print(f"{name:<24} {metrics['requests_processed'] / (DURATION / 60):>13.1f} {delays.mean:>11.2f} "
+            f"{delays.percentile(95):>9.2f} {delays.percentile(99):>9.2f} "
+            f"{max_in_any_interval(admitted, 1):>7} {max_in_any_interval(admitted, WINDOW_SIZE):>11} "
+            f"{sim_cost:>11.2f} {limiter_cost:>15.3f}")
+
+if __name__ == "__main__":
+  main()
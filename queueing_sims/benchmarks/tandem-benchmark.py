@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+
+###############################################################################
+# Compares the SimPy registration -> nurse model in
+# linear-examples/nurse-with-registration-example.py against the tandem
+# engine at NUM_NURSES of 1, 10 and 100.
+#
+# The arrival rate is scaled with the number of nurses so the nurses stay
+# about 90% busy, and there is one receptionist for every two nurses. The
+# SimPy model's event log is off, as it is by default. Both engines are
+# seeded with SEED.
+###############################################################################
+
+import importlib.util
+import math
+import time
+from pathlib import Path
+
+import numpy as np
+import simpy
+
+from queueing_sims import tandem
+from queueing_sims.distributions import RandomStreams
+
+SIMPY_PATIENTS = 20_000 # Patients pushed through the SimPy model per scenario.
+TANDEM_PATIENTS = 1_000_000 # Patients pushed through the tandem engine per scenario.
+NURSE_COUNTS = [1, 10, 100]
+NURSE_UTILIZATION = 0.9
+SEED = 42 # Every scenario draws from the same seed, so runs are reproducible.
+
+def load_simpy_model():
+  """Imports the hyphenated nurse-with-registration-example.py script."""
+  path = Path(__file__).parent.parent / "linear-examples" / "nurse-with-registration-example.py"
+  spec = importlib.util.spec_from_file_location("nurse_with_registration_example", path)
+  module = importlib.util.module_from_spec(spec)
+  spec.loader.exec_module(module)
+  return module
+
+def time_simpy(model, arrival_time, receptionists, nurses) -> float:
+  """Returns the number of patients per second the SimPy model handles."""
+  env = simpy.Environment()
+  receptionist = simpy.Resource(env, capacity=receptionists)
+  nurse = simpy.Resource(env, capacity=nurses)
+  env.process(model.patient_builder(env, arrival_time, model.AVG_REGISTRATION_TIME,
+    model.AVG_EVALUATION_TIME, receptionist, nurse, RandomStreams(SEED)))
+  started = time.perf_counter()
+  env.run(until = SIMPY_PATIENTS * arrival_time)
+  elapsed = time.perf_counter() - started
+  return SIMPY_PATIENTS / elapsed
+
+def time_tandem(model, arrival_time, receptionists, nurses) -> float:
+  """Returns the number of patients per second the tandem engine handles."""
+  rng = np.random.default_rng(SEED)
+  started = time.perf_counter()
+  inter_arrival_times = rng.exponential(arrival_time, TANDEM_PATIENTS)
+  registration_times = rng.exponential(model.AVG_REGISTRATION_TIME, TANDEM_PATIENTS)
+  evaluation_times = rng.exponential(model.AVG_EVALUATION_TIME, TANDEM_PATIENTS)
+  tandem.simulate(inter_arrival_times, [registration_times, evaluation_times], [receptionists, nurses])
+  elapsed = time.perf_counter() - started
+  return TANDEM_PATIENTS / elapsed
+
+def main():
+  model = load_simpy_model()
+  print(f"{'Nurses':>8} {'Receptionists':>14} {'SimPy patients/s':>18} {'Tandem patients/s':>18} {'Speedup':>9}")
+  for nurses in NURSE_COUNTS:
+    receptionists = math.ceil(nurses / 2)
+    arrival_time = model.AVG_EVALUATION_TIME / (NURSE_UTILIZATION * nurses)
+    simpy_rate = time_simpy(model, arrival_time, receptionists, nurses)
+    tandem_rate = time_tandem(model, arrival_time, receptionists, nurses)
+    print(f"{nurses:>8} {receptionists:>14} {simpy_rate:>18,.0f} {tandem_rate:>18,.0f} {tandem_rate / simpy_rate:>8.1f}x")
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,123 @@
+###############################################################################
+# Compares scenarios of a model with variance reduction.
+#
+# Every scenario is a parameters NamedTuple for the same run_model(run, rng,
+# parameters) used by run_replications. One field of the RunResult is
+# compared against the first (baseline) scenario:
+# - independent: every scenario gets its own seeds. The difference is a
+#   Welch interval.
+# - crn: common random numbers. Run n of every scenario gets the same seed,
+#   so as long as the model draws from RandomStreams each scenario sees the
+#   same arrivals and service times. The difference is a paired interval
+#   over the per-run differences, which is much narrower when the scenarios
+#   respond to the randomness in the same way.
+# - antithetic: common random numbers, and every run is paired with its
+#   antithetic twin (the same seed with mirrored streams). An observation is
+#   the average of the pair. Each observation costs two runs.
+#
+# Usage
+#   comparison = compare_scenarios(run_model, {"1 nurse": one, "2 nurses": two},
+#                                  "average_wait", number_of_runs = 20, master_seed = 42)
+#   print(comparison.report())
+###############################################################################
+
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Callable, NamedTuple, Optional
+
+import numpy as np
+
+from queueing_sims.confidence import ConfidenceInterval, confidence_interval, welch_interval
+from queueing_sims.replications import replication_seeds, run_replication
+from queueing_sims.streaming_stats import RunningStats
+
+METHODS = ("independent", "crn", "antithetic")
+
+class ScenarioComparison(NamedTuple):
+  scenario: str
+  interval: ConfidenceInterval # Of the metric.
+  difference: Optional[ConfidenceInterval] # Scenario - baseline. None for the baseline.
+
+class Comparison(NamedTuple):
+  metric: str
+  method: str
+  runs: int # Model runs per scenario.
+  scenarios: list # ScenarioComparisons, the baseline first.
+  observations: dict # Scenario => an array of the metric per observation, in run order.
+
+  def report(self) -> str:
+    baseline = self.scenarios[0].scenario
+    plus_minus = f"± {self.scenarios[0].interval.confidence:.0%}"
+    lines = [f"{self.metric} ({self.method}, {self.runs} runs per scenario)",
+      f"{'Scenario':<24} {'Mean':>12} {plus_minus:>10} {'Δ vs ' + baseline:>22} {plus_minus:>10}  Decision"]
+    for scenario in self.scenarios:
+      line = f"{scenario.scenario:<24} {scenario.interval.mean:>12.4g} {scenario.interval.half_width:>10.3g}"
+      if scenario.difference is not None:
+        difference = scenario.difference
+        decision = "no difference" if difference.lower <= 0 <= difference.upper else (
+          "higher" if difference.lower > 0 else "lower")
+        line += f" {difference.mean:>22.4g} {difference.half_width:>10.3g}  {decision}"
+      lines.append(line)
+    return "\n".join(lines)
+
+def _seeds(method: str, scenario_count: int, number_of_runs: int, master_seed: Optional[int]) -> list:
+  """The seeds of each scenario's runs."""
+  if method == "independent":
+    return [child.spawn(number_of_runs) for child in np.random.SeedSequence(master_seed).spawn(scenario_count)]
+  return [replication_seeds(master_seed, number_of_runs)] * scenario_count
+
+def compare_scenarios(run_model: Callable, scenarios: dict, metric: str, number_of_runs: int,
+                      master_seed: Optional[int] = None, method: str = "crn", confidence: float = 0.95,
+                      max_workers: Optional[int] = None) -> Comparison:
+  """
+  Runs number_of_runs observations of every scenario (a dictionary of name
+  => parameters, the baseline first) and compares the metric field of their
+  results. method is one of METHODS.
+  """
+  if method not in METHODS:
+    raise ValueError(f"The method must be one of {', '.join(METHODS)}.")
+  if len(scenarios) < 2:
+    raise ValueError("Comparing needs at least two scenarios.")
+  names = list(scenarios)
+  seeds = _seeds(method, len(names), number_of_runs, master_seed)
+  twins = (False, True) if method == "antithetic" else (False,)
+  tasks = [(scenario, run, twin) for scenario in range(len(names))
+    for run in range(1, number_of_runs + 1) for twin in twins]
+  values = np.empty((len(names), number_of_runs, len(twins)))
+
+  def task_arguments(scenario, run, twin):
+    return (run_model, run, seeds[scenario][run - 1], (scenarios[names[scenario]],), twin)
+
+  max_workers = os.cpu_count() if max_workers is None else max_workers
+  if max_workers == 1:
+    for scenario, run, twin in tasks:
+      result = run_replication(*task_arguments(scenario, run, twin))
+      values[scenario, run - 1, int(twin)] = getattr(result, metric)
+  else:
+    with ProcessPoolExecutor(max_workers = max_workers) as executor:
+      futures = {executor.submit(run_replication, *task_arguments(*task)): task for task in tasks}
+      try:
+        for future in as_completed(futures):
+          scenario, run, twin = futures[future]
+          values[scenario, run - 1, int(twin)] = getattr(future.result(), metric)
+      finally:
+        for future in futures:
+          future.cancel()
+
+  # An antithetic pair counts as one observation.
+  observations = {name: values[index].mean(axis=1) for index, name in enumerate(names)}
+  baseline = observations[names[0]]
+  compared = []
+  for name in names:
+    interval = confidence_interval(observations[name], confidence)
+    difference = None
+    if name != names[0]:
+      if method == "independent":
+        scenario_stats, baseline_stats = RunningStats(), RunningStats()
+        scenario_stats.extend(observations[name])
+        baseline_stats.extend(baseline)
+        difference = welch_interval(scenario_stats, baseline_stats, confidence)
+      else:
+        difference = confidence_interval(observations[name] - baseline, confidence)
+    compared.append(ScenarioComparison(name, interval, difference))
+  return Comparison(metric, method, number_of_runs * len(twins), compared, observations)
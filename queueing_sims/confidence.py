@@ -0,0 +1,126 @@
+###############################################################################
+# Student t confidence intervals for the mean of a handful of replications,
+# and Welch intervals for the difference between two independent sets.
+#
+# SciPy isn't a dependency, so the t distribution's quantile is computed
+# here: its CDF via the regularized incomplete beta function (a continued
+# fraction) and the quantile by bisection. That's plenty fast for the few
+# intervals a run needs.
+###############################################################################
+
+import math
+from typing import NamedTuple
+
+import numpy as np
+
+from queueing_sims.streaming_stats import RunningStats
+
+class ConfidenceInterval(NamedTuple):
+  mean: float
+  half_width: float
+  confidence: float
+  observations: int # The values (runs, batches) the interval is from.
+
+  @property
+  def lower(self) -> float:
+    return self.mean - self.half_width
+
+  @property
+  def upper(self) -> float:
+    return self.mean + self.half_width
+
+  @property
+  def relative_half_width(self) -> float:
+    """The half-width as a fraction of the mean's magnitude."""
+    if self.mean == 0:
+      return 0.0 if self.half_width == 0 else math.inf
+    return self.half_width / abs(self.mean)
+
+  def __str__(self) -> str:
+    return f"{self.mean:.4g} ± {self.half_width:.4g} ({self.confidence:.0%}, n={self.observations})"
+
+def _incomplete_beta_fraction(a: float, b: float, x: float) -> float:
+  """The continued fraction of the incomplete beta function (modified Lentz)."""
+  tiny = 1e-300
+  c = 1.0
+  d = 1.0 - (a + b) * x / (a + 1)
+  d = 1.0 / (d if abs(d) > tiny else tiny)
+  fraction = d
+  for m in range(1, 300):
+    for numerator in (m * (b - m) * x / ((a + 2 * m - 1) * (a + 2 * m)),
+                      -(a + m) * (a + b + m) * x / ((a + 2 * m) * (a + 2 * m + 1))):
+      d = 1.0 + numerator * d
+      d = 1.0 / (d if abs(d) > tiny else tiny)
+      c = 1.0 + numerator / c
+      c = c if abs(c) > tiny else tiny
+      fraction *= c * d
+    if abs(c * d - 1.0) < 1e-15:
+      break
+  return fraction
+
+def regularized_incomplete_beta(a: float, b: float, x: float) -> float:
+  if x <= 0:
+    return 0.0
+  if x >= 1:
+    return 1.0
+  log_front = math.lgamma(a + b) - math.lgamma(a) - math.lgamma(b) + a * math.log(x) + b * math.log1p(-x)
+  # The continued fraction converges quickly on this side of the mode.
+  if x < (a + 1) / (a + b + 2):
+    return math.exp(log_front) * _incomplete_beta_fraction(a, b, x) / a
+  return 1.0 - math.exp(log_front) * _incomplete_beta_fraction(b, a, 1 - x) / b
+
+def student_t_cdf(t: float, degrees_of_freedom: float) -> float:
+  tail = 0.5 * regularized_incomplete_beta(degrees_of_freedom / 2, 0.5,
+    degrees_of_freedom / (degrees_of_freedom + t * t))
+  return 1.0 - tail if t > 0 else tail
+
+def student_t_quantile(p: float, degrees_of_freedom: float) -> float:
+  """The t such that P(T <= t) = p."""
+  if not 0 < p < 1:
+    raise ValueError("The probability must be between 0 and 1.")
+  if p < 0.5:
+    return -student_t_quantile(1 - p, degrees_of_freedom)
+  low, high = 0.0, 1.0
+  while student_t_cdf(high, degrees_of_freedom) < p:
+    low, high = high, 2 * high
+  for _ in range(100):
+    middle = (low + high) / 2
+    if student_t_cdf(middle, degrees_of_freedom) < p:
+      low = middle
+    else:
+      high = middle
+    if high - low < 1e-12 * high:
+      break
+  return (low + high) / 2
+
+def interval_from_stats(stats: RunningStats, confidence: float = 0.95) -> ConfidenceInterval:
+  """The interval for the mean of the values stats has seen. Infinite with fewer than two."""
+  if stats.count < 2:
+    return ConfidenceInterval(stats.mean if stats.count else math.nan, math.inf, confidence, stats.count)
+  t = student_t_quantile((1 + confidence) / 2, stats.count - 1)
+  return ConfidenceInterval(stats.mean, t * stats.stdev / math.sqrt(stats.count), confidence, stats.count)
+
+def confidence_interval(values, confidence: float = 0.95) -> ConfidenceInterval:
+  """The Student t interval for the mean of independent values."""
+  stats = RunningStats()
+  stats.extend(np.asarray(values, dtype=np.float64))
+  return interval_from_stats(stats, confidence)
+
+def welch_interval(first: RunningStats, second: RunningStats, confidence: float = 0.95) -> ConfidenceInterval:
+  """
+  The interval for the difference of the means, first - second, of two
+  independent samples with possibly unequal variances (Welch).
+  """
+  difference = first.mean - second.mean
+  count = min(first.count, second.count)
+  if count < 2:
+    return ConfidenceInterval(difference if count else math.nan, math.inf, confidence, count)
+  first_term = first.variance / first.count
+  second_term = second.variance / second.count
+  standard_error = math.sqrt(first_term + second_term)
+  if standard_error == 0:
+    return ConfidenceInterval(difference, 0.0, confidence, count)
+  degrees_of_freedom = (first_term + second_term) ** 2 / (
+    first_term ** 2 / (first.count - 1) + second_term ** 2 / (second.count - 1))
+  t = student_t_quantile((1 + confidence) / 2, degrees_of_freedom)
+  return ConfidenceInterval(difference, t * standard_error, confidence, count)
@@ -0,0 +1,242 @@
+###############################################################################
+# Named random number streams that draw their variates in blocks.
+#
+# Calling random.expovariate once per arrival or service costs a Python RNG
+# call every time. A Stream instead draws block_size variates at once from
+# its own NumPy Generator and hands them out one by one, so sample() is just
+# a step through a list of floats (about 4x cheaper than expovariate). When a
+# block runs out the next one is drawn in a single vectorized call.
+#
+# Every distribution has the same interface, sample(rng, size, antithetic),
+# and returns an array:
+# - Exponential(mean)
+# - Uniform(low, high)
+# - Lognormal(mean, stdev): the mean and standard deviation of the variate
+#   itself, not of its logarithm.
+# - Empirical(values, weights): resamples observed values.
+# - Trace(values): replays recorded values in order. It ignores the rng and
+#   raises TraceExhausted when it runs out unless it loops.
+# Arrivals whose rate varies over time are in arrivals.py.
+#
+# RandomStreams hands out one Stream per name (arrivals, registration,
+# routing, ...). A stream's Generator is seeded from the master seed and the
+# stream's name only, so adding a stream, or drawing more from one, never
+# changes the values another stream produces. RandomStreams can also replay
+# and record traces; see traces.py.
+#
+# Variance reduction
+# - Common random numbers: runs of different scenarios given the same seed
+#   see the same values on every stream. Draw all of an entity's values when
+#   it's created, so the n-th entity gets the same values in every scenario
+#   even if entities are served in a different order.
+# - Antithetic variates: the distributions are sampled by inversion, so a
+#   stream can be mirrored by using 1 - U for every uniform U (and -Z for a
+#   normal Z). RandomStreams mirrors its streams when it's seeded with an
+#   AntitheticGenerator, which replications.seed_replication creates for the
+#   antithetic twin of a run. Trace streams aren't mirrored.
+#
+# Usage
+#   streams = RandomStreams(seed)
+#   arrivals = streams.add("arrivals", Exponential(5))
+#   yield env.timeout(arrivals.sample())
+###############################################################################
+
+import math
+import operator
+import zlib
+from functools import partial
+from itertools import chain, islice
+from typing import NamedTuple, Optional
+
+import numpy as np
+
+BLOCK_SIZE = 65536 # The number of variates drawn at a time.
+
+# The smallest uniform handed out, so inverting a CDF never hits log(0).
+_SMALLEST_UNIFORM = 2.0 ** -53
+
+class AntitheticGenerator(np.random.Generator):
+  """A Generator whose RandomStreams are the mirror image of an ordinary one's."""
+
+def uniforms(rng: np.random.Generator, size: int, antithetic: bool = False) -> np.ndarray:
+  """Uniforms strictly between 0 and 1, mirrored if antithetic."""
+  values = rng.random(size)
+  if antithetic:
+    np.subtract(1.0, values, out=values)
+  return np.maximum(values, _SMALLEST_UNIFORM, out=values)
+
+class Exponential(NamedTuple):
+  mean: float
+
+  def sample(self, rng: np.random.Generator, size: int, antithetic: bool = False) -> np.ndarray:
+    values = uniforms(rng, size, antithetic)
+    np.log(values, out=values)
+    return np.multiply(values, -self.mean, out=values)
+
+class Uniform(NamedTuple):
+  low: float = 0.0
+  high: float = 1.0
+
+  def sample(self, rng: np.random.Generator, size: int, antithetic: bool = False) -> np.ndarray:
+    return self.low + (self.high - self.low) * uniforms(rng, size, antithetic)
+
+class Lognormal(NamedTuple):
+  mean: float
+  stdev: float
+
+  def sample(self, rng: np.random.Generator, size: int, antithetic: bool = False) -> np.ndarray:
+    # Convert the mean and variance of the variate to those of its logarithm.
+    sigma_squared = math.log(1 + (self.stdev / self.mean) ** 2)
+    mu = math.log(self.mean) - sigma_squared / 2
+    normals = rng.standard_normal(size)
+    if antithetic:
+      np.negative(normals, out=normals)
+    return np.exp(mu + math.sqrt(sigma_squared) * normals)
+
+class Empirical:
+  """Draws from observed values, optionally weighted."""
+  def __init__(self, values, weights = None) -> None:
+    self.values = np.asarray(values, dtype=np.float64)
+    if len(self.values) == 0:
+      raise ValueError("An empirical distribution needs at least one value.")
+    if weights is None:
+      weights = np.ones(len(self.values))
+    weights = np.asarray(weights, dtype=np.float64)
+    self.probabilities = weights / weights.sum()
+    self._cumulative = np.cumsum(self.probabilities)
+
+  def sample(self, rng: np.random.Generator, size: int, antithetic: bool = False) -> np.ndarray:
+    indexes = np.searchsorted(self._cumulative, uniforms(rng, size, antithetic), side="right")
+    return self.values[np.minimum(indexes, len(self.values) - 1)]
+
+class TraceExhausted(IndexError):
+  """Raised when a trace that doesn't loop has no values left."""
+
+class Trace:
+  """Replays recorded values in order, from the start again if loop is set."""
+  def __init__(self, values, loop: bool = False) -> None:
+    self.values = np.asarray(values, dtype=np.float64)
+    self.loop = loop
+    self._position = 0
+
+  def sample(self, rng: np.random.Generator, size: int, antithetic: bool = False) -> np.ndarray:
+    if self._position == len(self.values):
+      if not self.loop or len(self.values) == 0:
+        raise TraceExhausted("The trace has no values left.")
+      self._position = 0
+    values = self.values[self._position:self._position + size]
+    self._position += len(values)
+    return values
+
+def _raise(error: Exception):
+  """An iterator that raises error when it's stepped."""
+  raise error
+  yield
+
+class Stream:
+  """Variates from one distribution, drawn block_size at a time."""
+  def __init__(self, name: str, distribution, rng: np.random.Generator, block_size: int = BLOCK_SIZE,
+               antithetic: bool = False, recorder = None) -> None:
+    self.name = name
+    self.distribution = distribution
+    self.rng = rng
+    self.block_size = block_size
+    self.antithetic = antithetic
+    self.recorder = recorder # A traces.TraceRecorder that gets every block drawn.
+    self._drawn = 0
+    self._block = iter(())
+    self._values = chain.from_iterable(self._blocks())
+    # next() on the chain is a C call, so sample() costs about as much as
+    # indexing a list.
+    self.sample = partial(next, self._values)
+
+  def _blocks(self):
+    while True:
+      try:
+        block = self.distribution.sample(self.rng, self.block_size, self.antithetic)
+      except TraceExhausted as exhausted:
+        # Raised from an iterator in the chain rather than from here, so
+        # this generator and the chain live on and every later sample()
+        # raises TraceExhausted again instead of StopIteration.
+        yield _raise(TraceExhausted(*exhausted.args))
+        continue
+      if self.recorder is not None:
+        self.recorder.write(self.name, block)
+      self._drawn += len(block)
+      # The chain steps through this same iterator, so its length says how
+      # much of the block is left.
+      self._block = iter(block.tolist())
+      yield self._block
+
+  @property
+  def consumed(self) -> int:
+    """The number of variates handed out so far."""
+    return self._drawn - operator.length_hint(self._block)
+
+  def _until_exhausted(self, count: int):
+    try:
+      yield from islice(self._values, count)
+    except TraceExhausted:
+      return
+
+  def take(self, count: int) -> np.ndarray:
+    """
+    The next count variates as an array, continuing where sample() left off.
+    Fewer are returned if a trace runs out.
+    """
+    if isinstance(self.distribution, Trace):
+      return np.fromiter(self._until_exhausted(count), dtype=np.float64)
+    return np.fromiter(self._values, dtype=np.float64, count=count)
+
+class RandomStreams:
+  """
+  Creates named streams that are independent of each other. The seed can be
+  None, an int, a SeedSequence or a Generator, such as the one
+  replications.run_replications hands each run. antithetic mirrors every
+  stream and defaults to whether the seed is an AntitheticGenerator.
+
+  trace maps stream names to values to replay instead of drawing from the
+  stream's distribution, such as the columns traces.read_trace returns.
+  recorder is a traces.TraceRecorder that records every stream's values;
+  close() writes it.
+  """
+  def __init__(self, seed = None, block_size: int = BLOCK_SIZE, antithetic: Optional[bool] = None,
+               trace: Optional[dict] = None, recorder = None) -> None:
+    self.antithetic = isinstance(seed, AntitheticGenerator) if antithetic is None else antithetic
+    self.trace = {} if trace is None else trace
+    self.recorder = recorder
+    if isinstance(seed, np.random.Generator):
+      seed = np.random.SeedSequence(seed.integers(2**63, size=4).tolist())
+    elif not isinstance(seed, np.random.SeedSequence):
+      seed = np.random.SeedSequence(seed)
+    self.seed_sequence = seed
+    self.block_size = block_size
+    self._streams = {}
+
+  def rng(self, name: str) -> np.random.Generator:
+    """A new Generator for the named stream, always starting at the same state."""
+    key = zlib.crc32(name.encode("utf-8"))
+    seed = np.random.SeedSequence(self.seed_sequence.entropy,
+      spawn_key = self.seed_sequence.spawn_key + (key,))
+    return np.random.default_rng(seed)
+
+  def add(self, name: str, distribution, block_size: Optional[int] = None) -> Stream:
+    """Creates the named stream, starting it over if it already exists."""
+    block_size = self.block_size if block_size is None else block_size
+    if name in self.trace:
+      distribution = Trace(self.trace[name])
+    stream = Stream(name, distribution, self.rng(name), block_size, self.antithetic, self.recorder)
+    self._streams[name] = stream
+    return stream
+
+  def close(self) -> None:
+    """Writes the recorded trace, cut to the values each stream handed out."""
+    if self.recorder is not None:
+      self.recorder.close({name: stream.consumed for name, stream in self._streams.items()})
+      self.recorder = None
+
+  def __getitem__(self, name: str) -> Stream:
+    return self._streams[name]
+
+  def __contains__(self, name: str) -> bool:
+    return name in self._streams
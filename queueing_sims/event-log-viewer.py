@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+
+###############################################################################
+# Pretty-prints a simulation event log written by event_log.EventLog.
+#
+# Examples
+#   event-log-viewer.py run.evlog
+#   event-log-viewer.py run.evlog --station nurse --event started
+#   event-log-viewer.py run.evlog --entity 42
+#   event-log-viewer.py run.evlog --since 60 --until 120 --limit 100
+###############################################################################
+
+import argparse
+import itertools
+
+import numpy as np
+
+from queueing_sims.event_log import format_events, read_log
+
+def main():
+  parser = argparse.ArgumentParser(description="Filter and pretty-print a simulation event log.")
+  parser.add_argument("path")
+  parser.add_argument("--entity", type=int, action="append", help="Only this entity. Can be repeated.")
+  parser.add_argument("--station", action="append", help="Only this station. Can be repeated.")
+  parser.add_argument("--event", action="append", help="Only this event type. Can be repeated.")
+  parser.add_argument("--since", type=float, help="Only events at or after this time.")
+  parser.add_argument("--until", type=float, help="Only events before this time.")
+  parser.add_argument("--limit", type=int, help="Stop after this many events.")
+  parser.add_argument("--summary", action="store_true", help="Only count the events per station and type.")
+  args = parser.parse_args()
+
+  header, records = read_log(args.path)
+  keep = np.ones(len(records), dtype=bool)
+  if args.entity:
+    keep &= np.isin(records["entity"], args.entity)
+  if args.station:
+    keep &= np.isin(records["station"], [header["stations"].index(name) for name in args.station])
+  if args.event:
+    keep &= np.isin(records["event"], [header["events"].index(name) for name in args.event])
+  if args.since is not None:
+    keep &= records["time"] >= args.since
+  if args.until is not None:
+    keep &= records["time"] < args.until
+
+  if args.summary:
+    print(f"{len(records)} events, {keep.sum()} matching")
+    kept = records[keep]
+    width = max([len(name) for name in header["stations"]] + [7])
+    for station_id, station in enumerate(header["stations"]):
+      for event_id, event in enumerate(header["events"]):
+        count = np.count_nonzero((kept["station"] == station_id) & (kept["event"] == event_id))
+        if count:
+          print(f"{station:<{width}}  {event:<10} {count}")
+    return
+
+  for line in itertools.islice(format_events(header, records, keep), args.limit):
+    print(line)
+
+if __name__ == "__main__":
+  main()
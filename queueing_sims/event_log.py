@@ -0,0 +1,161 @@
+###############################################################################
+# A structured event log for the simulations, off by default.
+#
+# Printing an f-string for every patient at every station makes terminal
+# I/O the bottleneck of a long run. Models log events instead: a time, an
+# entity id (e.g. the patient), a station and an event type. Nothing is
+# formatted while the simulation runs.
+#
+# - When the log is off, or an event is below the log's level, info() and
+#   debug() are a function that does nothing.
+# - When it's on, each event is a fixed-width 24 byte record. Records are
+#   buffered and written to the file buffer_records at a time. Engines that
+#   compute their events as arrays log them with extend().
+#
+# The file is a header (the station and event names) followed by the
+# records, so read_log can memory map it and event-log-viewer.py can filter
+# and pretty-print it afterwards.
+#
+# Usage
+#   log = EventLog("run.evlog", stations = ["registration", "nurse"])
+#   nurse = log.station_id("nurse")
+#   log.info(env.now, patient_id, nurse, STARTED)
+#   log.close()
+###############################################################################
+
+import json
+import os
+import struct
+from typing import Iterator, Optional
+
+import numpy as np
+
+# Levels, as in the logging module. A log records the events at or above its level.
+DEBUG = 10
+INFO = 20
+OFF = 100
+LEVELS = {"debug": DEBUG, "info": INFO, "off": OFF}
+
+# The standard event types.
+ARRIVED = 0 # Joined a station's queue.
+STARTED = 1 # Left the queue and started being served.
+FINISHED = 2 # Finished being served.
+EVENTS = ("arrived", "started", "finished")
+
+RECORD = np.dtype([("time", "<f8"), ("entity", "<i8"), ("station", "<i4"), ("event", "<i4")])
+MAGIC = b"QSEVLOG1"
+BUFFER_RECORDS = 65536
+
+def _ignore(time, entity, station, event) -> None:
+  pass
+
+class EventLog:
+  """
+  Logs events to path at level ("debug", "info" or "off") or above. With no
+  path the log is off. stations and events name the ids passed to info()
+  and debug().
+  """
+  def __init__(self, path = None, level: str = "info", stations = (), events = EVENTS,
+               buffer_records: int = BUFFER_RECORDS) -> None:
+    self.path = path
+    self.stations = list(stations)
+    self.events = list(events)
+    self.level = OFF if path is None else LEVELS[level]
+    self.buffer_records = buffer_records
+    self._pending = []
+    self._file = None
+    if self.enabled:
+      self._file = open(path, "wb")
+      header = json.dumps({"stations": self.stations, "events": self.events}).encode("utf-8")
+      self._file.write(MAGIC + struct.pack("<I", len(header)) + header)
+    self.debug = self._record if self.level <= DEBUG else _ignore
+    self.info = self._record if self.level <= INFO else _ignore
+
+  @property
+  def enabled(self) -> bool:
+    return self.level < OFF
+
+  def station_id(self, name: str) -> int:
+    return self.stations.index(name)
+
+  def event_id(self, name: str) -> int:
+    return self.events.index(name)
+
+  def _record(self, time, entity, station, event) -> None:
+    pending = self._pending
+    pending.append((time, entity, station, event))
+    if len(pending) >= self.buffer_records:
+      self.flush()
+
+  def extend(self, times, entities, stations, events, level: str = "info") -> None:
+    """
+    Logs a batch of events at once, for engines that compute them as arrays.
+    The arguments are arrays, or a single station or event for all of them.
+    """
+    if self.level > LEVELS[level]:
+      return
+    records = np.empty(len(times), dtype=RECORD)
+    records["time"] = times
+    records["entity"] = entities
+    records["station"] = stations
+    records["event"] = events
+    self.flush()
+    self._file.write(records.tobytes())
+
+  def flush(self) -> None:
+    if self._pending and self._file is not None:
+      self._file.write(np.array(self._pending, dtype=RECORD).tobytes())
+      self._pending.clear()
+
+  def close(self) -> None:
+    if self._file is not None:
+      self.flush()
+      self._file.close()
+      self._file = None
+
+  def __enter__(self) -> "EventLog":
+    return self
+
+  def __exit__(self, *exception) -> None:
+    self.close()
+
+# A log that's always off, for models that aren't given one.
+NULL_LOG = EventLog()
+
+def read_log(path) -> tuple:
+  """Returns the header of a log and its records as a read-only memory mapped array."""
+  with open(path, "rb") as file:
+    if file.read(len(MAGIC)) != MAGIC:
+      raise ValueError(f"{path} is not an event log.")
+    (length,) = struct.unpack("<I", file.read(4))
+    header = json.loads(file.read(length))
+  offset = len(MAGIC) + 4 + length
+  if os.path.getsize(path) == offset:
+    return header, np.empty(0, dtype=RECORD) # memmap can't map zero bytes.
+  return header, np.memmap(path, dtype=RECORD, mode="r", offset=offset)
+
+def format_events(header: dict, records: np.ndarray, keep: Optional[np.ndarray] = None) -> Iterator[str]:
+  """
+  Formats the records as lines of text, only those where keep is True if
+  it's given. A started event shows how long the entity waited since it
+  arrived at the same station.
+  """
+  stations = header["stations"]
+  events = header["events"]
+  width = max([len(name) for name in stations] + [7])
+  arrived = {} # (entity, station) => the time it arrived.
+  keep = np.ones(len(records), dtype=bool) if keep is None else keep
+  for start in range(0, len(records), BUFFER_RECORDS):
+    chunk = records[start:start + BUFFER_RECORDS]
+    kept = keep[start:start + BUFFER_RECORDS].tolist()
+    for (time, entity, station, event), show in zip(chunk.tolist(), kept):
+      key = (entity, station)
+      waited = ""
+      if event == ARRIVED:
+        arrived[key] = time
+      elif event == STARTED and key in arrived:
+        waited = f"  waited {time - arrived.pop(key):.4f}"
+      if show:
+        station_name = stations[station] if 0 <= station < len(stations) else str(station)
+        event_name = events[event] if 0 <= event < len(events) else str(event)
+        yield f"{time:>14.4f}  {station_name:<{width}}  {event_name:<10} entity {entity}{waited}"
@@ -0,0 +1,36 @@
+#!/usr/bin/env python3
+
+###############################################################################
+# Sweeps the fixed window rate limiter simulation over a grid of thresholds,
+# arrival speeds and window sizes for capacity planning.
+#
+# Results are cached in CACHE_DIR, so adding values to the grid only runs
+# the new points, and rerunning an interrupted sweep finishes it. Delete the
+# cache directory to start over.
+###############################################################################
+
+from queueing_sims import fixed_window
+from queueing_sims.sweeps import sweep
+
+# The UOM for time in the simulation is 1 tick = 1 second.
+MINUTE = 60
+BASE_PARAMETERS = fixed_window.Parameters(duration = 60 * 60, window_size = MINUTE, max_threshold = 500,
+                                          avg_arrival_speed = 0.12)
+GRID = {
+  "max_threshold": [100, 250, 500, 750],
+  "avg_arrival_speed": [0.06, 0.12, 0.24], # 1000, 500 and 250 requests/min.
+  "window_size": [MINUTE, 5 * MINUTE]
+}
+NUMBER_OF_RUNS = 5
+MASTER_SEED = 42
+CACHE_DIR = ".sweep-cache"
+
+def main():
+  results = sweep(fixed_window.run_model, BASE_PARAMETERS, GRID, NUMBER_OF_RUNS, MASTER_SEED,
+                  cache_dir = CACHE_DIR)
+  print(f"{(~results['cached']).sum()} of {len(results)} runs computed, the rest came from {CACHE_DIR}.")
+  summary = results.groupby(list(GRID))[["requests_processed", "avg_queue_delay", "p95_queue_delay"]].mean()
+  print(summary.to_string())
+
+if __name__ == "__main__":
+  main()
@@ -9,6 +9,11 @@
 # - The ability to track the queue depth.
 # - A simple CLI UI for observing the simulation behavior.
 #
+# The simulation publishes a snapshot of its metrics every UI_REFRESH_RATE
+# ticks and a renderer thread draws the latest one at a fixed wall-clock
+# rate (see fixed_window_dashboard.py), so the UI doesn't slow down the run
+# it's showing. Run with --no-ui to skip the dashboard.
+#
 # UI
 # - Simulation Progress Bar based on Sim Duration
 # - Inbound Request Rate
@@ -18,25 +23,18 @@
 # - Total Requests Processed
 ###############################################################################
 
-from rich import print
-from rich import box
-from rich.columns import Columns
-from rich.console import Console
-from rich.console import RenderGroup
-from rich.layout import Layout
-from rich.live import Live
-from rich.panel import Panel
-from rich.progress import Progress
-from rich.table import Table
-from rich.text import Text
-import simpy
-
+import argparse
 import datetime
 import math
-from statistics import mean
-import random
+from typing import NamedTuple, Optional
+
+import simpy
 
-console = Console()
+from queueing_sims import fixed_window
+from queueing_sims.backlog import TimestampStore
+from queueing_sims.fixed_window import fixed_widow_processor, generate_requests
+from queueing_sims.limiters import LIMITERS, rate_limited_processor
+from queueing_sims.queue_depth import track
 
 # The UOM for time in the simulation is 1 tick = 1 second.
 MINUTE = 60 # 1 minute is 60 seconds
@@ -48,147 +46,162 @@ WINDOW_SIZE = MINUTE * 1
 AVG_REQUEST_ARRIVAL_SPEED = 0.12
 MAX_THRESHOLD = 100 # The maximum number of requests that can be processed in the window.
 
-UI_REFRESH_RATE = 10 # The number of simulation ticks to update the UI.
-
-metrics = {
-  "current_sim_tick": 0,
-  "requests_submitted": 0,
-  "requests_processed": 0,
-  "threshold_exceeded_wait_times": []
-}
-
-def generate_requests(env, avg_arrival_speed, store):
-  while True:
-    # print("Generator: Request Submitted")
-    store.put(1) #Generate a request.
-    metrics['requests_submitted'] += 1
-    wait_for_next_request_time = random.expovariate(avg_arrival_speed)
-    yield env.timeout(avg_arrival_speed)
-
-def fixed_widow_processor(env, window_size, max_threshold, store):
+UI_REFRESH_RATE = 10 # The number of simulation ticks between metrics snapshots.
+UI_FRAMES_PER_SECOND = 10 # How often, in wall-clock time, the dashboard redraws.
+
+# How the dashboard is driven.
+# - throttled: The simulation publishes snapshots and a renderer thread draws
+#   the latest one UI_FRAMES_PER_SECOND times a second.
+# - on: The simulation redraws the dashboard itself every UI_REFRESH_RATE ticks.
+# - off: Headless. Rich isn't loaded and the final metrics are printed.
+UI_MODE = "throttled"
+UI_MODES = ("throttled", "on", "off")
+
+# None uses the original fixed window processor. Otherwise one of the
+# limiters.LIMITERS algorithms, e.g. "token-bucket".
+RATE_LIMITER = None
+
+class Snapshot(NamedTuple):
+  """The metrics the dashboard shows, as of sim_tick."""
+  sim_tick: int
+  requests_submitted: int
+  requests_processed: int
+  pending_requests: int
+  avg_queue_depth: float # Time-weighted.
+  max_queue_depth: int
+  rate_exceeded_count: int
+  avg_wait_time: float
+
+class SnapshotPublisher:
   """
-  Consumes resources from a store, but limits the rate based on a fixed window.
+  Holds the latest snapshot. Replacing a reference is atomic, so a renderer
+  thread can read latest at any time without locking.
   """
-  window_start, window_end = find_window(env.now, window_size)
-  request_counter = 0 # Tracks the number of requests in the current window.
-  while True:
-    # Process a request
-    # This will wait here until something is actually available.
-    yield store.get()
-
-    request_counter += 1
-    now = env.now
-    metrics["requests_processed"] += 1
-
-    # Has the window ended? If so, calculate the new window and reset the counter.
-    if now > window_end:
-      request_counter = 0
-      window_start,window_end = find_window(now, window_size)
-
-    # Has the maximum threshold been exceeded? If so, wait until the window is over.
-    if request_counter > max_threshold:
-      request_counter = 0
-      wait = window_end - now
-      if (wait > 0):
-        # print(f"Subscriber: Rate exceeded, resting for {wait}")
-        metrics["threshold_exceeded_wait_times"].append(wait)
-        yield env.timeout(wait)
-
-def find_window(now: int, window_size: int ) -> tuple[int, int]:
-  offset, extra = divmod(math.floor(now), window_size)
-  window_start = offset * window_size 
-  window_end = window_start + window_size 
-  return window_start, window_end
-
-def update_ui(env, store, ui_layout, sim_progress, sim_task):
+  def __init__(self) -> None:
+    self.latest: Optional[Snapshot] = None
+    self.published = 0
+
+  def get_latest(self) -> Optional[Snapshot]:
+    """The latest snapshot, or None before the first publish."""
+    return self.latest
+
+  def publish(self, env, store, metrics) -> Snapshot:
+    queue_depth = metrics["queue_depth"]
+    wait_times = metrics["threshold_exceeded_wait_times"]
+    self.latest = Snapshot(math.floor(env.now),
+      metrics["requests_submitted"],
+      metrics["requests_processed"],
+      len(store.items),
+      queue_depth.time_weighted_mean,
+      queue_depth.max_depth,
+      wait_times.count,
+      wait_times.mean if wait_times.count > 0 else 0)
+    self.published += 1
+    return self.latest
+
+def publish_snapshots(env, store, metrics, publisher, on_publish = None):
+  """Publishes a snapshot every UI_REFRESH_RATE ticks, optionally handing it to on_publish."""
   while True:
-    # 1. Update the simulation progress bar.
-    previous_tick = metrics["current_sim_tick"]
-    metrics["current_sim_tick"] = math.floor(env.now)
-    sim_progress.update(sim_task, advance = metrics["current_sim_tick"] - previous_tick)
-    ui_layout["middle"].update(sim_progress)
-    
-    # 2. Determine the number of requests waiting to be processed.
-    pending_requests_count = len(store.items)
-    pending_requests_msg = f"Pending Requests Count: {pending_requests_count}"
-
-    # 3. Collect the simulation's metrics.
-    rate_exceeded_count = len(metrics["threshold_exceeded_wait_times"])
-    avg_wait_time = 0
-    if rate_exceeded_count > 0:
-      avg_wait_time = mean(metrics["threshold_exceeded_wait_times"])
-
-    # 5. Build a table to represent the metrics.
-    sim_table = Table("Requests Submitted", "Requests Processed", "Rate Exceeded Count", "Avg Wait Time (s)", 
-                      title="[bold]Simulation Metrics[/bold]", title_justify="left", box=box.SIMPLE_HEAVY)
-    sim_table.add_row(str(metrics['requests_submitted']), 
-      str(metrics['requests_processed']), 
-      str(rate_exceeded_count), 
-      str(avg_wait_time))
-
-    # 6. Update the lower panel.
-    ui_layout["lower"].update(RenderGroup("",pending_requests_msg,"", sim_table))
-
+    snapshot = publisher.publish(env, store, metrics)
+    if on_publish is not None:
+      on_publish(snapshot)
     yield env.timeout(UI_REFRESH_RATE)
 
-def create_ui_layout(sim_progress):
-  layout = Layout()
-  # Divide the "screen" in to two rows
-  layout.split_column(
-    Layout(Text(" "), name="diagram", size = 10),
-    Layout(Text(" "), name="upper", size = 8),
-    Layout(Text(" "), name="middle", size = 1),
-    Layout(Text(" "), name="lower")
-  )
-  return layout
-
-def render_simulation_configuration(ui_layout):
-  SPACE = "     "
-  table = Table(title="[bold]Simulation Configuration[/bold]", 
-                box=box.HORIZONTALS,
-                show_edge=False,
-                show_lines = False, 
-                show_header = False)
-  table.add_column()
-  table.add_column()
-  table.add_column()
-  table.add_row("UOM: Seconds", SPACE, f"Window Size (sec): {WINDOW_SIZE}")
-  table.add_row(f"Simulation Duration: {str(DURATION)}", SPACE, f"Max Request/Min:   {MAX_THRESHOLD}")
-  table.add_row(SPACE, SPACE, f"Avg Requests/Min:  {math.floor(1/AVG_REQUEST_ARRIVAL_SPEED * 60)}")
-  
-  ui_layout["upper"].update(table)  
-
-def render_sim_diagram(ui_layout):
-  # Created with https://asciiflow.com/#/
-  diagram = r"""
-      [bold]Fixed Window Rate Limiter Simulation[/bold]
-            ┌─────────────────────┐
-Inbound     │                     │ Processed
-Requests    │   Fixed             │ Requests
-───────────►│   Window            ├────────────►
-            │   Rate Limiter      │
-            │                     │
-            └─────────────────────┘
-  """
-  ui_layout["diagram"].update(diagram)
-  
-def main():
-  sim_progress = Progress(expand=False)
-  ui_layout = create_ui_layout(sim_progress)
-  with Live(ui_layout, refresh_per_second=10, screen=True):
-    render_sim_diagram(ui_layout)
-    render_simulation_configuration(ui_layout)
+def build_simulation(env, metrics):
+  """Wires the request generator and rate limiter together and returns the store."""
+  store = TimestampStore(env) # Pending arrival times in a NumPy ring buffer.
+  metrics["queue_depth"] = track(store, WINDOW_SIZE, math.ceil(DURATION.total_seconds() / WINDOW_SIZE) + 1)
+  env.process(generate_requests(env, AVG_REQUEST_ARRIVAL_SPEED, store, metrics))
+  if RATE_LIMITER is None:
+    env.process(fixed_widow_processor(env, WINDOW_SIZE, MAX_THRESHOLD, store, metrics))
+  else:
+    limiter = LIMITERS[RATE_LIMITER](MAX_THRESHOLD, WINDOW_SIZE)
+    env.process(rate_limited_processor(env, limiter, store, metrics))
+  return store
+
+def run_headless(env = None) -> dict:
+  env = simpy.Environment() if env is None else env
+  metrics = fixed_window.new_metrics()
+  build_simulation(env, metrics)
+  env.run(until = DURATION.total_seconds())
+  return metrics
+
+def run_with_ui(ui_mode = UI_MODE, env = None, console = None) -> dict:
+  # Rich is only needed when the dashboard is shown.
+  from rich.live import Live
+  from rich.progress import Progress
+
+  from queueing_sims import fixed_window_dashboard as dashboard
+
+  env = simpy.Environment() if env is None else env
+  metrics = fixed_window.new_metrics()
+  publisher = SnapshotPublisher()
+  sim_progress = Progress(expand=False, console=console)
+  ui_layout = dashboard.create_ui_layout(sim_progress)
+  # When throttled the renderer thread paints each frame itself, so Live
+  # doesn't need a refresh thread of its own.
+  with Live(ui_layout, refresh_per_second=UI_FRAMES_PER_SECOND, auto_refresh=(ui_mode == "on"),
+            screen=True, console=console) as live:
+    dashboard.render_sim_diagram(ui_layout)
+    dashboard.render_simulation_configuration(ui_layout, DURATION, WINDOW_SIZE, MAX_THRESHOLD, AVG_REQUEST_ARRIVAL_SPEED)
     sim_task = sim_progress.add_task("[red]Running Simulation...", total = DURATION.total_seconds())
-    env = simpy.Environment()
-    store = simpy.Store(env)
-    env.process(generate_requests(env, AVG_REQUEST_ARRIVAL_SPEED, store))
-    env.process(fixed_widow_processor(env, WINDOW_SIZE, MAX_THRESHOLD, store))
-    env.process(update_ui(env, store, ui_layout, sim_progress, sim_task))
-    env.run(until = DURATION.total_seconds())
+    store = build_simulation(env, metrics)
+    if ui_mode == "on":
+      render = lambda snapshot: dashboard.render_snapshot(ui_layout, sim_progress, sim_task, snapshot)
+      env.process(publish_snapshots(env, store, metrics, publisher, render))
+      env.run(until = DURATION.total_seconds())
+    else:
+      env.process(publish_snapshots(env, store, metrics, publisher))
+      renderer = dashboard.Renderer(publisher.get_latest, live.refresh, ui_layout, sim_progress, sim_task, UI_FRAMES_PER_SECOND)
+      renderer.start()
+      try:
+        env.run(until = DURATION.total_seconds())
+      finally:
+        renderer.stop()
 
   # After the simulation is done: Display the final UI
-  print("All Done")
-  print(ui_layout)
+  live.console.print("All Done")
+  live.console.print(ui_layout)
+  return metrics
+
+def print_metrics(metrics):
+  queue_depth = metrics["queue_depth"]
+  wait_times = metrics["threshold_exceeded_wait_times"]
+  print(f"Requests Submitted: {metrics['requests_submitted']}")
+  print(f"Requests Processed: {metrics['requests_processed']}")
+  print(f"Avg Queue Depth (time-weighted): {queue_depth.time_weighted_mean:.1f}")
+  print(f"Max Queue Depth: {queue_depth.max_depth}")
+  warmup = queue_depth.truncation()
+  if warmup.time is not None:
+    print(f"Queue Depth Warm-up: {warmup.time:g} ticks{'' if warmup.reliable else ' (not settled, run longer)'}")
+    print(f"Avg Queue Depth After Warm-up: {warmup.mean:.1f}")
+  print(f"Rate Exceeded Count: {wait_times.count}")
+  if wait_times.count > 0:
+    print(f"Avg Wait Time: {wait_times.mean}")
+
+def main():
+  parser = argparse.ArgumentParser(description="Fixed window rate limiter simulation with a live dashboard.")
+  parser.add_argument("--ui", choices=UI_MODES, default=UI_MODE, help="How the dashboard is driven.")
+  parser.add_argument("--no-ui", dest="ui", action="store_const", const="off",
+                      help="Run headless. Same as --ui off.")
+  parser.add_argument("--profile", metavar="FOLDED_PATH",
+                      help="Profile the simulation, print a report and save folded stacks for a flame graph.")
+  args = parser.parse_args()
+
+  env = None
+  if args.profile:
+    from queueing_sims.profiling import ProfiledEnvironment
+    env = ProfiledEnvironment()
+
+  if args.ui == "off":
+    print_metrics(run_headless(env))
+  else:
+    run_with_ui(args.ui, env)
+
+  if args.profile:
+    print(env.profile.report())
+    env.profile.write_folded(args.profile)
+    print(f"Folded stacks saved to {args.profile}")
 
 if __name__ == "__main__":
-  main()
\ No newline at end of file
+  main()
@@ -4,12 +4,19 @@
 # A simulation of a fixed window rate limiter.
 # For a window of time (e.g. 60 seconds) cap requests at a maximum threshold.
 # All requests that exceed the threshold go in a queue.
+#
+# Set RECORD_TRACE_PATH to save the arrivals, and REPLAY_TRACE_PATH to run
+# on a saved or real trace (see traces.py) instead of random draws.
+#
+# Set BATCH_MEANS for confidence intervals of the average queue delay from
+# this single run (see batch_means.py), and RELATIVE_PRECISION to stop the
+# run as soon as the interval is that narrow.
 ###############################################################################
 
-import simpy
-import math
-from statistics import mean
-import random
+from queueing_sims import fixed_window
+from queueing_sims import fixed_window_vectorized
+from queueing_sims.distributions import RandomStreams
+from queueing_sims.traces import TraceRecorder, read_trace
 
 # The UOM for time in the simulation is 1 tick = 1 second.
 MINUTE = 60 # 1 minute is 60 seconds
@@ -21,70 +28,83 @@ WINDOW_SIZE = MINUTE * 1
 AVG_REQUEST_ARRIVAL_SPEED = 0.12
 MAX_THRESHOLD = 500 # The maximum number of requests that can be processed in the window.
 
-
-metrics = {
-  "requests_submitted": 0,
-  "requests_processed":0,
-  "threshold_exceeded_wait_times": []
-}
-
-def generate_requests(env, avg_arrival_speed, store):
-  while True:
-    # print("Generator: Request Submitted")
-    store.put(1) #Generate a request.
-    metrics['requests_submitted'] += 1
-    wait_for_next_request_time = random.expovariate(avg_arrival_speed)
-    yield env.timeout(avg_arrival_speed)
-
-def fixed_widow_processor(env, window_size, max_threshold, store):
-  """
-  Consumes resources from a store, but limits the rate based on a fixed window.
-  """
-  window_start, window_end = find_window(env.now, window_size)
-  request_counter = 0 # Tracks the number of requests in the current window.
-  while True:
-    # Process a request
-    # This will wait here until something is actually available.
-    yield store.get()
-
-    request_counter += 1
-    now = env.now
-    metrics["requests_processed"] += 1
-
-    # Has the window ended? If so, calculate the new window and reset the counter.
-    if now > window_end:
-      request_counter = 0
-      window_start,window_end = find_window(now, window_size)
-
-    # Has the maximum threshold been exceeded? If so, wait until the window is over.
-    if request_counter > max_threshold:
-      request_counter = 0
-      wait = window_end - now
-      if (wait > 0):
-        # print(f"Subscriber: Rate exceeded, resting for {wait}")
-        metrics["threshold_exceeded_wait_times"].append(wait)
-        yield env.timeout(wait)
-
-def find_window(now: int, window_size: int ) -> tuple[int, int]:
-  offset, extra = divmod(math.floor(now), window_size)
-  window_start = offset * window_size 
-  window_end = window_start + window_size 
-  return window_start, window_end
-
-env = simpy.Environment()
-store = simpy.Store(env)
-env.process(generate_requests(env, AVG_REQUEST_ARRIVAL_SPEED, store))
-env.process(fixed_widow_processor(env, WINDOW_SIZE, MAX_THRESHOLD, store))
-env.run(until = DURATION)
+# Which engine runs the simulation.
+# - simpy: Every request is put on and taken off a simpy.Store.
+# - numpy: The vectorized engine. Much faster for large volumes.
+# - cross-check: Runs both and fails if they disagree. Only use for small runs.
+ENGINE = "simpy"
+
+# The number of raw wait times and queue delays to keep a sample of.
+RESERVOIR_SIZE = 0
+
+# How the SimPy engine holds pending requests. See fixed_window.BACKLOGS.
+# - store: A simpy.Store with a Python float per request.
+# - ring: The arrival times in a NumPy ring buffer. ~8 bytes per request.
+# - count: Just the number of pending requests. No queue delays.
+BACKLOG = "ring"
+
+# The width in ticks of each bucket of the downsampled queue depth series. SimPy engine only.
+QUEUE_DEPTH_RESOLUTION = WINDOW_SIZE
+
+# Confidence intervals for the average queue delay from batch means.
+BATCH_MEANS = False
+# Stop once the 95% interval is within this fraction of the mean, with
+# DURATION as the limit. None runs for DURATION. SimPy engine only.
+RELATIVE_PRECISION = None
+
+# A trace of the "arrivals" stream to save, or to replay. Both engines
+# replay a trace the same way.
+RECORD_TRACE_PATH = None
+REPLAY_TRACE_PATH = None
+
+trace = None if REPLAY_TRACE_PATH is None else read_trace(REPLAY_TRACE_PATH)[1]
+recorder = None if RECORD_TRACE_PATH is None else TraceRecorder(RECORD_TRACE_PATH)
+streams = RandomStreams(trace = trace, recorder = recorder)
+if ENGINE == "simpy":
+  metrics = fixed_window.simulate(DURATION, WINDOW_SIZE, MAX_THRESHOLD, AVG_REQUEST_ARRIVAL_SPEED,
+                                  reservoir_size = RESERVOIR_SIZE,
+                                  queue_depth_resolution = QUEUE_DEPTH_RESOLUTION,
+                                  backlog = BACKLOG, streams = streams, batch_means = BATCH_MEANS,
+                                  relative_precision = RELATIVE_PRECISION)
+elif ENGINE == "numpy":
+  metrics = fixed_window_vectorized.simulate(DURATION, WINDOW_SIZE, MAX_THRESHOLD, AVG_REQUEST_ARRIVAL_SPEED,
+                                             reservoir_size = RESERVOIR_SIZE, streams = streams,
+                                             batch_means = BATCH_MEANS)
+else:
+  metrics = fixed_window_vectorized.cross_check(DURATION, WINDOW_SIZE, MAX_THRESHOLD, AVG_REQUEST_ARRIVAL_SPEED,
+                                                streams = streams)
+streams.close()
 
 print(f"Requests Submitted: {metrics['requests_submitted']}")
 print(f"Requests Processed: {metrics['requests_processed']}")
-
-rate_exceeded_count = len(metrics["threshold_exceeded_wait_times"])
-print(f"Rate Exceeded Count: {rate_exceeded_count}")
-if rate_exceeded_count > 0:
-  avg_wait_time = mean(metrics["threshold_exceeded_wait_times"])
-  print(f"Avg Wait Time: {avg_wait_time}")
-
-for i in metrics["threshold_exceeded_wait_times"]:
-  print(i)
\ No newline at end of file
+queue_delays = metrics["queue_delays"]
+if queue_delays.count > 0:
+  print(f"Avg Queue Delay: {queue_delays.mean}")
+  print(f"Queue Delay p50/p95/p99: {queue_delays.percentile(50)}/{queue_delays.percentile(95)}/{queue_delays.percentile(99)}")
+
+if "queue_delay_batches" in metrics:
+  estimate = metrics["queue_delay_batches"].estimate()
+  print(f"Simulated Time: {metrics['stopped_at']:g} of {DURATION}")
+  print(f"Avg Queue Delay After Warm-up, Batch Means: {estimate.nonoverlapping}")
+  print(f"Avg Queue Delay After Warm-up, Overlapping Batch Means: {estimate.overlapping}")
+  print(f"Warm-up: {estimate.warmup} requests. Batches: {estimate.batches} of {estimate.batch_size} requests, "
+        f"lag-1 autocorrelation {estimate.lag1:.3f}")
+  if estimate.correlated:
+    print("The batch means are still correlated, so the intervals are likely too narrow. Run longer.")
+
+if "queue_depth" in metrics:
+  queue_depth = metrics["queue_depth"]
+  print(f"Avg Queue Depth (time-weighted): {queue_depth.time_weighted_mean}")
+  print(f"Max Queue Depth: {queue_depth.max_depth}")
+  print(f"Queue Depth p50/p95/p99: {queue_depth.percentile(50)}/{queue_depth.percentile(95)}/{queue_depth.percentile(99)}")
+
+wait_times = metrics["threshold_exceeded_wait_times"]
+print(f"Rate Exceeded Count: {wait_times.count}")
+if wait_times.count > 0:
+  print(f"Avg Wait Time: {wait_times.mean}")
+  print(f"Min/Max Wait Time: {wait_times.stats.min}/{wait_times.stats.max}")
+  print(f"Wait Time Std Dev: {wait_times.stats.stdev}")
+
+# Set RESERVOIR_SIZE to keep a sample of the raw wait times for debugging.
+for i in wait_times.sample:
+  print(i)
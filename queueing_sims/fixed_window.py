@@ -0,0 +1,185 @@
+###############################################################################
+# The SimPy processes behind the fixed window rate limiter simulations.
+# Shared by fixed-window.py and fixed-window-ui.py and used as the reference
+# when cross checking the vectorized engine in fixed_window_vectorized.py.
+#
+# Requests are put on the store stamped with the time they arrived so the
+# processor can record how long each one sat in the queue. Wait times and
+# queue delays are kept as StreamingMetrics so memory stays constant.
+#
+# With batch_means set, the queue delays also go into a BatchMeans (see
+# batch_means.py) for confidence intervals from this one run, and
+# relative_precision stops the run as soon as the interval is that narrow.
+#
+# The backlog can be a plain simpy.Store, a TimestampStore (the arrival times
+# in a NumPy ring buffer) or a CountingStore (just a count, no queue delays).
+# See backlog.py.
+###############################################################################
+
+import math
+from typing import NamedTuple, Optional
+
+import simpy
+
+from queueing_sims.arrivals import inter_arrival_distribution
+from queueing_sims.backlog import CountingStore, TimestampStore
+from queueing_sims.batch_means import BatchMeans, precision_monitor
+from queueing_sims.distributions import RandomStreams, TraceExhausted
+from queueing_sims.queue_depth import track
+from queueing_sims.streaming_stats import StreamingMetric
+
+def new_metrics(reservoir_size: int = 0, batch_means: bool = False) -> dict:
+  """
+  Creates an empty metrics dictionary for a single simulation run.
+  reservoir_size sets how many raw values of each metric are sampled.
+  batch_means adds a BatchMeans of the queue delays as "queue_delay_batches".
+  """
+  metrics = {
+    "requests_submitted": 0,
+    "requests_processed": 0,
+    "threshold_exceeded_wait_times": StreamingMetric(reservoir_size),
+    "queue_delays": StreamingMetric(reservoir_size)
+  }
+  if batch_means:
+    metrics["queue_delay_batches"] = BatchMeans()
+  return metrics
+
+def generate_requests(env, avg_arrival_speed, store, metrics, streams = None):
+  """
+  Submits a request at time zero and then after exponentially distributed
+  gaps with a mean of avg_arrival_speed, drawn from the "arrivals" stream.
+  avg_arrival_speed can also be a rate from arrivals.py, for requests that
+  come in waves. Stops when the streams replay a trace that runs out of
+  arrivals.
+  """
+  streams = RandomStreams() if streams is None else streams
+  arrivals = streams.add("arrivals", inter_arrival_distribution(avg_arrival_speed))
+  while True:
+    # print("Generator: Request Submitted")
+    store.put(env.now) #Generate a request.
+    metrics['requests_submitted'] += 1
+    try:
+      wait_for_next_request_time = arrivals.sample()
+    except TraceExhausted:
+      return
+    yield env.timeout(wait_for_next_request_time)
+
+def replay_requests(env, inter_arrival_times, store, metrics):
+  """Submits a request after each of the inter-arrival times has passed."""
+  for time_until_next_request in inter_arrival_times:
+    yield env.timeout(time_until_next_request)
+    store.put(env.now)
+    metrics['requests_submitted'] += 1
+
+def fixed_widow_processor(env, window_size, max_threshold, store, metrics):
+  """
+  Consumes resources from a store, but limits the rate based on a fixed window.
+  """
+  window_start, window_end = find_window(env.now, window_size)
+  request_counter = 0 # Tracks the number of requests in the current window.
+  delay_batches = metrics.get("queue_delay_batches")
+  while True:
+    # Process a request
+    # This will wait here until something is actually available.
+    arrived_at = yield store.get()
+
+    request_counter += 1
+    now = env.now
+    metrics["requests_processed"] += 1
+    if arrived_at is not None: # A CountingStore doesn't know when requests arrived.
+      metrics["queue_delays"].add(now - arrived_at)
+      if delay_batches is not None:
+        delay_batches.add(now - arrived_at)
+
+    # Has the window ended? If so, calculate the new window and reset the counter.
+    if now > window_end:
+      request_counter = 0
+      window_start,window_end = find_window(now, window_size)
+
+    # Has the maximum threshold been exceeded? If so, wait until the window is over.
+    if request_counter > max_threshold:
+      request_counter = 0
+      wait = window_end - now
+      if (wait > 0):
+        # print(f"Subscriber: Rate exceeded, resting for {wait}")
+        metrics["threshold_exceeded_wait_times"].add(wait)
+        yield env.timeout(wait)
+
+def find_window(now: int, window_size: int ) -> tuple[int, int]:
+  offset, extra = divmod(math.floor(now), window_size)
+  window_start = offset * window_size
+  window_end = window_start + window_size
+  return window_start, window_end
+
+# The kinds of backlog simulate can use.
+BACKLOGS = {
+  "store": simpy.Store,
+  "ring": TimestampStore,
+  "count": CountingStore
+}
+
+def simulate(duration, window_size, max_threshold, avg_arrival_speed = None,
+             inter_arrival_times = None, reservoir_size = 0,
+             queue_depth_resolution = None, backlog = "store", streams = None, env = None,
+             batch_means: bool = False, relative_precision: Optional[float] = None,
+             check_every: Optional[float] = None) -> dict:
+  """
+  Runs the fixed window simulation with SimPy and returns its metrics.
+  Requests either arrive avg_arrival_speed ticks apart on average, drawn
+  from streams (see generate_requests), or are spaced by the explicit
+  inter_arrival_times. If queue_depth_resolution
+  is set, metrics["queue_depth"] holds a QueueDepthTracker for the store.
+  backlog is one of the BACKLOGS. Pass env to run on another environment,
+  such as a profiling.ProfiledEnvironment.
+
+  batch_means keeps metrics["queue_delay_batches"]. relative_precision
+  (which implies batch_means) checks it every check_every ticks, ten
+  windows by default, and ends the run once the 95% interval of the average
+  queue delay is within that fraction of the mean, with duration as the
+  limit. metrics["stopped_at"] is when the run ended.
+  """
+  metrics = new_metrics(reservoir_size, batch_means or relative_precision is not None)
+  env = simpy.Environment() if env is None else env
+  store = BACKLOGS[backlog](env)
+  if queue_depth_resolution is not None:
+    history = math.ceil(duration / queue_depth_resolution) + 1
+    metrics["queue_depth"] = track(store, queue_depth_resolution, history)
+  if inter_arrival_times is None:
+    env.process(generate_requests(env, avg_arrival_speed, store, metrics, streams))
+  else:
+    env.process(replay_requests(env, inter_arrival_times, store, metrics))
+  env.process(fixed_widow_processor(env, window_size, max_threshold, store, metrics))
+  if relative_precision is None:
+    env.run(until = duration)
+  else:
+    check_every = 10 * window_size if check_every is None else check_every
+    env.run(until = env.process(precision_monitor(env, metrics["queue_delay_batches"], relative_precision,
+                                                  check_every, duration)))
+  metrics["stopped_at"] = env.now
+  return metrics
+
+class Parameters(NamedTuple):
+  duration: float = 60 * 60 # 1 hour in seconds.
+  window_size: float = 60
+  max_threshold: int = 500
+  avg_arrival_speed: float = 0.12
+  backlog: str = "ring"
+
+class RunResult(NamedTuple):
+  run: int
+  requests_submitted: int
+  requests_processed: int
+  avg_queue_delay: float
+  p95_queue_delay: float
+  rate_exceeded_count: int
+  avg_wait_time: float
+
+def run_model(run, rng, parameters: Parameters) -> RunResult:
+  """Runs a single replication. Called in a worker process."""
+  metrics = simulate(parameters.duration, parameters.window_size, parameters.max_threshold,
+                     parameters.avg_arrival_speed, backlog = parameters.backlog,
+                     streams = RandomStreams(rng))
+  queue_delays = metrics["queue_delays"]
+  wait_times = metrics["threshold_exceeded_wait_times"]
+  return RunResult(run, metrics["requests_submitted"], metrics["requests_processed"],
+                   queue_delays.mean, queue_delays.percentile(95), wait_times.count, wait_times.mean)
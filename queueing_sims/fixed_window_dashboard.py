@@ -0,0 +1,122 @@
+###############################################################################
+# The Rich dashboard for fixed-window-ui.py.
+#
+# The simulation never touches Rich. It publishes an immutable Snapshot of
+# its metrics and the dashboard renders whichever snapshot is the latest:
+# - Renderer: a daemon thread that polls the latest snapshot at a fixed
+#   wall-clock rate. The cost of the UI is then bounded by wall time, no
+#   matter how many simulated seconds go by between frames.
+# - render_snapshot: renders one snapshot. The Renderer calls it, and the
+#   unthrottled "on" mode calls it straight from the simulation.
+#
+# Only import this module when the UI is shown, so headless runs never load
+# Rich.
+###############################################################################
+
+import math
+import threading
+
+from rich import box
+from rich.console import RenderGroup
+from rich.layout import Layout
+from rich.progress import Progress
+from rich.table import Table
+from rich.text import Text
+
+def create_ui_layout(sim_progress: Progress) -> Layout:
+  layout = Layout()
+  # Divide the "screen" in to two rows
+  layout.split_column(
+    Layout(Text(" "), name="diagram", size = 10),
+    Layout(Text(" "), name="upper", size = 8),
+    Layout(Text(" "), name="middle", size = 1),
+    Layout(Text(" "), name="lower")
+  )
+  return layout
+
+def render_simulation_configuration(ui_layout, duration, window_size, max_threshold, avg_arrival_speed):
+  SPACE = "     "
+  table = Table(title="[bold]Simulation Configuration[/bold]",
+                box=box.HORIZONTALS,
+                show_edge=False,
+                show_lines = False,
+                show_header = False)
+  table.add_column()
+  table.add_column()
+  table.add_column()
+  table.add_row("UOM: Seconds", SPACE, f"Window Size (sec): {window_size}")
+  table.add_row(f"Simulation Duration: {str(duration)}", SPACE, f"Max Request/Min:   {max_threshold}")
+  table.add_row(SPACE, SPACE, f"Avg Requests/Min:  {math.floor(1/avg_arrival_speed * 60)}")
+
+  ui_layout["upper"].update(table)
+
+def render_sim_diagram(ui_layout):
+  # Created with https://asciiflow.com/#/
+  diagram = r"""
+      [bold]Fixed Window Rate Limiter Simulation[/bold]
+            ┌─────────────────────┐
+Inbound     │                     │ Processed
+Requests    │   Fixed             │ Requests
+───────────►│   Window            ├────────────►
+            │   Rate Limiter      │
+            │                     │
+            └─────────────────────┘
+  """
+  ui_layout["diagram"].update(diagram)
+
+def render_snapshot(ui_layout, sim_progress, sim_task, snapshot):
+  # 1. Update the simulation progress bar.
+  sim_progress.update(sim_task, completed = snapshot.sim_tick)
+  ui_layout["middle"].update(sim_progress)
+
+  # 2. Show the number of requests waiting to be processed.
+  pending_requests_msg = (f"Pending Requests Count: {snapshot.pending_requests}    "
+    f"Avg (time-weighted): {snapshot.avg_queue_depth:.1f}    Max: {snapshot.max_queue_depth}")
+
+  # 3. Build a table to represent the metrics.
+  sim_table = Table("Requests Submitted", "Requests Processed", "Rate Exceeded Count", "Avg Wait Time (s)",
+                    title="[bold]Simulation Metrics[/bold]", title_justify="left", box=box.SIMPLE_HEAVY)
+  sim_table.add_row(str(snapshot.requests_submitted),
+    str(snapshot.requests_processed),
+    str(snapshot.rate_exceeded_count),
+    str(snapshot.avg_wait_time))
+
+  # 4. Update the lower panel.
+  ui_layout["lower"].update(RenderGroup("",pending_requests_msg,"", sim_table))
+
+class Renderer(threading.Thread):
+  """
+  Renders get_snapshot() frames_per_second times a second until stopped,
+  then calls refresh() to paint the frame. A frame is skipped if the
+  snapshot hasn't changed since the last one.
+  """
+  def __init__(self, get_snapshot, refresh, ui_layout, sim_progress, sim_task, frames_per_second = 10) -> None:
+    super().__init__(name="dashboard-renderer", daemon=True)
+    self.get_snapshot = get_snapshot
+    self.refresh = refresh
+    self.ui_layout = ui_layout
+    self.sim_progress = sim_progress
+    self.sim_task = sim_task
+    self.interval = 1 / frames_per_second
+    self.frames_rendered = 0
+    self._stopped = threading.Event()
+    self._rendered = None
+
+  def run(self) -> None:
+    while not self._stopped.wait(self.interval):
+      self.render()
+
+  def render(self) -> None:
+    snapshot = self.get_snapshot()
+    if snapshot is None or snapshot is self._rendered:
+      return
+    render_snapshot(self.ui_layout, self.sim_progress, self.sim_task, snapshot)
+    self.refresh()
+    self._rendered = snapshot
+    self.frames_rendered += 1
+
+  def stop(self) -> None:
+    """Stops polling and renders the latest snapshot one last time."""
+    self._stopped.set()
+    self.join()
+    self.render()
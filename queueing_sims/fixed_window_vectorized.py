@@ -0,0 +1,150 @@
+###############################################################################
+# A vectorized NumPy engine for the fixed window rate limiter simulation.
+#
+# Rather than pushing every request through a simpy.Store, all of the arrivals
+# are drawn up front as a sorted array. The processor's behavior is then
+# computed one segment at a time, where a segment is a run of requests that
+# are dequeued back to back without the window rolling over or the threshold
+# being exceeded. Within a segment every request leaves the queue at
+# max(processor clock, arrival time), so a segment is a single array operation
+# and a window costs a couple of binary searches.
+#
+# The engine reproduces fixed_widow_processor exactly, including its quirks
+# (e.g. the first request of a new window is not counted against the
+# threshold), so cross_check can compare the two paths value for value.
+###############################################################################
+
+import math
+
+import numpy as np
+
+from queueing_sims.arrivals import expected_arrivals, inter_arrival_distribution
+from queueing_sims.distributions import RandomStreams
+from queueing_sims.fixed_window import find_window, new_metrics, simulate as simulate_with_simpy
+
+def stream_arrival_times(duration, avg_arrival_speed, streams = None) -> np.ndarray:
+  """
+  The inter-arrival times of generate_requests: a request at time zero
+  followed by gaps drawn from the "arrivals" stream. Given streams with the
+  same seed, both engines see exactly the same arrivals.
+  """
+  streams = RandomStreams() if streams is None else streams
+  arrivals = streams.add("arrivals", inter_arrival_distribution(avg_arrival_speed))
+  # Draw a few standard deviations more than expected and top up if short.
+  expected = expected_arrivals(avg_arrival_speed, 0, duration)
+  count = math.ceil(expected + 6 * math.sqrt(expected) + 16)
+  inter_arrival_times = np.concatenate(([0.0], arrivals.take(count)))
+  while inter_arrival_times.sum() < duration:
+    more = arrivals.take(count)
+    if len(more) == 0: # A replayed trace ran out.
+      break
+    inter_arrival_times = np.concatenate((inter_arrival_times, more))
+  return inter_arrival_times
+
+def exponential_arrival_times(duration, avg_arrival_speed, rng = None) -> np.ndarray:
+  """
+  Exponentially distributed inter-arrival times with a mean of
+  avg_arrival_speed, enough to cover the duration.
+  """
+  rng = np.random.default_rng() if rng is None else rng
+  # Draw a few standard deviations more than expected and top up if short.
+  expected = duration / avg_arrival_speed
+  count = math.ceil(expected + 6 * math.sqrt(expected) + 16)
+  inter_arrival_times = rng.exponential(avg_arrival_speed, count)
+  while inter_arrival_times.sum() < duration:
+    inter_arrival_times = np.concatenate((inter_arrival_times, rng.exponential(avg_arrival_speed, count)))
+  return inter_arrival_times
+
+def simulate(duration, window_size, max_threshold, avg_arrival_speed = None,
+             inter_arrival_times = None, reservoir_size = 0, streams = None,
+             batch_means: bool = False) -> dict:
+  """
+  Runs the fixed window simulation without SimPy and returns the same
+  metrics as fixed_window.simulate. It always runs for the whole duration,
+  so there's no stopping early at a relative precision.
+  """
+  if inter_arrival_times is None:
+    inter_arrival_times = stream_arrival_times(duration, avg_arrival_speed, streams)
+
+  # Accumulating sequentially produces the exact clock values SimPy would.
+  arrivals = np.cumsum(np.asarray(inter_arrival_times, dtype=np.float64))
+  arrivals = arrivals[:np.searchsorted(arrivals, duration, side="left")]
+  count = len(arrivals)
+
+  metrics = new_metrics(reservoir_size, batch_means)
+  departures = np.empty(count)
+  clock = 0.0 # When the processor is next ready to take a request.
+  window_start, window_end = find_window(0, window_size)
+  request_counter = 0
+  next_request = 0
+  while next_request < count and clock < duration:
+    # The index of the first request that would be dequeued after the window
+    # ends or that would take the window over the threshold.
+    if clock > window_end:
+      window_index = next_request
+    else:
+      window_index = max(next_request, int(np.searchsorted(arrivals, window_end, side="right")))
+    threshold_index = next_request + max_threshold - request_counter
+
+    segment_end = min(window_index, threshold_index, count)
+    segment = slice(next_request, segment_end)
+    np.maximum(arrivals[segment], clock, out=departures[segment])
+    request_counter += segment_end - next_request
+    if segment_end > next_request:
+      clock = float(departures[segment_end - 1])
+    next_request = segment_end
+    if next_request == count:
+      break
+
+    now = max(clock, float(arrivals[next_request]))
+    departures[next_request] = now
+    next_request += 1
+    if next_request - 1 == window_index:
+      request_counter = 0
+      window_start, window_end = find_window(now, window_size)
+      clock = now
+    else:
+      request_counter = 0
+      wait = window_end - now
+      if wait > 0:
+        metrics["threshold_exceeded_wait_times"].add(wait)
+        clock = now + wait
+      else:
+        clock = now
+
+  processed = next_request
+  metrics["requests_submitted"] = count
+  metrics["requests_processed"] = processed
+  delays = departures[:processed] - arrivals[:processed]
+  metrics["queue_delays"].extend(delays)
+  if batch_means:
+    metrics["queue_delay_batches"].extend(delays)
+  metrics["stopped_at"] = duration
+  return metrics
+
+def cross_check(duration, window_size, max_threshold, avg_arrival_speed = None,
+                inter_arrival_times = None, streams = None) -> dict:
+  """
+  Runs both the SimPy and the vectorized engine on the same arrivals and
+  raises an AssertionError if their metrics disagree. Every wait time and
+  queue delay is kept in the metrics' reservoirs so they can be compared
+  value for value, which makes this only suitable for small runs. Returns
+  the vectorized metrics.
+  """
+  if inter_arrival_times is None:
+    inter_arrival_times = stream_arrival_times(duration, avg_arrival_speed, streams)
+  keep_everything = len(inter_arrival_times)
+  expected = simulate_with_simpy(duration, window_size, max_threshold,
+                                 inter_arrival_times = inter_arrival_times.tolist(),
+                                 reservoir_size = keep_everything)
+  actual = simulate(duration, window_size, max_threshold,
+                    inter_arrival_times = inter_arrival_times,
+                    reservoir_size = keep_everything)
+
+  for key in ("requests_submitted", "requests_processed"):
+    if expected[key] != actual[key]:
+      raise AssertionError(f"{key} differs: SimPy {expected[key]}, vectorized {actual[key]}")
+  for key in ("threshold_exceeded_wait_times", "queue_delays"):
+    if expected[key].sample != actual[key].sample:
+      raise AssertionError(f"{key} differs between the SimPy and vectorized engines.")
+  return actual
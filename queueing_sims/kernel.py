@@ -0,0 +1,350 @@
+###############################################################################
+# A minimal discrete event kernel with the subset of SimPy's API the models
+# use: Environment (now, timeout, process, event, run), Resource, Store and
+# Container. A script switches to it by replacing
+#   import simpy
+# with
+#   from queueing_sims import kernel as simpy
+#
+# It cuts SimPy's general overhead:
+# - The calendar is a heapq of (time, priority, sequence, event) tuples and
+#   run() pops and dispatches them in a single loop, without step().
+# - Events have __slots__, and a processed Timeout goes back to a pool to
+#   be reused by the next env.timeout().
+# - A process resumes from a bound method created once, not per yield.
+# - Releasing a Resource slot or putting an item in a Store hands it to the
+#   next process in line straight away. SimPy schedules a release or put
+#   event first and hands it over when that event is processed.
+#
+# Events happen at the same times and in the same order as with SimPy,
+# except that ties between those hand-overs and other events at exactly the
+# same time may be broken differently.
+#
+# What's left out: interrupts, conditions (all_of/any_of), priority and
+# preemptive resources, and run(until=event). Because timeouts are pooled,
+# don't hold on to one after it has been processed.
+###############################################################################
+
+from collections import deque
+from heapq import heappop, heappush
+
+URGENT = 0
+NORMAL = 1
+INFINITY = float("inf")
+
+class Event:
+  """Something that happens at a point in time. Processes yield them to wait."""
+  __slots__ = ("env", "callbacks", "_value", "_ok", "_triggered", "_defused")
+
+  def __init__(self, env) -> None:
+    self.env = env
+    self.callbacks = [] # None once the event has been processed.
+    self._value = None
+    self._ok = True
+    self._triggered = False
+    self._defused = False
+
+  @property
+  def triggered(self) -> bool:
+    return self._triggered
+
+  @property
+  def processed(self) -> bool:
+    return self.callbacks is None
+
+  @property
+  def ok(self) -> bool:
+    return self._ok
+
+  @property
+  def value(self):
+    return self._value
+
+  def succeed(self, value = None) -> "Event":
+    if self._triggered:
+      raise RuntimeError(f"{self} has already been triggered.")
+    self._triggered = True
+    self._value = value
+    self.env.schedule(self)
+    return self
+
+  def fail(self, exception: BaseException) -> "Event":
+    if self._triggered:
+      raise RuntimeError(f"{self} has already been triggered.")
+    self._triggered = True
+    self._ok = False
+    self._value = exception
+    self.env.schedule(self)
+    return self
+
+class Timeout(Event):
+  __slots__ = ()
+
+def _processed(env) -> Event:
+  """An event that has already happened, for operations that complete at once."""
+  event = Event(env)
+  event.callbacks = None
+  event._triggered = True
+  return event
+
+class Process(Event):
+  """Runs a generator, resuming it whenever the event it yielded happens."""
+  __slots__ = ("_generator", "_resume_callback", "target", "name")
+
+  def __init__(self, env, generator) -> None:
+    super().__init__(env)
+    self._generator = generator
+    self._resume_callback = self._resume
+    self.name = getattr(generator, "__name__", "process")
+    # Start the generator as soon as possible, as SimPy's Initialize does.
+    self.target = Event(env)
+    self.target.callbacks.append(self._resume_callback)
+    self.target._triggered = True
+    env.schedule(self.target, URGENT)
+
+  @property
+  def is_alive(self) -> bool:
+    return not self._triggered
+
+  def _resume(self, event: Event) -> None:
+    env = self.env
+    env.active_process = self
+    generator = self._generator
+    while True:
+      try:
+        if event._ok:
+          event = generator.send(event._value)
+        else:
+          event._defused = True
+          event = generator.throw(event._value)
+      except StopIteration as stop:
+        self.target = None
+        self.succeed(stop.value)
+        break
+      callbacks = event.callbacks
+      if callbacks is not None:
+        callbacks.append(self._resume_callback)
+        self.target = event
+        break
+      # The event already happened, so carry straight on with its value.
+    env.active_process = None
+
+class Environment:
+  def __init__(self, initial_time = 0) -> None:
+    self._now = initial_time
+    self._queue = []
+    self._sequence = 0
+    self._timeouts = [] # Processed Timeouts, ready for reuse.
+    self._done = _processed(self) # Returned by every put and release that completes at once.
+    self.active_process = None
+
+  @property
+  def now(self):
+    return self._now
+
+  def schedule(self, event: Event, priority: int = NORMAL, delay = 0) -> None:
+    self._sequence += 1
+    heappush(self._queue, (self._now + delay, priority, self._sequence, event))
+
+  def timeout(self, delay = 0, value = None) -> Timeout:
+    if delay < 0:
+      raise ValueError(f"Negative delay {delay}")
+    timeouts = self._timeouts
+    if timeouts:
+      timeout = timeouts.pop()
+      timeout.callbacks = []
+    else:
+      timeout = Timeout(self)
+      timeout._triggered = True
+    timeout._value = value
+    self._sequence += 1
+    heappush(self._queue, (self._now + delay, NORMAL, self._sequence, timeout))
+    return timeout
+
+  def event(self) -> Event:
+    return Event(self)
+
+  def process(self, generator) -> Process:
+    return Process(self, generator)
+
+  def peek(self):
+    """The time of the next event, or infinity if there are none."""
+    return self._queue[0][0] if self._queue else INFINITY
+
+  def run(self, until = None) -> None:
+    """Processes events until the time until, or until there are none left."""
+    queue = self._queue
+    if until is not None:
+      if until <= self._now:
+        raise ValueError(f"until ({until}) must be greater than the current simulation time.")
+      # A None event stops the run. URGENT, so nothing else at until happens.
+      self._sequence += 1
+      heappush(queue, (until, URGENT, self._sequence, None))
+    timeouts = self._timeouts
+    while queue:
+      now, _, _, event = heappop(queue)
+      self._now = now
+      if event is None:
+        return
+      callbacks, event.callbacks = event.callbacks, None
+      for callback in callbacks:
+        callback(event)
+      if not event._ok and not event._defused:
+        raise event._value
+      if event.__class__ is Timeout:
+        timeouts.append(event)
+
+###############################################################################
+# Shared resources
+###############################################################################
+
+class Request(Event):
+  """A request for a Resource slot. Release it by leaving the with block."""
+  __slots__ = ("resource",)
+
+  def __init__(self, resource: "Resource") -> None:
+    # Event.__init__ inlined, requests are made for every entity.
+    self.env = resource._env
+    self.callbacks = []
+    self._value = None
+    self._ok = True
+    self._triggered = False
+    self._defused = False
+    self.resource = resource
+
+  def __enter__(self) -> "Request":
+    return self
+
+  def __exit__(self, *exception) -> None:
+    self.resource.release(self)
+
+class Resource:
+  """capacity identical slots, handed out first come, first served."""
+  def __init__(self, env, capacity: int = 1) -> None:
+    if capacity <= 0:
+      raise ValueError("capacity must be greater than 0.")
+    self._env = env
+    self.capacity = capacity
+    self.users = []
+    self.queue = deque()
+
+  @property
+  def count(self) -> int:
+    return len(self.users)
+
+  def request(self) -> Request:
+    request = Request(self)
+    if len(self.users) < self.capacity:
+      self.users.append(request)
+      request._triggered = True
+      env = self._env
+      env._sequence += 1
+      heappush(env._queue, (env._now, NORMAL, env._sequence, request))
+    else:
+      self.queue.append(request)
+    return request
+
+  def release(self, request: Request) -> Event:
+    users = self.users
+    if request in users:
+      users.remove(request)
+      queue = self.queue
+      while queue and len(users) < self.capacity:
+        waiting = queue.popleft()
+        users.append(waiting)
+        waiting.succeed()
+    elif request in self.queue:
+      # Leaving the with block before the slot was granted cancels the request.
+      self.queue.remove(request)
+    return self._env._done
+
+class Store:
+  """Items handed out first in, first out. get() waits for an item."""
+  def __init__(self, env, capacity = INFINITY) -> None:
+    if capacity <= 0:
+      raise ValueError("capacity must be greater than 0.")
+    self._env = env
+    self.capacity = capacity
+    self.items = [] # Anything with append, pop(0) and len, e.g. a backlog.TimestampRing.
+    self.put_queue = deque() # (put event, item) waiting for room.
+    self.get_queue = deque()
+
+  def put(self, item) -> Event:
+    if len(self.items) >= self.capacity:
+      event = Event(self._env)
+      self.put_queue.append((event, item))
+      return event
+    self.items.append(item)
+    if self.get_queue:
+      self._hand_out()
+    return self._env._done
+
+  def get(self) -> Event:
+    event = Event(self._env)
+    if self.items:
+      event.succeed(self.items.pop(0))
+      self._make_room()
+    else:
+      self.get_queue.append(event)
+    return event
+
+  def _hand_out(self) -> None:
+    get_queue = self.get_queue
+    items = self.items
+    while get_queue and items:
+      get_queue.popleft().succeed(items.pop(0))
+      self._make_room()
+
+  def _make_room(self) -> None:
+    while self.put_queue and len(self.items) < self.capacity:
+      event, item = self.put_queue.popleft()
+      self.items.append(item)
+      event.succeed()
+
+class Container:
+  """A level of something continuous or countable. get(amount) waits until there's enough."""
+  def __init__(self, env, capacity = INFINITY, init = 0) -> None:
+    if capacity <= 0:
+      raise ValueError("capacity must be greater than 0.")
+    if not 0 <= init <= capacity:
+      raise ValueError("init must be between 0 and the capacity.")
+    self._env = env
+    self.capacity = capacity
+    self.level = init
+    self.put_queue = deque() # (put event, amount) waiting for room.
+    self.get_queue = deque() # (get event, amount) waiting for enough.
+
+  def put(self, amount = 1) -> Event:
+    if amount <= 0:
+      raise ValueError("amount must be greater than 0.")
+    if self.put_queue or self.level + amount > self.capacity:
+      event = Event(self._env)
+      self.put_queue.append((event, amount))
+      return event
+    self.level += amount
+    self._settle()
+    return self._env._done
+
+  def get(self, amount = 1) -> Event:
+    if amount <= 0:
+      raise ValueError("amount must be greater than 0.")
+    event = Event(self._env)
+    self.get_queue.append((event, amount))
+    self._settle()
+    return event
+
+  def _settle(self) -> None:
+    """Serves waiting gets and puts, in order, for as long as they fit."""
+    progress = True
+    while progress:
+      progress = False
+      if self.get_queue and self.get_queue[0][1] <= self.level:
+        event, amount = self.get_queue.popleft()
+        self.level -= amount
+        event.succeed(amount)
+        progress = True
+      if self.put_queue and self.level + self.put_queue[0][1] <= self.capacity:
+        event, amount = self.put_queue.popleft()
+        self.level += amount
+        event.succeed()
+        progress = True
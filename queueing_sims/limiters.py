@@ -0,0 +1,188 @@
+###############################################################################
+# Rate limiter algorithms behind one interface so they can be compared in the
+# same generator -> Store -> processor topology as fixed-window.py.
+#
+# A limiter only answers one question: if a request wants to go at time now,
+# how long must it wait? acquire(now) returns that delay and updates the
+# limiter as if the request went through at now + delay. Requests must be
+# acquired in time order, which a single processor pulling from a Store does.
+#
+# Every limiter is built from the same two parameters as the fixed window
+# simulation: max_threshold requests per window_size ticks.
+#
+# - FixedWindowLimiter: counts requests per aligned window. Unlike
+#   fixed_window.fixed_widow_processor, the request that would exceed the
+#   threshold is the one that waits, and it counts towards the next window.
+# - SlidingWindowLogLimiter: remembers the time of every request in the last
+#   window in a deque, so each request costs amortized O(1).
+# - SlidingWindowCounterLimiter: approximates the sliding window by
+#   weighting the previous window's count by how much of it still overlaps.
+# - TokenBucketLimiter: tokens refill at max_threshold / window_size per tick
+#   up to a burst capacity (max_threshold by default).
+# - LeakyBucketLimiter: lets requests out at a constant rate, one every
+#   window_size / max_threshold ticks.
+###############################################################################
+
+import math
+from abc import ABC, abstractmethod
+from collections import deque
+from typing import Optional
+
+import simpy
+
+from queueing_sims.fixed_window import BACKLOGS, generate_requests, new_metrics, replay_requests
+
+class RateLimiter(ABC):
+  """The interface every limiter implements."""
+  def __init__(self, max_threshold: int, window_size: float) -> None:
+    if max_threshold < 1:
+      raise ValueError("The threshold must allow at least one request per window.")
+    self.max_threshold = max_threshold
+    self.window_size = window_size
+
+  @abstractmethod
+  def acquire(self, now: float) -> float:
+    """Returns how long a request that wants to go at now must wait."""
+
+class FixedWindowLimiter(RateLimiter):
+  def __init__(self, max_threshold: int, window_size: float) -> None:
+    super().__init__(max_threshold, window_size)
+    self._window = -1
+    self._count = 0
+
+  def acquire(self, now: float) -> float:
+    window = math.floor(now / self.window_size)
+    # Rounding can put the start of a window we already moved to in the one before.
+    if window > self._window:
+      self._window = window
+      self._count = 0
+    if self._count < self.max_threshold:
+      self._count += 1
+      return 0.0
+    # Wait for the next window and be its first request.
+    self._window = window + 1
+    self._count = 1
+    return max(self._window * self.window_size - now, 0.0)
+
+class SlidingWindowLogLimiter(RateLimiter):
+  def __init__(self, max_threshold: int, window_size: float) -> None:
+    super().__init__(max_threshold, window_size)
+    self._log = deque()
+
+  def acquire(self, now: float) -> float:
+    log = self._log
+    while log and log[0] <= now - self.window_size:
+      log.popleft()
+    go_at = now
+    if len(log) >= self.max_threshold:
+      # Wait until the oldest request falls out of the window.
+      go_at = log.popleft() + self.window_size
+    log.append(go_at)
+    return go_at - now
+
+class SlidingWindowCounterLimiter(RateLimiter):
+  def __init__(self, max_threshold: int, window_size: float) -> None:
+    super().__init__(max_threshold, window_size)
+    self._window = 0
+    self._previous_count = 0
+    self._current_count = 0
+
+  def _move_to(self, window: int) -> None:
+    if window <= self._window:
+      return
+    self._previous_count = self._current_count if window == self._window + 1 else 0
+    self._current_count = 0
+    self._window = window
+
+  def acquire(self, now: float) -> float:
+    go_at = now
+    self._move_to(math.floor(now / self.window_size))
+    while True:
+      window_start = self._window * self.window_size
+      room = self.max_threshold - 1 - self._current_count
+      if room >= 0:
+        if self._previous_count == 0:
+          break
+        # The estimate previous * (1 - elapsed / window) + current shrinks as
+        # the window progresses. Find when there is room for one more.
+        overlap = room / self._previous_count
+        earliest = window_start + self.window_size * (1 - overlap)
+        if earliest < window_start + self.window_size:
+          go_at = max(go_at, earliest)
+          break
+      self._move_to(self._window + 1)
+      go_at = max(go_at, self._window * self.window_size)
+    self._current_count += 1
+    return go_at - now
+
+class TokenBucketLimiter(RateLimiter):
+  def __init__(self, max_threshold: int, window_size: float, burst: Optional[int] = None) -> None:
+    super().__init__(max_threshold, window_size)
+    self.burst = max_threshold if burst is None else burst
+    self._rate = max_threshold / window_size # Tokens per tick.
+    self._tokens = float(self.burst)
+    self._updated = 0.0
+
+  def acquire(self, now: float) -> float:
+    if now > self._updated:
+      self._tokens = min(self.burst, self._tokens + (now - self._updated) * self._rate)
+      self._updated = now
+    if self._tokens >= 1:
+      self._tokens -= 1
+      return 0.0
+    # Wait for the bucket to refill to one token, then spend it.
+    wait = (1 - self._tokens) / self._rate
+    self._tokens = 0.0
+    self._updated = now + wait
+    return wait
+
+class LeakyBucketLimiter(RateLimiter):
+  def __init__(self, max_threshold: int, window_size: float) -> None:
+    super().__init__(max_threshold, window_size)
+    self._interval = window_size / max_threshold
+    self._next_slot = 0.0
+
+  def acquire(self, now: float) -> float:
+    go_at = max(now, self._next_slot)
+    self._next_slot = go_at + self._interval
+    return go_at - now
+
+LIMITERS = {
+  "fixed-window": FixedWindowLimiter,
+  "sliding-window-log": SlidingWindowLogLimiter,
+  "sliding-window-counter": SlidingWindowCounterLimiter,
+  "token-bucket": TokenBucketLimiter,
+  "leaky-bucket": LeakyBucketLimiter
+}
+
+def rate_limited_processor(env, limiter: RateLimiter, store, metrics):
+  """
+  Consumes requests from a store, holding each one until the limiter lets
+  it through. A request's queue delay includes the time it was held.
+  """
+  while True:
+    arrived_at = yield store.get()
+    wait = limiter.acquire(env.now)
+    if wait > 0:
+      metrics["threshold_exceeded_wait_times"].add(wait)
+      yield env.timeout(wait)
+    metrics["requests_processed"] += 1
+    if arrived_at is not None: # A CountingStore doesn't know when requests arrived.
+      metrics["queue_delays"].add(env.now - arrived_at)
+
+def simulate(limiter: RateLimiter, duration, avg_arrival_speed = None,
+             inter_arrival_times = None, reservoir_size = 0, backlog = "store", streams = None) -> dict:
+  """
+  Runs the limiter in the fixed window simulation topology and returns the
+  same metrics as fixed_window.simulate.
+  """
+  metrics = new_metrics(reservoir_size)
+  env = simpy.Environment()
+  store = BACKLOGS[backlog](env)
+  if inter_arrival_times is None:
+    env.process(generate_requests(env, avg_arrival_speed, store, metrics, streams))
+  else:
+    env.process(replay_requests(env, inter_arrival_times, store, metrics))
+  env.process(rate_limited_processor(env, limiter, store, metrics))
+  env.run(until = duration)
+  return metrics
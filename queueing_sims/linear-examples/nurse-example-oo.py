@@ -2,14 +2,27 @@
 
 ###############################################################################
 # An rewrite of the nurse-example.py script using OO.
+#
+# Set Parameters.batch_means to estimate the steady-state average wait from
+# one long run instead of replications (see batch_means.py). sim_duration is
+# then the longest it runs, and relative_precision stops it early.
 ###############################################################################
 
 import simpy
-import random
-import pandas as pd
+import numpy as np
+
+from queueing_sims import lindley
+from queueing_sims.arrivals import inter_arrival_distribution
+from queueing_sims.batch_means import BatchMeans, precision_monitor
+from queueing_sims.confidence import confidence_interval
+from queueing_sims.distributions import Exponential, RandomStreams, TraceExhausted
+from queueing_sims.event_log import ARRIVED, FINISHED, NULL_LOG, STARTED
+from queueing_sims.recorder import Recorder
+from queueing_sims.replications import SequentialReplications, run_replications
+from queueing_sims.warmup import mser
 
 from dataclasses import dataclass
-from typing import NamedTuple
+from typing import NamedTuple, Optional
 from statistics import mean
 
 class Parameters(NamedTuple):
@@ -17,7 +30,18 @@ class Parameters(NamedTuple):
   avg_consult_time: int
   num_nurses: int
   sim_duration: int 
-  number_of_runs: int
+  number_of_runs: int # The minimum when a precision target is set.
+  engine: str = "simpy" # simpy or lindley (single nurse only)
+  master_seed: Optional[int] = None # Set to make the runs reproducible.
+  # Keep running until the 95% confidence interval of the average wait is
+  # within this fraction of the mean. None runs exactly number_of_runs.
+  relative_precision: Optional[float] = 0.1
+  max_runs: int = 500 # The budget when a precision target is set.
+  # Drop the patients who arrived while the clinic was still filling up
+  # from empty (MSER-5, see warmup.py) from the average wait.
+  truncate_warmup: bool = False
+  # One long run with batch means intervals instead of replications.
+  batch_means: bool = False
 
 @dataclass
 class Patient:
@@ -25,25 +49,63 @@ class Patient:
   wait_time_for_nurse: int = 0
 
 class NurseConsultationModel:
-  def __init__(self, parameters, run_iteration) -> None:
+  # The station id of the nurses in the event log.
+  NURSE = 0
+
+  def __init__(self, parameters, run_iteration, rng = None, event_log = NULL_LOG, streams = None) -> None:
     self.env = simpy.Environment()
     self.run_iteration = run_iteration
+    self.rng = rng # The NumPy Generator for the run. Used by the lindley engine.
+    self.event_log = event_log # Where the simpy engine logs each patient's progress.
     self.parameters = parameters
+    # Pass streams to replay or record a trace with the simpy engine (see traces.py).
+    self.streams = RandomStreams(rng) if streams is None else streams
+    self.arrivals = self.streams.add("arrivals", inter_arrival_distribution(parameters.patient_arrival_time))
+    self.consultations = self.streams.add("consultation", Exponential(parameters.avg_consult_time))
     self.patient_counter = 0
     self.nurses = simpy.Resource(self.env, capacity = parameters.num_nurses)
     
     self.average_wait_time = 0
-    self.results = pd.DataFrame()
-    self.results["P_ID"] = []
-    self.results["P_START_WAIT_FOR_NURSE_TIME"] = []
-    self.results["P_STOP_WAIT_FOR_NURSE_TIME"] = []
-    self.results["P_TOTAL_WAIT_FOR_NURSE_TIME"] = []
-    self.results.set_index("P_ID", inplace = True)
+    self.warmup = None # The Truncation of the waits when truncate_warmup is set.
+    # With batch_means the waits go here rather than in the recorder, so memory stays bounded.
+    self.wait_batches = BatchMeans() if parameters.batch_means else None
+    self.batch_estimate = None
+    self.recorder = Recorder({
+      "P_ID": np.int64,
+      "P_START_WAIT_FOR_NURSE_TIME": np.float64,
+      "P_STOP_WAIT_FOR_NURSE_TIME": np.float64,
+      "P_TOTAL_WAIT_FOR_NURSE_TIME": np.float64
+    }, index = "P_ID")
+    self.results = self.recorder.to_frame()
 
   def run(self):
-    self.env.process(self._generate_patient_arrivals())
-    self.env.run(until = self.parameters.sim_duration)
+    if self.parameters.engine == "lindley":
+      self._run_lindley()
+    else:
+      self.env.process(self._generate_patient_arrivals())
+      if self.wait_batches is None or self.parameters.relative_precision is None:
+        self.env.run(until = self.parameters.sim_duration)
+      else:
+        # Check the precision a hundred times over the longest the run can take.
+        self.env.run(until = self.env.process(precision_monitor(self.env, self.wait_batches,
+          self.parameters.relative_precision, self.parameters.sim_duration / 100, self.parameters.sim_duration)))
     self.calculate_avg_waiting_time_to_see_a_nurse()
+    self.results = self.recorder.to_frame()
+
+  def _run_lindley(self):
+    """Computes every patient's wait in one pass with the Lindley recursion."""
+    if self.parameters.num_nurses != 1:
+      raise ValueError("The lindley engine only supports a single nurse.")
+    inter_arrival_times, consult_times = lindley.exponential_samples(self.parameters.patient_arrival_time,
+      self.parameters.avg_consult_time, self.parameters.sim_duration, self.rng)
+    results = lindley.simulate(inter_arrival_times, consult_times, self.parameters.sim_duration)
+    if self.wait_batches is not None:
+      self.wait_batches.extend(results["P_TOTAL_WAIT_FOR_NURSE_TIME"].values)
+      return
+    self.recorder.extend(P_ID = results.index.values,
+      P_START_WAIT_FOR_NURSE_TIME = results["P_START_WAIT_FOR_NURSE_TIME"].values,
+      P_STOP_WAIT_FOR_NURSE_TIME = results["P_STOP_WAIT_FOR_NURSE_TIME"].values,
+      P_TOTAL_WAIT_FOR_NURSE_TIME = results["P_TOTAL_WAIT_FOR_NURSE_TIME"].values)
 
   def _generate_patient_arrivals(self):
     """Generate patients until the simulation ends."""
@@ -56,60 +118,103 @@ class NurseConsultationModel:
       self.env.process(self._clinic_proccess(patient))
 
       # Determine how long until the next patient arrives.
-      time_until_next_patient = random.expovariate( 1.0 / self.parameters.patient_arrival_time)
+      try:
+        time_until_next_patient = self.arrivals.sample()
+      except TraceExhausted:
+        return # A replayed trace has no more arrivals.
       yield self.env.timeout(time_until_next_patient)
 
   def _clinic_proccess(self, patient):
     """The process that this simulation is modeling."""
     patient_started_waiting = self.env.now
-    print(f"Patient {patient.id} started waiting for a nurse at {patient_started_waiting}")
+    self.event_log.info(patient_started_waiting, patient.id, self.NURSE, ARRIVED)
     
     with self.nurses.request() as req:
       # The patient waits until a nurse is free.
       yield req
       patient_finished_waiting = self.env.now
-      print(f"Patient {patient.id} finished waiting at {patient_finished_waiting}")
+      self.event_log.info(patient_finished_waiting, patient.id, self.NURSE, STARTED)
       patient.wait_time_for_nurse = patient_finished_waiting - patient_started_waiting
       
 
-      # Save metrics to the results dataframe.
-      # Note: This is probably a horrible way to do this. 
-      # I'm guessing it's better to build an array of NamedTuples or a Dict
-      # and then building a dataframe from that in one go.
-      metrics = pd.DataFrame({
-        "P_ID": [patient.id],
-        "P_START_WAIT_FOR_NURSE_TIME": [patient_started_waiting],
-        "P_STOP_WAIT_FOR_NURSE_TIME": [patient_finished_waiting],
-        "P_TOTAL_WAIT_FOR_NURSE_TIME": [patient.wait_time_for_nurse]
-      })
-
-      metrics.set_index("P_ID", inplace=True)
-      self.results = self.results.append(metrics)
+      # Save metrics to the results recorder.
+      if self.wait_batches is None:
+        self.recorder.append(patient.id, patient_started_waiting, patient_finished_waiting, 
+          patient.wait_time_for_nurse)
+      else:
+        self.wait_batches.add(patient.wait_time_for_nurse)
 
       # Deterimine how long the patient will spend with the nurse.
-      time_with_nurse = random.expovariate(1.0 / self.parameters.avg_consult_time)
+      time_with_nurse = self.consultations.sample()
       yield self.env.timeout(time_with_nurse)
+      self.event_log.debug(self.env.now, patient.id, self.NURSE, FINISHED)
 
   def calculate_avg_waiting_time_to_see_a_nurse(self):
-    self.average_wait_time = self.results["P_TOTAL_WAIT_FOR_NURSE_TIME"].mean()
+    if self.wait_batches is not None:
+      # Batch means drop the warm-up themselves.
+      self.batch_estimate = self.wait_batches.estimate()
+      self.average_wait_time = self.batch_estimate.overlapping.mean
+    elif self.parameters.truncate_warmup:
+      self.warmup = mser(self.recorder.column("P_TOTAL_WAIT_FOR_NURSE_TIME"),
+        times = self.recorder.column("P_START_WAIT_FOR_NURSE_TIME"))
+      self.average_wait_time = self.warmup.mean
+    else:
+      self.average_wait_time = self.recorder.mean("P_TOTAL_WAIT_FOR_NURSE_TIME")
 
 class RunResult(NamedTuple):
   run: int
   average_wait_time: int
+  warmup_end: float = 0.0 # When the dropped warm-up ended, with truncate_warmup.
+
+def run_model(run, rng, parameters) -> RunResult:
+  """Runs a single replication. Called in a worker process."""
+  sim = NurseConsultationModel(parameters, run, rng)
+  sim.run()
+  warmup_end = 0.0 if sim.warmup is None or sim.warmup.time is None else sim.warmup.time
+  return RunResult(run, sim.average_wait_time, warmup_end)
+
+def run_batch_means(parameters):
+  """Estimates the average wait from a single long run."""
+  sim = NurseConsultationModel(parameters, 1, np.random.default_rng(parameters.master_seed))
+  sim.run()
+  estimate = sim.batch_estimate
+  # The lindley engine always covers the whole duration and doesn't use env.
+  minutes = parameters.sim_duration if parameters.engine == "lindley" else sim.env.now
+  print(f"{sim.wait_batches.count} patients saw a nurse in {minutes:g} of at most {parameters.sim_duration} minutes.")
+  print(f"Average wait for a nurse, batch means: {estimate.nonoverlapping} minutes.")
+  print(f"Average wait for a nurse, overlapping batch means: {estimate.overlapping} minutes "
+        f"(±{estimate.overlapping.relative_half_width:.1%} of the mean).")
+  print(f"{estimate.warmup} patients were dropped as warm-up. The rest made {estimate.batches} batches of "
+        f"{estimate.batch_size} with a lag-1 autocorrelation of {estimate.lag1:.3f}.")
+  if estimate.correlated:
+    print("The batch means are still correlated, so the intervals are likely too narrow. Run longer.")
 
 def main():
   parameters = Parameters(5, 6, 1, 120, 10)
+  if parameters.batch_means:
+    run_batch_means(parameters)
+    return
+  if parameters.relative_precision is None:
+    replications = run_replications(run_model, parameters.number_of_runs, parameters.master_seed, args = (parameters,))
+  else:
+    replications = SequentialReplications(run_model, "average_wait_time", parameters.master_seed,
+      relative_precision = parameters.relative_precision, min_runs = parameters.number_of_runs,
+      max_runs = parameters.max_runs, args = (parameters,))
   run_results = []
-  for sim_run in range(parameters.number_of_runs):
-    run = sim_run + 1
-    print(f"Run {run} of {parameters.number_of_runs} -----------------------------------------------------------")
-    sim = NurseConsultationModel(parameters, run)
-    sim.run()
-    
-    run_results.append(RunResult(run, sim.average_wait_time))
+  for run_result in replications:
+    print(f"Run {run_result.run} finished -------------------------------------------------")
+    if parameters.truncate_warmup:
+      print(f"Patients who arrived in the first {run_result.warmup_end:.1f} minutes were left out as warm-up.")
+    run_results.append(run_result)
     waiting_times = list((x.average_wait_time for x in run_results))
     avg_waiting_time = mean(waiting_times)
     print(f"The average time spent waiting for a nurse is {avg_waiting_time} minutes.")
 
+  interval = confidence_interval(waiting_times)
+  print(f"Average wait for a nurse over {len(run_results)} runs: {interval} minutes "
+        f"(±{interval.relative_half_width:.1%} of the mean).")
+  if isinstance(replications, SequentialReplications) and not replications.converged:
+    print(f"Stopped at the budget of {parameters.max_runs} runs before reaching ±{parameters.relative_precision:.0%}.")
+
 if __name__ == "__main__":
   main()
\ No newline at end of file
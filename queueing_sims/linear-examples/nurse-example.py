@@ -11,20 +11,52 @@
 # The nurse sees patients in the order they arrived (FIFO).
 # Patients arrive following an exponential (posson) distribution.
 # The amount of time an appointment takes also follows an exponential distribution.
+#
+# Set EVENT_LOG_PATH to log every patient's arrival and consultation, then
+# view the log with event-log-viewer.py. Set RECORD_TRACE_PATH to save the
+# arrivals and consultation times, and REPLAY_TRACE_PATH to run on a saved
+# or real trace (see traces.py) instead of random draws.
 ###############################################################################
 
 import simpy
-import random
+
+from queueing_sims import lindley
+from queueing_sims.arrivals import inter_arrival_distribution
+from queueing_sims.distributions import Exponential, RandomStreams, TraceExhausted
+from queueing_sims.event_log import ARRIVED, FINISHED, NULL_LOG, STARTED, EventLog
+from queueing_sims.streaming_stats import RunningStats
+from queueing_sims.traces import TraceRecorder, read_trace
+
+# Which engine runs the simulation.
+# - simpy: A SimPy process per patient.
+# - lindley: Every patient's wait computed in one pass with the Lindley recursion.
+ENGINE = "simpy"
+
+# Where to write the event log, and the lowest level to log (info or debug).
+# None turns the log off.
+EVENT_LOG_PATH = None
+EVENT_LOG_LEVEL = "info"
+NURSE = 0 # The nurse's station id in the event log.
+
+# Traces of the "arrivals" and "consultation" streams. SimPy engine only.
+RECORD_TRACE_PATH = None
+REPLAY_TRACE_PATH = None
 
 # Patient arrival builder function.
 # Responsible for creating new patients.
-def patient_builder(env, patient_arrival_time, mean_consult, nurse):
+def patient_builder(env, patient_arrival_time, mean_consult, nurse, streams = None,
+                    waits = None, log = NULL_LOG):
   p_id = 1
 
+  # Exponentially distributed times, drawn in blocks from named streams.
+  streams = RandomStreams() if streams is None else streams
+  arrivals = streams.add("arrivals", inter_arrival_distribution(patient_arrival_time))
+  consultation_times = streams.add("consultation", Exponential(mean_consult))
+
   # Create patients until the program ends.
   while True:
     # Create an instance of an activity generator function.
-    ca = consultation_activity(env, mean_consult, nurse, p_id)
+    ca = consultation_activity(env, consultation_times, nurse, p_id, waits, log)
 
     # Run the activity for this patient.
     env.process(ca)
@@ -32,16 +64,19 @@ def patient_builder(env, patient_arrival_time, mean_consult, nurse):
     # Determine the sample time until the next patient arrives at the office.
     # Using exponential distribution.
     # Is this the same as Poisson 
-    time_until_next_patient = random.expovariate(1.0 / patient_arrival_time)
+    try:
+      time_until_next_patient = arrivals.sample()
+    except TraceExhausted:
+      return # A replayed trace has no more arrivals.
 
     # Wait until the time has passed.
     yield env.timeout(time_until_next_patient)
 
     p_id += 1 
 
-def consultation_activity(env, mean_consult, nurse, p_id):
+def consultation_activity(env, consultation_times, nurse, p_id, waits = None, log = NULL_LOG):
   time_entered_queue_for_nurse = env.now
-  print(f"Patient: {p_id} entered queue at {time_entered_queue_for_nurse}.")
+  log.info(time_entered_queue_for_nurse, p_id, NURSE, ARRIVED)
 
   # Request a consultation with the nurse.
   with nurse.request() as req:
@@ -53,15 +88,17 @@ def consultation_activity(env, mean_consult, nurse, p_id):
 
     # Calculate the time the patient was waiting.
     time_left_queue_for_nurse = env.now
-    print(f"Patient: {p_id} left queue at {time_left_queue_for_nurse}.")
+    log.info(time_left_queue_for_nurse, p_id, NURSE, STARTED)
     time_in_queue = time_left_queue_for_nurse - time_entered_queue_for_nurse
-    print(f" Patient: {p_id} waited for {time_in_queue}")
+    if waits is not None:
+      waits.add(time_in_queue)
 
     # Determine how long the consultation takes.
-    consultation_time = random.expovariate(1.0 / mean_consult)
+    consultation_time = consultation_times.sample()
 
     # Wait until the consultation is over.
     yield env.timeout(consultation_time)
+    log.debug(env.now, p_id, NURSE, FINISHED)
 
 # Setup the simulation environment.
 env = simpy.Environment()
@@ -76,8 +113,22 @@ nurse = simpy.Resource(env, capacity=1)
 patient_arrival_time = 5
 mean_consult_time = 6
 
-# Register the creation of the patient arrivals
-env.process(patient_builder(env, patient_arrival_time, mean_consult_time, nurse))
-
-# Run the simulation
-env.run(until=120)
\ No newline at end of file
+if ENGINE == "lindley":
+  inter_arrival_times, consult_times = lindley.exponential_samples(patient_arrival_time, mean_consult_time, 120)
+  results = lindley.simulate(inter_arrival_times, consult_times, 120)
+  waits = results["P_TOTAL_WAIT_FOR_NURSE_TIME"]
+  print(f"{len(waits)} patients saw the nurse after waiting {waits.mean()} minutes on average.")
+else:
+  waits = RunningStats()
+  trace = None if REPLAY_TRACE_PATH is None else read_trace(REPLAY_TRACE_PATH)[1]
+  recorder = None if RECORD_TRACE_PATH is None else TraceRecorder(RECORD_TRACE_PATH)
+  streams = RandomStreams(trace = trace, recorder = recorder)
+  with EventLog(EVENT_LOG_PATH, EVENT_LOG_LEVEL, stations = ["nurse"]) as log:
+    # Register the creation of the patient arrivals
+    env.process(patient_builder(env, patient_arrival_time, mean_consult_time, nurse, streams,
+                                waits = waits, log = log))
+
+    # Run the simulation
+    env.run(until=120)
+  streams.close()
+  print(f"{waits.count} patients saw the nurse after waiting {waits.mean} minutes on average.")
\ No newline at end of file
@@ -9,10 +9,21 @@
 #
 # Flow
 # People Arriving at the Office -> Registration -> Nurse -> Sink
+#
+# Set EVENT_LOG_PATH to log every patient's progress, then view the log with
+# event-log-viewer.py.
 ###############################################################################
 
 import simpy
-import random
+
+import numpy as np
+
+from queueing_sims import lindley
+from queueing_sims.arrivals import inter_arrival_distribution
+from queueing_sims.distributions import Exponential, RandomStreams, TraceExhausted
+from queueing_sims.event_log import ARRIVED, FINISHED, NULL_LOG, STARTED, EventLog
+from queueing_sims.streaming_stats import RunningStats
+from queueing_sims import tandem
 
 # Configure the module's parameters.
 # Time is in minutes.
@@ -21,18 +32,38 @@ AVG_REGISTRATION_TIME = 2
 AVG_EVALUATION_TIME = 5
 NUM_RECPTIONISTS = 1
 NUM_NURSES = 1
+SIM_DURATION = 120
+
+# Which engine runs the simulation.
+# - simpy: A SimPy process per patient.
+# - tandem: Batches of patients pushed through both stations at once.
+ENGINE = "simpy"
+
+# Where to write the event log, and the lowest level to log (info or debug).
+# None turns the log off.
+EVENT_LOG_PATH = None
+EVENT_LOG_LEVEL = "info"
+STATIONS = ["registration", "a nurse"]
+REGISTRATION, NURSE = range(len(STATIONS))
 
 # Patient arrival builder function.
 # Responsible for creating new patients.
 def patient_builder(env, patient_arrival_time, avg_register_time, 
-                    avg_evaluation_time, receptionist, nurse):
+                    avg_evaluation_time, receptionist, nurse, streams = None,
+                    waits = None, log = NULL_LOG):
   p_id = 1
 
+  # Exponentially distributed times, drawn in blocks from named streams.
+  streams = RandomStreams() if streams is None else streams
+  arrivals = streams.add("arrivals", inter_arrival_distribution(patient_arrival_time))
+  registration_times = streams.add("registration", Exponential(avg_register_time))
+  evaluation_times = streams.add("evaluation", Exponential(avg_evaluation_time))
+
   # Create patients until the program ends.
   while True:
     # Create an instance of an activity generator function.
-    p = activity_generator_ed(env, avg_register_time, avg_evaluation_time, 
-                                receptionist, nurse, p_id)
+    p = activity_generator_ed(env, registration_times, evaluation_times, 
+                                receptionist, nurse, p_id, waits, log)
 
     # Run the activity for this patient.
     env.process(p)
@@ -40,16 +71,21 @@ def patient_builder(env, patient_arrival_time, avg_register_time,
     # Determine the sample time until the next patient arrives at the office.
     # Using exponential distribution.
     # Is this the same as Poisson 
-    time_until_next_patient = random.expovariate(1.0 / patient_arrival_time)
+    try:
+      time_until_next_patient = arrivals.sample()
+    except TraceExhausted:
+      return # A replayed trace has no more arrivals.
 
     # Wait until the time has passed.
     yield env.timeout(time_until_next_patient)
 
     p_id += 1 
 
-def activity_generator_ed(env, avg_register_time, avg_evaluation_time, 
-                                receptionist, nurse, p_id):
+def activity_generator_ed(env, registration_times, evaluation_times, 
+                                receptionist, nurse, p_id, waits = None, log = NULL_LOG):
+  """waits collects how long each patient waited for a nurse."""
   time_entered_queue_for_registration = env.now
+  log.info(time_entered_queue_for_registration, p_id, REGISTRATION, ARRIVED)
 
   # Stand in line for the receptionist.
   with receptionist.request() as req:
@@ -57,17 +93,18 @@ def activity_generator_ed(env, avg_register_time, avg_evaluation_time,
     yield req
 
     time_left_queue_for_registration = env.now
-    time_in_queue_for_registration = time_left_queue_for_registration - time_entered_queue_for_registration
-    print(f"Patient {p_id} waited for registration for {time_in_queue_for_registration} minutes")
+    log.info(time_left_queue_for_registration, p_id, REGISTRATION, STARTED)
 
     # Determine how long it takes to register this patient.
-    patient_registration_time = random.expovariate(1.0 / avg_register_time)
+    patient_registration_time = registration_times.sample()
 
     # Spend time performing the patient registration process.
     yield env.timeout(patient_registration_time)
+    log.debug(env.now, p_id, REGISTRATION, FINISHED)
 
   # After registration process is complete. The patient waits to see the nurse.
   time_entered_queue_to_see_a_nurse = env.now
+  log.info(time_entered_queue_to_see_a_nurse, p_id, NURSE, ARRIVED)
 
   # Wait for a nurse.
   with nurse.request() as req:
@@ -76,15 +113,54 @@ def activity_generator_ed(env, avg_register_time, avg_evaluation_time,
 
     time_left_queue_for_a_nurse = env.now
     time_spent_in_queue_for_a_nurse = time_left_queue_for_a_nurse - time_entered_queue_to_see_a_nurse
-    print(f"Patient {p_id} waited for a nurse for {time_spent_in_queue_for_a_nurse} minutes")
+    log.info(time_left_queue_for_a_nurse, p_id, NURSE, STARTED)
+    if waits is not None:
+      waits.add(time_spent_in_queue_for_a_nurse)
 
     # Determine how long the patient spends with a nurse.
-    patient_evaluation_time = random.expovariate(1.0/avg_evaluation_time)
+    patient_evaluation_time = evaluation_times.sample()
 
     # Spend time doing the patient evaluation.
     yield env.timeout(patient_evaluation_time)
+    log.debug(env.now, p_id, NURSE, FINISHED)
+
+def run_tandem_engine(sim_duration, log = NULL_LOG):
+  """
+  Pushes every patient through registration and then the nurses without
+  SimPy. Returns the waits of the patients who saw a nurse.
+  """
+  rng = np.random.default_rng()
+  inter_arrival_times, registration_times = lindley.exponential_samples(AVG_PATIENT_ARRIVAL_TIME, 
+    AVG_REGISTRATION_TIME, sim_duration, rng)
+  evaluation_times = rng.exponential(AVG_EVALUATION_TIME, len(inter_arrival_times))
+  result = tandem.simulate(inter_arrival_times, [registration_times, evaluation_times], 
+    [NUM_RECPTIONISTS, NUM_NURSES], STATIONS)
+
+  # Log the events in time order, as the SimPy version does.
+  times, entities, stations, events = [], [], [], []
+  for station, waits in enumerate(result.waits):
+    for event, event_times in ((ARRIVED, waits.start_wait), (STARTED, waits.stop_wait)):
+      times.append(event_times)
+      entities.append(waits.ids)
+      stations.append(np.full(len(event_times), station))
+      events.append(np.full(len(event_times), event))
+  times = np.concatenate(times)
+  order = np.argsort(times, kind="stable")
+  order = order[times[order] < sim_duration]
+  log.extend(times[order], np.concatenate(entities)[order], np.concatenate(stations)[order],
+             np.concatenate(events)[order])
+
+  nurse_waits = result.waits[NURSE]
+  seen = nurse_waits.stop_wait < sim_duration
+  return nurse_waits.total_wait[seen]
 
 def main():
+  if ENGINE == "tandem":
+    with EventLog(EVENT_LOG_PATH, EVENT_LOG_LEVEL, stations = STATIONS) as log:
+      nurse_waits = run_tandem_engine(SIM_DURATION, log)
+    print(f"{len(nurse_waits)} patients saw a nurse after waiting {nurse_waits.mean()} minutes on average.")
+    return
+
   # Setup the simulation environment
   env = simpy.Environment()
 
@@ -92,11 +168,15 @@ def main():
   receptionists = simpy.Resource(env, capacity=NUM_RECPTIONISTS)
   nurses = simpy.Resource(env, capacity=NUM_NURSES)
 
-  # Register the creation of the patient arrivals
-  env.process(patient_builder(env, AVG_PATIENT_ARRIVAL_TIME,AVG_REGISTRATION_TIME, AVG_EVALUATION_TIME, receptionists, nurses))
+  waits = RunningStats()
+  with EventLog(EVENT_LOG_PATH, EVENT_LOG_LEVEL, stations = STATIONS) as log:
+    # Register the creation of the patient arrivals
+    env.process(patient_builder(env, AVG_PATIENT_ARRIVAL_TIME,AVG_REGISTRATION_TIME, AVG_EVALUATION_TIME, receptionists, nurses,
+                                waits = waits, log = log))
 
-  # Run the simulation
-  env.run(until=120)
+    # Run the simulation
+    env.run(until=SIM_DURATION)
+  print(f"{waits.count} patients saw a nurse after waiting {waits.mean} minutes on average.")
 
 if __name__ == "__main__":
   main()
\ No newline at end of file
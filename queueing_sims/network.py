@@ -0,0 +1,236 @@
+###############################################################################
+# Queueing networks described as data.
+#
+# A Network is a list of Stations (a name, a number of identical servers and
+# a service time distribution), a distribution of the time between external
+# arrivals and a routing matrix: routing[i][j] is the probability an entity
+# that finishes at station i goes to station j next. Whatever is left of a
+# row is the probability it leaves the network. Routes can loop, e.g. a
+# patient sent back to the nurse after seeing a doctor.
+#
+# simulate() runs the network with its own event loop instead of SimPy:
+# - A single heapq calendar of (time, sequence, station, entity) tuples. An
+#   external arrival is station -1, anything else a service finishing.
+# - Entities are small __slots__ records, not a generator per entity.
+# - Routing is a lookup table per station: the cumulative probabilities of
+#   the stations it feeds, searched with bisect. A station that always
+#   feeds the same station doesn't draw a random number.
+# - Each station queues FIFO in a deque and keeps time-weighted integrals
+#   of its queue length and busy servers.
+#
+# Random numbers come from RandomStreams: "arrivals", "service <station>"
+# per station, "entry" and "routing". Service times are drawn when service
+# starts.
+#
+# Usage
+#   network = Network([Station("registration", 1, Exponential(2)),
+#                      Station("nurse", 1, Exponential(5))],
+#                     Exponential(8), routing = [[0, 1], [0, 0]])
+#   print(network.simulate(60 * 8, RandomStreams(42)).report())
+###############################################################################
+
+from bisect import bisect_right
+from collections import deque
+from heapq import heappop, heappush
+from typing import NamedTuple, Optional
+
+import numpy as np
+
+from queueing_sims.distributions import RandomStreams, Uniform
+from queueing_sims.streaming_stats import RunningStats
+
+EXIT = -1 # The route out of the network.
+ARRIVAL = -1 # The calendar's station for an external arrival.
+
+class Station(NamedTuple):
+  name: str
+  capacity: int # Identical servers.
+  service: object # A distribution from distributions.py.
+
+class StationStats(NamedTuple):
+  name: str
+  capacity: int
+  arrivals: int
+  served: int # Entities that started service.
+  waits: RunningStats # Time spent queuing before service.
+  utilization: float # The average fraction of the servers that were busy.
+  mean_queue_length: float # Time-weighted.
+  max_queue_length: int
+
+class NetworkResult(NamedTuple):
+  duration: float
+  stations: list # StationStats, in the order of the network's stations.
+  arrived: int # External arrivals.
+  exited: int # Entities that left the network.
+  sojourn: RunningStats # Time in the network of the entities that left.
+  waited: RunningStats # Total time queuing of the entities that left.
+
+  def station(self, name: str) -> StationStats:
+    return next(stats for stats in self.stations if stats.name == name)
+
+  def report(self) -> str:
+    lines = [f"{self.arrived} arrived and {self.exited} left in {self.duration:g}. "
+      f"Those who left spent {self.sojourn.mean:.3f} in the network, {self.waited.mean:.3f} of it queuing.",
+      f"{'Station':<24} {'Servers':>7} {'Arrivals':>9} {'Served':>9} {'Avg wait':>9} {'Max wait':>9} "
+      f"{'Busy':>6} {'Avg queue':>9} {'Max queue':>9}"]
+    for stats in self.stations:
+      max_wait = stats.waits.max if stats.waits.count else 0.0
+      lines.append(f"{stats.name:<24} {stats.capacity:>7} {stats.arrivals:>9} {stats.served:>9} "
+        f"{stats.waits.mean:>9.3f} {max_wait:>9.3f} {stats.utilization:>6.1%} "
+        f"{stats.mean_queue_length:>9.2f} {stats.max_queue_length:>9}")
+    return "\n".join(lines)
+
+class Entity:
+  __slots__ = ("id", "created", "arrived", "waited")
+
+  def __init__(self, id: int, created: float) -> None:
+    self.id = id
+    self.created = created
+    self.arrived = created # When it joined the current station's queue.
+    self.waited = 0.0 # Total time spent queuing.
+
+def _route_table(probabilities) -> tuple:
+  """The (cumulative probabilities, destinations) of one row, exiting with whatever is left."""
+  cumulative = []
+  destinations = []
+  total = 0.0
+  for destination, probability in enumerate(probabilities):
+    if probability > 0:
+      total += probability
+      cumulative.append(total)
+      destinations.append(destination)
+  if total < 1 - 1e-12:
+    cumulative.append(1.0)
+    destinations.append(EXIT)
+  cumulative[-1] = 1.0 # Guard against the row summing to a hair under 1.
+  return cumulative, destinations
+
+class Network:
+  """
+  Stations connected by a routing matrix, fed by external arrivals. entry
+  holds the probability an external arrival joins each station and
+  defaults to all of them joining the first.
+  """
+  def __init__(self, stations: list, arrivals, routing, entry = None) -> None:
+    self.stations = list(stations)
+    count = len(self.stations)
+    if count == 0:
+      raise ValueError("A network needs at least one station.")
+    if len({station.name for station in self.stations}) != count:
+      raise ValueError("Every station needs a different name.")
+    if any(station.capacity < 1 for station in self.stations):
+      raise ValueError("Every station needs at least one server.")
+    self.arrivals = arrivals
+    self.routing = np.asarray(routing, dtype=np.float64)
+    self.entry = np.eye(count)[0] if entry is None else np.asarray(entry, dtype=np.float64)
+    if self.routing.shape != (count, count):
+      raise ValueError(f"The routing matrix must be {count} x {count}, one row and column per station.")
+    if (self.routing < 0).any() or (self.routing.sum(axis=1) > 1 + 1e-9).any():
+      raise ValueError("Every row of the routing matrix must be probabilities that sum to at most 1.")
+    if self.entry.shape != (count,) or (self.entry < 0).any() or abs(self.entry.sum() - 1) > 1e-9:
+      raise ValueError("The entry probabilities must sum to 1 over the stations.")
+
+  def index(self, name: str) -> int:
+    return [station.name for station in self.stations].index(name)
+
+  def simulate(self, duration: float, streams: Optional[RandomStreams] = None) -> NetworkResult:
+    """Runs the network from empty for duration, the first arrival at time zero."""
+    streams = RandomStreams() if streams is None else streams
+    stations = self.stations
+    count = len(stations)
+    next_arrival = streams.add("arrivals", self.arrivals).sample
+    services = [streams.add(f"service {station.name}", station.service).sample for station in stations]
+    routing_draw = streams.add("routing", Uniform()).sample
+    entry_draw = streams.add("entry", Uniform()).sample
+    routes = [_route_table(row) for row in self.routing]
+    # The destination of rows that always go the same way, else None.
+    fixed = [destinations[0] if len(destinations) == 1 else None for _, destinations in routes]
+    entry_cumulative, entry_stations = _route_table(self.entry)
+    fixed_entry = entry_stations[0] if len(entry_stations) == 1 else None
+
+    capacities = [station.capacity for station in stations]
+    busy = [0] * count
+    queues = [deque() for _ in range(count)]
+    arrivals = [0] * count
+    served = [0] * count
+    waits = [RunningStats() for _ in range(count)]
+    busy_area = [0.0] * count
+    queue_area = [0.0] * count
+    max_queue = [0] * count
+    last_change = [0.0] * count
+    sojourn = RunningStats()
+    waited = RunningStats()
+    exited = 0
+    created = 0
+
+    calendar = [(0.0, 0, ARRIVAL, None)]
+    sequence = 1
+    while calendar:
+      now, _, station, entity = heappop(calendar)
+      if now >= duration:
+        break
+
+      if station == ARRIVAL:
+        created += 1
+        entity = Entity(created, now)
+        heappush(calendar, (now + next_arrival(), sequence, ARRIVAL, None))
+        sequence += 1
+        if fixed_entry is None:
+          destination = entry_stations[bisect_right(entry_cumulative, entry_draw())]
+        else:
+          destination = fixed_entry
+      else:
+        # A service finished: hand the server to the next in line, then route.
+        elapsed = now - last_change[station]
+        busy_area[station] += busy[station] * elapsed
+        queue_area[station] += len(queues[station]) * elapsed
+        last_change[station] = now
+        queue = queues[station]
+        if queue:
+          waiting = queue.popleft()
+          wait = now - waiting.arrived
+          waiting.waited += wait
+          waits[station].add(wait)
+          served[station] += 1
+          heappush(calendar, (now + services[station](), sequence, station, waiting))
+          sequence += 1
+        else:
+          busy[station] -= 1
+        destination = fixed[station]
+        if destination is None:
+          cumulative, destinations = routes[station]
+          destination = destinations[bisect_right(cumulative, routing_draw())]
+
+      if destination == EXIT:
+        exited += 1
+        sojourn.add(now - entity.created)
+        waited.add(entity.waited)
+        continue
+
+      # Join the destination's queue, or start service if a server is free.
+      elapsed = now - last_change[destination]
+      busy_area[destination] += busy[destination] * elapsed
+      queue_area[destination] += len(queues[destination]) * elapsed
+      last_change[destination] = now
+      arrivals[destination] += 1
+      entity.arrived = now
+      if busy[destination] < capacities[destination]:
+        busy[destination] += 1
+        waits[destination].add(0.0)
+        served[destination] += 1
+        heappush(calendar, (now + services[destination](), sequence, destination, entity))
+        sequence += 1
+      else:
+        queue = queues[destination]
+        queue.append(entity)
+        if len(queue) > max_queue[destination]:
+          max_queue[destination] = len(queue)
+
+    results = []
+    for index, station in enumerate(stations):
+      elapsed = duration - last_change[index]
+      busy_time = busy_area[index] + busy[index] * elapsed
+      queue_time = queue_area[index] + len(queues[index]) * elapsed
+      results.append(StationStats(station.name, station.capacity, arrivals[index], served[index], waits[index],
+        busy_time / (station.capacity * duration), queue_time / duration, max_queue[index]))
+    return NetworkResult(duration, results, created, exited, sojourn, waited)
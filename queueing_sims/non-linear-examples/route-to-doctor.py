@@ -10,10 +10,30 @@
 # Flow
 # People Arriving at the Office -> Registration -> Nurse (choice) -> 20% -> Specialist Doctor
 #                                                                 -> 80% -> General Practitioner Doctor
+#
+# Every patient's activity times and doctor choice are drawn when they
+# arrive. With the same seed, the n-th patient then has the same times in
+# every scenario, which lets compare() use common random numbers.
+#
+# Set EVENT_LOG_PATH to log every patient's progress, then view the log with
+# event-log-viewer.py.
+#
+# build_network describes the same clinic as data for network.py, which
+# runs it without a SimPy process per patient. Set ENGINE to "network" to
+# use it.
 ###############################################################################
 
+from typing import NamedTuple
+
 import simpy
-import random
+
+from queueing_sims.analytic import solve
+from queueing_sims.arrivals import inter_arrival_distribution
+from queueing_sims.comparison import compare_scenarios
+from queueing_sims.distributions import Exponential, RandomStreams, TraceExhausted, Uniform
+from queueing_sims.event_log import ARRIVED, FINISHED, NULL_LOG, STARTED, EventLog
+from queueing_sims.network import Network, Station
+from queueing_sims.streaming_stats import RunningStats
 
 # Configure the module's parameters.
 # Time is in minutes.
@@ -27,21 +47,80 @@ NUM_RECPTIONISTS = 1
 NUM_NURSES = 1
 NUM_SPECIALISTS = 1
 NUM_GP_DOCTORs = 1
+SIM_DURATION = 120
+SPECIALIST_PROBABILITY = 0.2 # The rest of the patients see a GP.
+
+# Which engine runs the simulation.
+# - simpy: A SimPy process per patient.
+# - network: The clinic as a queueing network (see build_network).
+ENGINE = "simpy"
+
+# What main does.
+# - simulate: Runs the model once and prints the average wait.
+# - compare: Compares NUM_NURSES against COMPARE_NUM_NURSES over
+#   COMPARISON_RUNS replications using VARIANCE_REDUCTION (independent, crn
+#   or antithetic, see comparison.py).
+# - analytic: Prints the closed-form waits and utilizations of the clinic as
+#   a Jackson network (see analytic.py) without simulating it.
+MODE = "simulate"
+COMPARE_NUM_NURSES = 2
+COMPARISON_RUNS = 20
+COMPARISON_DURATION = 60 * 8
+VARIANCE_REDUCTION = "crn"
+MASTER_SEED = 42
+
+# Where to write the event log, and the lowest level to log (info or debug).
+# None turns the log off.
+EVENT_LOG_PATH = None
+EVENT_LOG_LEVEL = "info"
+STATIONS = ["registration", "a nurse", "a specialist", "a general practitioner"]
+REGISTRATION, NURSE, SPECIALIST, GP = range(len(STATIONS))
+
+class Parameters(NamedTuple):
+  avg_patient_arrival_time: float = AVG_PATIENT_ARRIVAL_TIME
+  avg_registration_time: float = AVG_REGISTRATION_TIME
+  avg_evaluation_time: float = AVG_EVALUATION_TIME
+  avg_specialist_evaluation_time: float = AVG_SPECIALIST_EVALUATION_TIME
+  avg_gp_evaluation_time: float = AVG_GP_EVALUATION_TIME
+  num_receptionists: int = NUM_RECPTIONISTS
+  num_nurses: int = NUM_NURSES
+  num_specialists: int = NUM_SPECIALISTS
+  num_gp_doctors: int = NUM_GP_DOCTORs
+  sim_duration: float = SIM_DURATION
+  engine: str = ENGINE
+
+class RunResult(NamedTuple):
+  run: int
+  patients_seen: int # Patients who finished with a doctor.
+  average_wait: float # Minutes spent queuing across all stations, per patient seen.
 
 # Patient arrival builder function.
 # Responsible for creating new patients.
 def patient_builder(env, patient_arrival_time, avg_register_time, 
                     avg_evaluation_time, avg_specialist_evaluation_time, 
                     avg_gp_eval_time, receptionist, nurse, 
-                    specialist, gp_doctor):
+                    specialist, gp_doctor, streams = None, waits = None, log = NULL_LOG):
   p_id = 1
 
+  # Every random quantity gets its own named stream, drawn in blocks.
+  streams = RandomStreams() if streams is None else streams
+  arrivals = streams.add("arrivals", inter_arrival_distribution(patient_arrival_time))
+  activity_streams = {
+    "registration": streams.add("registration", Exponential(avg_register_time)),
+    "evaluation": streams.add("evaluation", Exponential(avg_evaluation_time)),
+    "specialist": streams.add("specialist", Exponential(avg_specialist_evaluation_time)),
+    "gp": streams.add("gp", Exponential(avg_gp_eval_time)),
+    "routing": streams.add("routing", Uniform(0, 1))
+  }
+
   # Create patients until the program ends.
   while True:
+    # Draw everything about the patient up front, including the time with
+    # the doctor they don't end up seeing, so the streams stay in step.
+    times = {name: stream.sample() for name, stream in activity_streams.items()}
+
     # Create an instance of an activity generator function.
-    p = activity_generator(env, avg_register_time, avg_evaluation_time, 
-                            avg_specialist_evaluation_time, avg_gp_eval_time,
-                            receptionist, nurse,specialist, gp_doctor, p_id)
+    p = activity_generator(env, times, receptionist, nurse,specialist, gp_doctor, p_id, waits, log)
 
     # Run the activity for this patient.
     env.process(p)
@@ -49,17 +128,20 @@ def patient_builder(env, patient_arrival_time, avg_register_time,
     # Determine the sample time until the next patient arrives at the office.
     # Using exponential distribution.
     # Is this the same as Poisson 
-    time_until_next_patient = random.expovariate(1.0 / patient_arrival_time)
+    try:
+      time_until_next_patient = arrivals.sample()
+    except TraceExhausted:
+      return # A replayed trace has no more arrivals.
 
     # Wait until the time has passed.
     yield env.timeout(time_until_next_patient)
 
     p_id += 1 
 
-def activity_generator(env, avg_register_time, avg_evaluation_time, 
-                            avg_specialist_evaluation_time, avg_gp_eval_time,
-                            receptionist, nurse,specialist, gp_doctor, p_id):
+def activity_generator(env, times, receptionist, nurse,specialist, gp_doctor, p_id, waits = None, log = NULL_LOG):
+  """times holds the patient's activity times and doctor choice. waits collects their total wait."""
   time_entered_queue_for_registration = env.now
+  log.info(time_entered_queue_for_registration, p_id, REGISTRATION, ARRIVED)
 
   # Stand in line for the receptionist.
   with receptionist.request() as req:
@@ -68,16 +150,18 @@ def activity_generator(env, avg_register_time, avg_evaluation_time,
 
     time_left_queue_for_registration = env.now
     time_in_queue_for_registration = time_left_queue_for_registration - time_entered_queue_for_registration
-    print(f"Patient {p_id} waited for registration for {time_in_queue_for_registration} minutes")
+    log.info(time_left_queue_for_registration, p_id, REGISTRATION, STARTED)
 
     # Determine how long it takes to register this patient.
-    patient_registration_time = random.expovariate(1.0 / avg_register_time)
+    patient_registration_time = times["registration"]
 
     # Spend time performing the patient registration process.
     yield env.timeout(patient_registration_time)
+    log.debug(env.now, p_id, REGISTRATION, FINISHED)
 
   # After registration process is complete. The patient waits to see the nurse.
   time_entered_queue_to_see_a_nurse = env.now
+  log.info(time_entered_queue_to_see_a_nurse, p_id, NURSE, ARRIVED)
 
   # Wait for a nurse.
   with nurse.request() as req:
@@ -86,47 +170,121 @@ def activity_generator(env, avg_register_time, avg_evaluation_time,
 
     time_left_queue_for_a_nurse = env.now
     time_spent_in_queue_for_a_nurse = time_left_queue_for_a_nurse - time_entered_queue_to_see_a_nurse
-    print(f"Patient {p_id} waited for a nurse for {time_spent_in_queue_for_a_nurse} minutes")
+    log.info(time_left_queue_for_a_nurse, p_id, NURSE, STARTED)
 
     # Determine how long the patient spends with a nurse.
-    patient_evaluation_time = random.expovariate(1.0/avg_evaluation_time)
+    patient_evaluation_time = times["evaluation"]
 
     # Spend time doing the patient evaluation.
     yield env.timeout(patient_evaluation_time)
+    log.debug(env.now, p_id, NURSE, FINISHED)
 
   # Determine which type of doctor the patient will see.
   # Use a uniform distribion to assign a probability to the patient.
-  doctor_type_probability = random.uniform(0, 1)
+  doctor_type_probability = times["routing"]
 
-  if doctor_type_probability < 0.2: 
+  if doctor_type_probability < SPECIALIST_PROBABILITY: 
     # 20% of patients see the ACU doctor.
     time_entered_queue_for_specialist = env.now
+    log.info(time_entered_queue_for_specialist, p_id, SPECIALIST, ARRIVED)
 
     with specialist.request() as req:
       # Wait until the specialist is available.
       yield req      
       time_done_waiting_to_see_specialist = env.now
       time_spent_waiting_for_specialist = time_done_waiting_to_see_specialist - time_entered_queue_for_specialist
-      print(f"Patient {p_id} waited to see a specialist for {time_spent_waiting_for_specialist} minutes after seeing the nurse.")
+      log.info(time_done_waiting_to_see_specialist, p_id, SPECIALIST, STARTED)
+      time_spent_waiting_for_doctor = time_spent_waiting_for_specialist
 
       # Determine how long this patient will spend with the specialist.
-      evaluation_time = random.expovariate(1.0/avg_specialist_evaluation_time)
+      evaluation_time = times["specialist"]
       yield env.timeout(evaluation_time)
+      log.debug(env.now, p_id, SPECIALIST, FINISHED)
   else: # 80% of patients see the general practitioner
     #wait for the general practitioner
     time_started_waiting_for_gp = env.now
+    log.info(time_started_waiting_for_gp, p_id, GP, ARRIVED)
     with gp_doctor.request() as req:
       yield req # wait until the GP is available.
       time_done_waiting_to_see_gp = env.now
       time_spent_waiting_for_gp = time_done_waiting_to_see_gp - time_started_waiting_for_gp
-      print(f"Patient {p_id} waited to see a general practitioner for {time_spent_waiting_for_gp} minutes after seeing the nurse.")
+      log.info(time_done_waiting_to_see_gp, p_id, GP, STARTED)
+      time_spent_waiting_for_doctor = time_spent_waiting_for_gp
       
       # Determine how long this patient will spend with the specialist.
-      evaluation_time = random.expovariate(1.0/avg_gp_eval_time)
+      evaluation_time = times["gp"]
       yield env.timeout(evaluation_time)
+      log.debug(env.now, p_id, GP, FINISHED)
+
+  if waits is not None:
+    waits.add(time_in_queue_for_registration + time_spent_in_queue_for_a_nurse + time_spent_waiting_for_doctor)
+
+def build_network(parameters: Parameters) -> Network:
+  """The clinic as a queueing network, in the order of STATIONS."""
+  stations = [
+    Station(STATIONS[REGISTRATION], parameters.num_receptionists, Exponential(parameters.avg_registration_time)),
+    Station(STATIONS[NURSE], parameters.num_nurses, Exponential(parameters.avg_evaluation_time)),
+    Station(STATIONS[SPECIALIST], parameters.num_specialists, Exponential(parameters.avg_specialist_evaluation_time)),
+    Station(STATIONS[GP], parameters.num_gp_doctors, Exponential(parameters.avg_gp_evaluation_time))
+  ]
+  routing = [
+    # To: registration, nurse, specialist, GP. Doctors' patients leave.
+    [0, 1, 0, 0],
+    [0, 0, SPECIALIST_PROBABILITY, 1 - SPECIALIST_PROBABILITY],
+    [0, 0, 0, 0],
+    [0, 0, 0, 0]
+  ]
+  return Network(stations, inter_arrival_distribution(parameters.avg_patient_arrival_time), routing)
+
+def run_model(run, rng, parameters: Parameters) -> RunResult:
+  """
+  Runs a single replication without logging. Called in a worker process.
+  Both engines count a patient once they've finished with a doctor. The
+  network engine draws a service time only for the station a patient
+  reaches, not everything up front, so the same seed gives a statistically
+  equivalent run rather than the same one.
+  """
+  if parameters.engine == "network":
+    result = build_network(parameters).simulate(parameters.sim_duration, RandomStreams(rng))
+    return RunResult(run, result.exited, result.waited.mean)
+
+  env = simpy.Environment()
+  waits = RunningStats()
+  env.process(patient_builder(env, parameters.avg_patient_arrival_time, parameters.avg_registration_time,
+                    parameters.avg_evaluation_time, parameters.avg_specialist_evaluation_time,
+                    parameters.avg_gp_evaluation_time,
+                    simpy.Resource(env, capacity=parameters.num_receptionists),
+                    simpy.Resource(env, capacity=parameters.num_nurses),
+                    simpy.Resource(env, capacity=parameters.num_specialists),
+                    simpy.Resource(env, capacity=parameters.num_gp_doctors),
+                    RandomStreams(rng), waits))
+  env.run(until=parameters.sim_duration)
+  return RunResult(run, waits.count, waits.mean)
+
+def compare():
+  baseline = Parameters(sim_duration=COMPARISON_DURATION)
+  scenarios = {
+    f"{baseline.num_nurses} nurse(s)": baseline,
+    f"{COMPARE_NUM_NURSES} nurse(s)": baseline._replace(num_nurses=COMPARE_NUM_NURSES)
+  }
+  comparison = compare_scenarios(run_model, scenarios, "average_wait", COMPARISON_RUNS, MASTER_SEED,
+                                 VARIANCE_REDUCTION)
+  print(comparison.report())
 
 
 def main():
+  if MODE == "compare":
+    compare()
+    return
+
+  if MODE == "analytic":
+    print(solve(build_network(Parameters())).report())
+    return
+
+  if ENGINE == "network":
+    print(build_network(Parameters()).simulate(SIM_DURATION).report())
+    return
+
   # Setup the simulation environment
   env = simpy.Environment()
 
@@ -136,13 +294,19 @@ def main():
   specialists = simpy.Resource(env, capacity=NUM_SPECIALISTS)
   general_practicioners = simpy.Resource(env, capacity=NUM_GP_DOCTORs)
 
-  # Register the creation of the patient arrivals  
-  env.process(patient_builder(env, AVG_PATIENT_ARRIVAL_TIME, AVG_REGISTRATION_TIME, 
-                    AVG_EVALUATION_TIME, AVG_SPECIALIST_EVALUATION_TIME, 
-                    AVG_GP_EVALUATION_TIME, receptionists, nurses, 
-                    specialists, general_practicioners))
-  # Run the simulation
-  env.run(until=120)
+  waits = RunningStats()
+  with EventLog(EVENT_LOG_PATH, EVENT_LOG_LEVEL, STATIONS) as log:
+    # Register the creation of the patient arrivals  
+    env.process(patient_builder(env, AVG_PATIENT_ARRIVAL_TIME, AVG_REGISTRATION_TIME, 
+                      AVG_EVALUATION_TIME, AVG_SPECIALIST_EVALUATION_TIME, 
+                      AVG_GP_EVALUATION_TIME, receptionists, nurses, 
+                      specialists, general_practicioners, waits = waits, log = log))
+    # Run the simulation
+    env.run(until=SIM_DURATION)
+
+  print(f"{waits.count} patients saw a doctor. On average they waited {waits.mean:.2f} minutes in total.")
+  if EVENT_LOG_PATH is not None:
+    print(f"The event log is in {EVENT_LOG_PATH}.")
 
 if __name__ == "__main__":
   main()
\ No newline at end of file
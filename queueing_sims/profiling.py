@@ -0,0 +1,177 @@
+###############################################################################
+# Opt-in profiling of SimPy simulations.
+#
+# ProfiledEnvironment is a drop-in simpy.Environment whose step() and
+# schedule() keep a Profile of the run:
+# - Per process function (the generator passed to env.process): how often
+#   it was resumed, how many events it scheduled and the wall time spent
+#   inside it between yields.
+# - Per Resource/Store/Container: the requests, releases, puts and gets
+#   scheduled and processed, and the time spent in its bookkeeping
+#   callbacks (e.g. handing a freed slot to the next request in line).
+# - The time spent in the event loop itself and in other callbacks.
+# - The size of the event heap, sampled every heap_sample_interval steps.
+#
+# Profiling is opt-in by creating a ProfiledEnvironment instead of a
+# simpy.Environment, so a normal run pays nothing for it. A profiled run
+# takes about twice as long, and the profiler's own bookkeeping is charged
+# to the kernel, so compare shares of time rather than absolute times.
+#
+# Profile.report() is a text summary. Profile.write_folded() writes the
+# times as folded stacks ("simulation;nurse_process 1234" in microseconds),
+# which flamegraph.pl, speedscope and inferno all read.
+#
+# Usage
+#   env = ProfiledEnvironment()
+#   ... build and run the simulation on env ...
+#   print(env.profile.report())
+#   env.profile.write_folded("run.folded")
+###############################################################################
+
+from collections import Counter
+from heapq import heappop
+from time import perf_counter
+from typing import NamedTuple
+
+import numpy as np
+import simpy
+from simpy.core import EmptySchedule, StopSimulation
+from simpy.events import NORMAL, EventPriority
+from simpy.resources.base import BaseResource
+
+HEAP_SAMPLE_INTERVAL = 1000 # Steps between samples of the event heap's size.
+KERNEL = "[kernel]" # The event loop itself.
+ROOT = "simulation" # The root frame of the folded stacks.
+
+class HeapSample(NamedTuple):
+  step: int
+  time: float # Simulated.
+  size: int
+
+class Profile:
+  """What a ProfiledEnvironment saw. Times are wall-clock seconds."""
+  def __init__(self) -> None:
+    self.steps = 0
+    self.resumes = Counter() # Process function => times resumed.
+    self.scheduled = Counter() # Process function (or KERNEL) => events scheduled.
+    self.seconds = Counter() # Frame => wall time spent in it.
+    self.resource_scheduled = Counter() # Resource name => events scheduled.
+    self.resource_processed = Counter() # Resource name => events processed.
+    self.event_types = Counter() # Event class => events processed.
+    self.heap_samples = []
+    self._resource_names = {} # id(resource) => (resource, name).
+
+  def name(self, resource, name: str) -> None:
+    """Names a Resource, Store or Container in the report."""
+    self._resource_names[id(resource)] = (resource, name)
+
+  def resource_name(self, resource) -> str:
+    named = self._resource_names.get(id(resource))
+    if named is None or named[0] is not resource:
+      count = sum(type(other) is type(resource) for other, _ in self._resource_names.values())
+      named = (resource, f"{type(resource).__name__} {count + 1}")
+      self._resource_names[id(resource)] = named
+    return named[1]
+
+  @property
+  def heap_sizes(self) -> np.ndarray:
+    return np.array([sample.size for sample in self.heap_samples], dtype=np.int64)
+
+  def folded_stacks(self) -> list:
+    """The wall times as folded stack lines, in whole microseconds."""
+    lines = []
+    for frame, seconds in self.seconds.most_common():
+      microseconds = round(seconds * 1e6)
+      if microseconds > 0:
+        lines.append(f"{ROOT};{frame} {microseconds}")
+    return lines
+
+  def write_folded(self, path) -> None:
+    with open(path, "w") as file:
+      file.write("\n".join(self.folded_stacks()) + "\n")
+
+  def report(self) -> str:
+    total = sum(self.seconds.values()) or 1.0
+    lines = [f"{self.steps:,} events processed in {total:.3f} s of profiled wall time.", "",
+      f"{'Frame':<48} {'Seconds':>9} {'Share':>7} {'Resumes':>10} {'Scheduled':>10}"]
+    for frame, seconds in self.seconds.most_common():
+      resumes = self.resumes.get(frame, "")
+      scheduled = self.scheduled.get(frame, "")
+      lines.append(f"{frame[:48]:<48} {seconds:>9.3f} {seconds / total:>7.1%} {resumes:>10} {scheduled:>10}")
+    if self.resource_scheduled or self.resource_processed:
+      lines += ["", f"{'Resource':<48} {'Scheduled':>10} {'Processed':>10}"]
+      for resource in sorted(set(self.resource_scheduled) | set(self.resource_processed)):
+        lines.append(f"{resource:<48} {self.resource_scheduled[resource]:>10} {self.resource_processed[resource]:>10}")
+    lines += ["", "Events processed by type: " + ", ".join(f"{name} {count:,}"
+      for name, count in self.event_types.most_common())]
+    if self.heap_samples:
+      sizes = self.heap_sizes
+      lines.append(f"Event heap size: mean {sizes.mean():.1f}, max {sizes.max()} over {len(sizes)} samples.")
+    return "\n".join(lines)
+
+class ProfiledEnvironment(simpy.Environment):
+  """A simpy.Environment that profiles itself into self.profile."""
+  def __init__(self, initial_time = 0, heap_sample_interval: int = HEAP_SAMPLE_INTERVAL) -> None:
+    super().__init__(initial_time)
+    self.profile = Profile()
+    self.heap_sample_interval = heap_sample_interval
+
+  def schedule(self, event, priority: EventPriority = NORMAL, delay = 0) -> None:
+    profile = self.profile
+    process = self.active_process
+    profile.scheduled[KERNEL if process is None else process.name] += 1
+    resource = getattr(event, "resource", None)
+    if isinstance(resource, BaseResource):
+      profile.resource_scheduled[profile.resource_name(resource)] += 1
+    super().schedule(event, priority, delay)
+
+  def step(self) -> None:
+    """simpy.Environment.step, timing each callback."""
+    started = perf_counter()
+    profile = self.profile
+    try:
+      self._now, _, _, event = heappop(self._queue)
+    except IndexError:
+      raise EmptySchedule from None
+
+    profile.steps += 1
+    if profile.steps % self.heap_sample_interval == 0:
+      profile.heap_samples.append(HeapSample(profile.steps, self._now, len(self._queue)))
+    profile.event_types[type(event).__name__] += 1
+    resource = getattr(event, "resource", None)
+    if isinstance(resource, BaseResource):
+      profile.resource_processed[profile.resource_name(resource)] += 1
+
+    callbacks, event.callbacks = event.callbacks, None
+    in_callbacks = 0.0
+    try:
+      for callback in callbacks:
+        frame = self._frame(callback)
+        callback_started = perf_counter()
+        try:
+          callback(event)
+        finally:
+          elapsed = perf_counter() - callback_started
+          profile.seconds[frame] += elapsed
+          in_callbacks += elapsed
+    except StopSimulation:
+      event.callbacks = callbacks[callbacks.index(callback) + 1:]
+      self.schedule(event, EventPriority(-1))
+      raise
+    finally:
+      profile.seconds[KERNEL] += perf_counter() - started - in_callbacks
+
+    if not event._ok and not hasattr(event, "_defused"):
+      exc = type(event._value)(*event._value.args)
+      exc.__cause__ = event._value
+      raise exc
+
+  def _frame(self, callback) -> str:
+    """The frame a callback's time is charged to."""
+    owner = getattr(callback, "__self__", None)
+    if isinstance(owner, simpy.Process):
+      self.profile.resumes[owner.name] += 1
+      return owner.name
+    if isinstance(owner, BaseResource):
+      return f"{self.profile.resource_name(owner)};{callback.__name__}"
+    return f"[callback] {getattr(callback, '__qualname__', repr(callback))}"
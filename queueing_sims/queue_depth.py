@@ -0,0 +1,190 @@
+###############################################################################
+# Time-weighted queue depth tracking for SimPy Stores, Resources and
+# Containers.
+#
+# track(queue) wraps the queue's put/get (request/release for a Resource) so
+# every transition records the new depth:
+# - Store: the number of items waiting.
+# - Resource: the number of requests waiting for a slot.
+# - Container: the level.
+#
+# Between transitions the depth is constant, so the tracker accumulates the
+# exact amount of time spent at each depth. That gives the exact
+# time-weighted mean, max and percentiles of the depth. The time spent at
+# each depth is kept in an array indexed by depth, which costs 8 bytes per
+# depth level reached, not per transition.
+#
+# A downsampled time series is kept in a fixed size ring buffer: the min,
+# max and time-weighted mean depth for each bucket of resolution ticks. Once
+# the buffer is full the oldest buckets are overwritten, so a 10 hour run
+# with millions of transitions uses the same memory as a 1 minute run.
+#
+# truncation() finds where the depth settled after starting from empty
+# (MSER-5 over the series, see warmup.py) and its mean from then on.
+###############################################################################
+
+import math
+from typing import NamedTuple
+
+import numpy as np
+import simpy
+
+from queueing_sims.warmup import MSER_BATCH_SIZE, Truncation, mser
+
+class DepthSeries(NamedTuple):
+  starts: np.ndarray # The start time of each bucket.
+  mins: np.ndarray
+  maxs: np.ndarray
+  means: np.ndarray # Time-weighted.
+
+class QueueDepthTracker:
+  def __init__(self, env, resolution: float = 60, history: int = 1440) -> None:
+    """
+    resolution is the width of a bucket in simulation ticks and history is
+    the number of buckets kept in the ring buffer.
+    """
+    self.env = env
+    self.resolution = resolution
+    self.history = history
+    self.depth = 0
+    self.max_depth = 0
+    self._last_change = env.now
+    self._time_at_depth = np.zeros(64)
+
+    # The bucket being filled.
+    self._bucket = math.floor(env.now / resolution)
+    self._bucket_min = 0
+    self._bucket_max = 0
+    self._bucket_area = 0.0
+
+    # The ring buffer of finished buckets.
+    self._starts = np.full(history, -1, dtype=np.int64)
+    self._mins = np.zeros(history)
+    self._maxs = np.zeros(history)
+    self._means = np.zeros(history)
+
+  def record(self, depth: int) -> None:
+    """Records that the queue now has depth items in it."""
+    self._advance(self.env.now)
+    self.depth = depth
+    if depth > self.max_depth:
+      self.max_depth = depth
+    if depth < self._bucket_min:
+      self._bucket_min = depth
+    if depth > self._bucket_max:
+      self._bucket_max = depth
+
+  def _advance(self, now) -> None:
+    """Accounts for the time spent at the current depth up until now."""
+    elapsed = now - self._last_change
+    if elapsed <= 0:
+      return
+    depth = self.depth
+    if depth >= len(self._time_at_depth):
+      grown = np.zeros(max(depth + 1, 2 * len(self._time_at_depth)))
+      grown[:len(self._time_at_depth)] = self._time_at_depth
+      self._time_at_depth = grown
+    self._time_at_depth[depth] += elapsed
+
+    bucket = math.floor(now / self.resolution)
+    if bucket == self._bucket:
+      self._bucket_area += depth * elapsed
+    else:
+      # Finish the current bucket, then the buckets the depth spanned entirely.
+      bucket_end = (self._bucket + 1) * self.resolution
+      self._bucket_area += depth * (bucket_end - self._last_change)
+      self._flush()
+      for index in range(max(self._bucket + 1, bucket - self.history), bucket):
+        self._store(index, depth, depth, depth)
+      self._bucket = bucket
+      self._bucket_min = depth
+      self._bucket_max = depth
+      self._bucket_area = depth * (now - bucket * self.resolution)
+    self._last_change = now
+
+  def _flush(self) -> None:
+    self._store(self._bucket, self._bucket_min, self._bucket_max, self._bucket_area / self.resolution)
+
+  def _store(self, bucket, minimum, maximum, mean) -> None:
+    slot = bucket % self.history
+    self._starts[slot] = bucket
+    self._mins[slot] = minimum
+    self._maxs[slot] = maximum
+    self._means[slot] = mean
+
+  def _time_at_depth_until_now(self) -> np.ndarray:
+    self._advance(self.env.now)
+    return self._time_at_depth
+
+  @property
+  def time_weighted_mean(self) -> float:
+    time_at_depth = self._time_at_depth_until_now()
+    total_time = time_at_depth.sum()
+    if total_time == 0:
+      return float(self.depth)
+    return float(np.dot(np.arange(len(time_at_depth)), time_at_depth) / total_time)
+
+  def percentile(self, percent: float) -> int:
+    """
+    The depth the queue was at or below for percent of the time. Depths are
+    whole numbers, so this is the smallest depth that covers percent of the
+    time, not an interpolation between depths.
+    """
+    time_at_depth = self._time_at_depth_until_now()
+    cumulative = np.cumsum(time_at_depth)
+    if cumulative[-1] == 0:
+      return int(self.depth)
+    return int(np.searchsorted(cumulative, cumulative[-1] * percent / 100, side="left"))
+
+  def series(self) -> DepthSeries:
+    """The downsampled depth, oldest bucket first, including the partial current bucket."""
+    self._advance(self.env.now)
+    elapsed_in_bucket = self.env.now - self._bucket * self.resolution
+    current_mean = self._bucket_area / elapsed_in_bucket if elapsed_in_bucket > 0 else float(self.depth)
+
+    finished = np.flatnonzero((self._starts >= 0) & (self._starts != self._bucket))
+    finished = finished[np.argsort(self._starts[finished])][-(self.history - 1):] if self.history > 1 else finished[:0]
+    return DepthSeries(
+      np.append(self._starts[finished], self._bucket) * self.resolution,
+      np.append(self._mins[finished], self._bucket_min),
+      np.append(self._maxs[finished], self._bucket_max),
+      np.append(self._means[finished], current_mean))
+
+  def truncation(self, batch_size: int = MSER_BATCH_SIZE) -> Truncation:
+    """
+    The warm-up of the downsampled depth and the time-weighted mean after
+    it. The current bucket is partial, so it's left out.
+    """
+    series = self.series()
+    return mser(series.means[:-1], batch_size, series.starts[:-1])
+
+def queue_depth(queue) -> int:
+  """The number of things waiting in a Store, Resource or Container."""
+  if isinstance(queue, simpy.Container):
+    return queue.level
+  if isinstance(queue, simpy.Resource):
+    return len(queue.queue)
+  return len(queue.items)
+
+def track(queue, resolution: float = 60, history: int = 1440) -> QueueDepthTracker:
+  """
+  Starts tracking the depth of a Store, Resource or Container and returns
+  the tracker. The queue's transition methods are wrapped on this instance
+  only.
+  """
+  tracker = QueueDepthTracker(queue._env, resolution, history)
+  names = ("request", "release") if isinstance(queue, simpy.Resource) else ("put", "get")
+  record = lambda _ = None: tracker.record(queue_depth(queue))
+  record()
+  for name in names:
+    original = getattr(queue, name)
+    def tracked(*args, original = original, **kwargs):
+      event = original(*args, **kwargs)
+      record()
+      # SimPy hands items and slots to waiting processes when the event is
+      # processed, so record the depth again once that has happened.
+      if event.callbacks is not None:
+        event.callbacks.append(record)
+      return event
+    setattr(queue, name, tracked)
+  return tracker
@@ -0,0 +1,109 @@
+###############################################################################
+# A columnar metrics recorder that models can share.
+#
+# Each field is a typed NumPy array that doubles in size when it fills up, so
+# appending a row is amortized O(1) rather than copying the whole table like
+# DataFrame.append does. Running totals are kept for the numeric fields so a
+# model can ask for a mean at any point during a run without building a
+# DataFrame.
+#
+# At the end of a run the columns are handed to pandas (or Arrow) as views of
+# the underlying arrays, so the conversion does not copy the data. The views
+# share memory with the recorder, so don't keep recording into a recorder
+# whose tables you intend to modify.
+#
+# Usage
+#   recorder = Recorder({"P_ID": np.int64, "P_TOTAL_WAIT_FOR_NURSE_TIME": np.float64}, index = "P_ID")
+#   recorder.append(1, 2.5)
+#   recorder.mean("P_TOTAL_WAIT_FOR_NURSE_TIME")
+#   results = recorder.to_frame()
+###############################################################################
+
+import numpy as np
+import pandas as pd
+
+class Recorder:
+  def __init__(self, fields: dict, index: str = None, capacity: int = 1024) -> None:
+    """
+    fields maps each column name to its NumPy dtype, in the order values are
+    passed to append. index optionally names the column to use as the index
+    of the DataFrame.
+    """
+    if index is not None and index not in fields:
+      raise ValueError(f"The index {index} is not one of the fields.")
+    self.fields = list(fields)
+    self.index = index
+    self.size = 0
+    self._columns = [np.empty(max(capacity, 1), dtype = dtype) for dtype in fields.values()]
+    self._totals = [0 for _ in self.fields]
+
+  def __len__(self) -> int:
+    return self.size
+
+  def append(self, *values) -> None:
+    """Records a row. The values are in the same order as the fields."""
+    if len(values) != len(self._columns):
+      raise ValueError(f"Expected {len(self._columns)} values but got {len(values)}.")
+    if self.size == len(self._columns[0]):
+      self._grow(self.size + 1)
+    row = self.size
+    for position, value in enumerate(values):
+      self._columns[position][row] = value
+      self._totals[position] += value
+    self.size += 1
+
+  def extend(self, **columns) -> None:
+    """Records many rows at once from equal length arrays, one per field."""
+    missing = set(self.fields) - set(columns)
+    if missing:
+      raise ValueError(f"Missing values for {', '.join(sorted(missing))}.")
+    count = len(columns[self.fields[0]])
+    if self.size + count > len(self._columns[0]):
+      self._grow(self.size + count)
+    rows = slice(self.size, self.size + count)
+    for position, name in enumerate(self.fields):
+      values = np.asarray(columns[name])
+      if len(values) != count:
+        raise ValueError("Every field needs the same number of values.")
+      self._columns[position][rows] = values
+      self._totals[position] += values.sum()
+    self.size += count
+
+  def column(self, name: str) -> np.ndarray:
+    """A view of the values recorded so far for a field."""
+    return self._columns[self.fields.index(name)][:self.size]
+
+  def total(self, name: str):
+    """The sum of the values recorded so far for a field."""
+    return self._totals[self.fields.index(name)]
+
+  def mean(self, name: str) -> float:
+    """The mean of the values recorded so far for a field. NaN if empty."""
+    if self.size == 0:
+      return float("nan")
+    return self.total(name) / self.size
+
+  def to_frame(self) -> pd.DataFrame:
+    """Builds a DataFrame whose columns are views of the recorded arrays."""
+    data = {name: self.column(name) for name in self.fields if name != self.index}
+    index = None
+    if self.index is not None:
+      index = pd.Index(self.column(self.index), name = self.index, copy = False)
+    return pd.DataFrame(data, index = index, columns = list(data), copy = False)
+
+  def to_arrow(self):
+    """Builds a pyarrow Table over the recorded arrays. Requires pyarrow."""
+    try:
+      import pyarrow as pa
+    except ImportError as error:
+      raise ImportError("Recorder.to_arrow requires pyarrow to be installed.") from error
+    return pa.table({name: self.column(name) for name in self.fields})
+
+  def _grow(self, required: int) -> None:
+    capacity = len(self._columns[0])
+    while capacity < required:
+      capacity *= 2
+    for position, column in enumerate(self._columns):
+      grown = np.empty(capacity, dtype = column.dtype)
+      grown[:self.size] = column[:self.size]
+      self._columns[position] = grown
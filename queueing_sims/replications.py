@@ -0,0 +1,182 @@
+###############################################################################
+# Runs independent replications of a model across a process pool.
+#
+# Every replication gets its own seed stream spawned from a single master
+# seed with numpy.random.SeedSequence. Before a replication runs, the worker
+# seeds the global random module from that stream and hands the model a
+# NumPy Generator built from it. Because a replication's randomness depends
+# only on the master seed and its run number, the results are bit-identical
+# no matter how many workers are used or which worker picks up which run.
+#
+# Usage
+#   def run_model(run, rng, parameters):
+#     ...
+#     return RunResult(run, ...)
+#
+#   for result in run_replications(run_model, 10, master_seed=42, args=(parameters,)):
+#     ...
+#
+# run_model must be a module level function so it can be sent to the workers.
+#
+# SequentialReplications decides the number of runs itself. It launches runs
+# in batches until the confidence interval of one of the RunResult's fields
+# is narrow enough, or it runs out of budget. Run n always gets the same
+# seed, so the results only depend on the master seed and how many runs
+# were needed.
+#
+#   replications = SequentialReplications(run_model, "average_wait_time", master_seed=42,
+#                                         relative_precision=0.05, args=(parameters,))
+#   for result in replications:
+#     ...
+#   print(replications.interval, replications.converged)
+###############################################################################
+
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Callable, Iterator, Optional
+
+import numpy as np
+
+from queueing_sims.confidence import ConfidenceInterval, interval_from_stats
+from queueing_sims.distributions import AntitheticGenerator
+from queueing_sims.streaming_stats import RunningStats
+
+def replication_seeds(master_seed: Optional[int], number_of_runs: int) -> list:
+  """Spawns a statistically independent seed sequence for each run."""
+  return np.random.SeedSequence(master_seed).spawn(number_of_runs)
+
+def seed_replication(seed_sequence: np.random.SeedSequence, antithetic: bool = False) -> np.random.Generator:
+  """
+  Seeds the global random module for a replication and returns a NumPy
+  Generator drawing from the same stream. The antithetic twin of a run gets
+  an AntitheticGenerator in the same state, which mirrors the model's
+  RandomStreams.
+  """
+  random.seed(int.from_bytes(seed_sequence.generate_state(4).tobytes(), "little"))
+  if antithetic:
+    return AntitheticGenerator(np.random.PCG64(seed_sequence))
+  return np.random.default_rng(seed_sequence)
+
+def run_replication(run_model: Callable, run: int, seed_sequence, args: tuple, antithetic: bool = False):
+  """Runs run_model(run, rng, *args) with the rng seeded for the run. This is what the workers run."""
+  rng = seed_replication(seed_sequence, antithetic)
+  return run_model(run, rng, *args)
+
+def run_replications(run_model: Callable, number_of_runs: int, master_seed: Optional[int] = None,
+                     max_workers: Optional[int] = None, args: tuple = ()) -> Iterator:
+  """
+  Runs run_model(run, rng, *args) for runs 1 to number_of_runs and yields each
+  result as soon as it finishes, so results arrive out of order. Uses every
+  core unless max_workers says otherwise. With max_workers=1 the runs happen
+  in this process, in order, which is handy for debugging.
+  """
+  seeds = replication_seeds(master_seed, number_of_runs)
+  max_workers = os.cpu_count() if max_workers is None else max_workers
+  if max_workers == 1:
+    for run, seed_sequence in enumerate(seeds, start = 1):
+      yield run_replication(run_model, run, seed_sequence, args)
+    return
+
+  with ProcessPoolExecutor(max_workers = max_workers) as executor:
+    futures = [executor.submit(run_replication, run_model, run, seed_sequence, args)
+      for run, seed_sequence in enumerate(seeds, start = 1)]
+    try:
+      for future in as_completed(futures):
+        yield future.result()
+    finally:
+      # Don't start runs nobody is waiting for if the caller stops early.
+      for future in futures:
+        future.cancel()
+
+class SequentialReplications:
+  """
+  Runs replications until the confidence interval of the metric field of
+  the results has a half-width of at most absolute_precision, or at most
+  relative_precision times the mean, whichever is given (both must hold
+  if both are). At least min_runs and at most max_runs are run.
+
+  Runs are launched batch_size at a time (one per worker by default) and
+  the interval is only checked between batches. Iterate to get the results
+  as they finish, then read runs, interval and converged.
+  """
+  def __init__(self, run_model: Callable, metric: str, master_seed: Optional[int] = None,
+               relative_precision: Optional[float] = None, absolute_precision: Optional[float] = None,
+               confidence: float = 0.95, min_runs: int = 5, max_runs: int = 1000,
+               batch_size: Optional[int] = None, max_workers: Optional[int] = None, args: tuple = ()) -> None:
+    if relative_precision is None and absolute_precision is None:
+      raise ValueError("Set a relative_precision, an absolute_precision or both.")
+    if min_runs < 2:
+      raise ValueError("At least 2 runs are needed for a confidence interval.")
+    self.run_model = run_model
+    self.metric = metric
+    self.master_seed = master_seed
+    self.relative_precision = relative_precision
+    self.absolute_precision = absolute_precision
+    self.confidence = confidence
+    self.min_runs = min_runs
+    self.max_runs = max(max_runs, min_runs)
+    self.max_workers = os.cpu_count() if max_workers is None else max_workers
+    self.batch_size = self.max_workers if batch_size is None else batch_size
+    self.args = args
+    self.results = [] # In run order.
+    self.stats = RunningStats()
+    self.converged = False
+
+  @property
+  def runs(self) -> int:
+    return self.stats.count
+
+  @property
+  def interval(self) -> ConfidenceInterval:
+    return interval_from_stats(self.stats, self.confidence)
+
+  def is_precise(self) -> bool:
+    interval = self.interval
+    if self.absolute_precision is not None and interval.half_width > self.absolute_precision:
+      return False
+    if self.relative_precision is not None and interval.relative_half_width > self.relative_precision:
+      return False
+    return True
+
+  def _batches(self) -> Iterator[list]:
+    """The seeds of each batch, until the interval is precise enough or the budget is spent."""
+    root = np.random.SeedSequence(self.master_seed)
+    launched = 0
+    while launched < self.max_runs:
+      size = min(max(self.batch_size, self.min_runs - launched, 1), self.max_runs - launched)
+      # Spawning continues the numbering, so run n gets the same seed whatever the batch size.
+      yield list(enumerate(root.spawn(size), start = launched + 1))
+      launched += size
+      if self.runs >= self.min_runs and self.is_precise():
+        self.converged = True
+        return
+
+  def _record(self, results: list) -> None:
+    for result in sorted(results, key = lambda result: result.run):
+      self.results.append(result)
+      self.stats.add(getattr(result, self.metric))
+
+  def __iter__(self) -> Iterator:
+    if self.max_workers == 1:
+      for batch in self._batches():
+        results = [run_replication(self.run_model, run, seed_sequence, self.args) for run, seed_sequence in batch]
+        self._record(results)
+        yield from results
+      return
+
+    with ProcessPoolExecutor(max_workers = self.max_workers) as executor:
+      for batch in self._batches():
+        futures = [executor.submit(run_replication, self.run_model, run, seed_sequence, self.args)
+          for run, seed_sequence in batch]
+        results = []
+        try:
+          for future in as_completed(futures):
+            result = future.result()
+            results.append(result)
+            yield result
+        finally:
+          for future in futures:
+            future.cancel()
+        # Add the batch in run order so the statistics don't depend on which run finished first.
+        self._record(results)
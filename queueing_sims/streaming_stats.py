@@ -0,0 +1,224 @@
+###############################################################################
+# Streaming statistics that use constant memory no matter how long a run is.
+#
+# - RunningStats: count, mean and variance (Welford's algorithm), min and max.
+# - QuantileSketch: approximate percentiles with a bounded relative error.
+#   Values are counted in logarithmically sized buckets (the DDSketch
+#   approach), so an update is a log and a dictionary increment and the
+#   number of buckets only depends on the range of the values, not how many
+#   there are. Unlike P² it can absorb a whole NumPy array at once and two
+#   sketches can be merged, which the vectorized engines and replications
+#   rely on.
+# - Reservoir: a bounded uniform random sample of the values, for debugging.
+#   Until it fills up it holds every value in the order they arrived.
+# - StreamingMetric: bundles the three so a model can attach one to any
+#   metric.
+#
+# Every accumulator has add(value) for one value and extend(values) for a
+# NumPy array of them.
+###############################################################################
+
+import math
+import random
+
+import numpy as np
+
+class RunningStats:
+  def __init__(self) -> None:
+    self.count = 0
+    self.mean = 0.0
+    self._sum_of_squares = 0.0 # Sum of squared differences from the mean.
+    self.min = math.inf
+    self.max = -math.inf
+
+  def add(self, value) -> None:
+    self.count += 1
+    delta = value - self.mean
+    self.mean += delta / self.count
+    self._sum_of_squares += delta * (value - self.mean)
+    if value < self.min:
+      self.min = value
+    if value > self.max:
+      self.max = value
+
+  def extend(self, values) -> None:
+    values = np.asarray(values, dtype=np.float64)
+    if len(values) == 0:
+      return
+    batch = RunningStats()
+    batch.count = len(values)
+    batch.mean = float(values.mean())
+    batch._sum_of_squares = float(((values - batch.mean) ** 2).sum())
+    batch.min = float(values.min())
+    batch.max = float(values.max())
+    self.merge(batch)
+
+  def merge(self, other: "RunningStats") -> None:
+    """Combines the statistics of another stream into this one (Chan et al.)."""
+    if other.count == 0:
+      return
+    count = self.count + other.count
+    delta = other.mean - self.mean
+    self.mean += delta * other.count / count
+    self._sum_of_squares += other._sum_of_squares + delta * delta * self.count * other.count / count
+    self.count = count
+    self.min = min(self.min, other.min)
+    self.max = max(self.max, other.max)
+
+  @property
+  def variance(self) -> float:
+    """The sample variance. NaN with fewer than two values."""
+    return self._sum_of_squares / (self.count - 1) if self.count > 1 else math.nan
+
+  @property
+  def stdev(self) -> float:
+    return math.sqrt(self.variance) if self.count > 1 else math.nan
+
+class QuantileSketch:
+  """
+  Approximates quantiles to within relative_accuracy of the true value.
+  Values whose magnitude is below min_value are counted as zero.
+  """
+  def __init__(self, relative_accuracy: float = 0.01, min_value: float = 1e-9) -> None:
+    if not 0 < relative_accuracy < 1:
+      raise ValueError("The relative accuracy must be between 0 and 1.")
+    self.relative_accuracy = relative_accuracy
+    self.min_value = min_value
+    self._gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+    self._log_gamma = math.log(self._gamma)
+    self.count = 0
+    self._zero_count = 0
+    self._positive = {} # Bucket key => count
+    self._negative = {}
+
+  def add(self, value) -> None:
+    self.count += 1
+    if abs(value) < self.min_value:
+      self._zero_count += 1
+      return
+    buckets = self._positive if value > 0 else self._negative
+    key = math.ceil(math.log(abs(value)) / self._log_gamma)
+    buckets[key] = buckets.get(key, 0) + 1
+
+  def extend(self, values) -> None:
+    values = np.asarray(values, dtype=np.float64)
+    self.count += len(values)
+    magnitudes = np.abs(values)
+    is_zero = magnitudes < self.min_value
+    self._zero_count += int(is_zero.sum())
+    for buckets, selected in ((self._positive, (values > 0) & ~is_zero), (self._negative, (values < 0) & ~is_zero)):
+      if not selected.any():
+        continue
+      keys = np.ceil(np.log(magnitudes[selected]) / self._log_gamma).astype(np.int64)
+      unique_keys, counts = np.unique(keys, return_counts=True)
+      for key, count in zip(unique_keys.tolist(), counts.tolist()):
+        buckets[key] = buckets.get(key, 0) + count
+
+  def merge(self, other: "QuantileSketch") -> None:
+    if other._gamma != self._gamma:
+      raise ValueError("Only sketches with the same relative accuracy can be merged.")
+    self.count += other.count
+    self._zero_count += other._zero_count
+    for buckets, other_buckets in ((self._positive, other._positive), (self._negative, other._negative)):
+      for key, count in other_buckets.items():
+        buckets[key] = buckets.get(key, 0) + count
+
+  def quantile(self, q: float) -> float:
+    """The approximate q-th quantile, 0 <= q <= 1. NaN if empty."""
+    if not 0 <= q <= 1:
+      raise ValueError("The quantile must be between 0 and 1.")
+    if self.count == 0:
+      return math.nan
+    rank = q * (self.count - 1)
+    seen = 0
+    for key in sorted(self._negative, reverse=True):
+      seen += self._negative[key]
+      if seen > rank:
+        return -self._bucket_value(key)
+    seen += self._zero_count
+    if seen > rank:
+      return 0.0
+    for key in sorted(self._positive):
+      seen += self._positive[key]
+      if seen > rank:
+        return self._bucket_value(key)
+    return self._bucket_value(max(self._positive))
+
+  def _bucket_value(self, key: int) -> float:
+    return 2 * self._gamma ** key / (self._gamma + 1)
+
+class Reservoir:
+  """A uniform random sample of at most size values (Algorithm R)."""
+  def __init__(self, size: int, rng: random.Random = None) -> None:
+    self.size = size
+    self.seen = 0
+    self.values = []
+    self._rng = random.Random() if rng is None else rng
+
+  def add(self, value) -> None:
+    self.seen += 1
+    if len(self.values) < self.size:
+      self.values.append(value)
+      return
+    slot = self._rng.randrange(self.seen)
+    if slot < self.size:
+      self.values[slot] = value
+
+  def extend(self, values) -> None:
+    values = np.asarray(values, dtype=np.float64)
+    room = max(self.size - len(self.values), 0)
+    self.values.extend(values[:room].tolist())
+    self.seen += min(room, len(values))
+    for value in values[room:].tolist():
+      self.add(value)
+
+class StreamingMetric:
+  """
+  Count, mean, variance, min, max and percentiles of a metric in constant
+  memory, plus an optional bounded reservoir sample.
+  """
+  def __init__(self, reservoir_size: int = 0, relative_accuracy: float = 0.01) -> None:
+    self.stats = RunningStats()
+    self.sketch = QuantileSketch(relative_accuracy)
+    self.reservoir = Reservoir(reservoir_size) if reservoir_size > 0 else None
+
+  def add(self, value) -> None:
+    self.stats.add(value)
+    self.sketch.add(value)
+    if self.reservoir is not None:
+      self.reservoir.add(value)
+
+  def extend(self, values) -> None:
+    values = np.asarray(values, dtype=np.float64)
+    self.stats.extend(values)
+    self.sketch.extend(values)
+    if self.reservoir is not None:
+      self.reservoir.extend(values)
+
+  def merge(self, other: "StreamingMetric") -> None:
+    """Combines another metric's statistics. Reservoir samples are not merged."""
+    self.stats.merge(other.stats)
+    self.sketch.merge(other.sketch)
+
+  def __len__(self) -> int:
+    return self.stats.count
+
+  @property
+  def count(self) -> int:
+    return self.stats.count
+
+  @property
+  def mean(self) -> float:
+    return self.stats.mean if self.stats.count > 0 else math.nan
+
+  def percentile(self, percent: float) -> float:
+    """The approximate percentile, clamped to the observed min and max."""
+    value = self.sketch.quantile(percent / 100)
+    if math.isnan(value):
+      return value
+    return min(max(value, self.stats.min), self.stats.max)
+
+  @property
+  def sample(self) -> list:
+    """The reservoir sample, or an empty list if there isn't one."""
+    return [] if self.reservoir is None else self.reservoir.values
@@ -0,0 +1,220 @@
+###############################################################################
+# Parameter sweeps with an on-disk result cache.
+#
+# A sweep runs a model's run_model(run, rng, parameters) (the same function
+# run_replications takes) for every point of a parameter grid, a number of
+# replications each, in parallel across a process pool.
+#
+# Every replication's result is saved as an .npz file named after the hash
+# of what produced it: the model's version, its parameters, the master seed
+# and the run number. Before running anything the sweep looks each one up,
+# so:
+# - Adding points to a grid only runs the new points.
+# - An interrupted sweep picks up where it stopped, since every finished
+#   replication is already on disk. Files are written to a temporary name
+#   and renamed, so a crash never leaves a half written result.
+# - Changing the source of the model or of a package module it imports
+#   (directly or through other package modules) changes its version and so
+#   invalidates its cached results. The driver script running the sweep
+#   isn't part of it, so editing its grid keeps what's cached.
+# - Parameters are keyed by value, so they have to be JSON values, NumPy
+#   arrays or have a canonical form from _asdict() (NamedTuples such as the
+#   distributions, or arrivals.PiecewiseRate). Anything else raises a
+#   TypeError rather than getting a key that never hits the cache.
+#
+# Every point uses the same seeds for run 1, 2, ..., so points are compared
+# under common random numbers.
+#
+# Usage
+#   results = sweep(run_model, Parameters(...), {"num_nurses": [1, 2, 3]},
+#                   number_of_runs = 10, master_seed = 42)
+#
+# The result is a DataFrame with a row per point and run: the grid's
+# columns, the RunResult's fields and whether the row came from the cache.
+###############################################################################
+
+import hashlib
+import inspect
+import itertools
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Callable, NamedTuple, Optional
+
+import numpy as np
+import pandas as pd
+
+from queueing_sims.replications import replication_seeds, run_replication
+
+CACHE_DIR = Path(".sweep-cache")
+
+PACKAGE = __name__.partition(".")[0]
+
+def _in_package(name) -> bool:
+  return isinstance(name, str) and (name == PACKAGE or name.startswith(PACKAGE + "."))
+
+def package_dependencies(namespace: dict) -> dict:
+  """
+  The package's modules a module's namespace uses, directly or through the
+  modules it uses, by name: the ones imported and the ones its imported
+  functions and classes come from.
+  """
+  found = {}
+  pending = [namespace]
+  while pending:
+    for value in list(pending.pop().values()):
+      name = value.__name__ if inspect.ismodule(value) else getattr(value, "__module__", None)
+      if _in_package(name) and name not in found and name in sys.modules:
+        found[name] = sys.modules[name]
+        pending.append(vars(sys.modules[name]))
+  return found
+
+def model_version(run_model: Callable) -> str:
+  """
+  A hash of the source of the module run_model is defined in and of the
+  package modules it depends on. Scripts loaded from a file path work too.
+  """
+  digest = hashlib.sha256()
+  code = getattr(run_model, "__code__", None)
+  if code is not None:
+    namespace = run_model.__globals__
+    source_file = code.co_filename
+  else:
+    module = inspect.getmodule(run_model)
+    namespace = vars(module) if module is not None else {}
+    source_file = getattr(module, "__file__", None)
+  try:
+    digest.update(Path(source_file).read_bytes())
+  except (OSError, TypeError):
+    digest.update(run_model.__qualname__.encode("utf-8"))
+  for name, module in sorted(package_dependencies(namespace).items()):
+    digest.update(name.encode("utf-8"))
+    try:
+      digest.update(Path(module.__file__).read_bytes())
+    except (OSError, TypeError):
+      pass # A namespace package has no source of its own.
+  return digest.hexdigest()[:16]
+
+def grid_points(grid: dict) -> list:
+  """Every combination of the grid's values, as a list of dictionaries."""
+  names = list(grid)
+  return [dict(zip(names, values)) for values in itertools.product(*(grid[name] for name in names))]
+
+def canonical(value):
+  """value as JSON that only depends on what it is, for a cache key."""
+  if value is None or isinstance(value, (bool, int, float, str)):
+    return value
+  if isinstance(value, np.generic):
+    return value.item()
+  if isinstance(value, np.ndarray):
+    return value.tolist()
+  if hasattr(value, "_asdict"):
+    # The type's name too, so two kinds of value with the same fields differ.
+    return {"type": type(value).__qualname__, "fields": canonical(value._asdict())}
+  if isinstance(value, dict):
+    return {str(name): canonical(item) for name, item in value.items()}
+  if isinstance(value, (list, tuple)):
+    return [canonical(item) for item in value]
+  raise TypeError(f"{type(value).__qualname__} values can't be part of a cache key. Use a NamedTuple, a JSON "
+    "value, a NumPy array or a value with an _asdict() instead.")
+
+def scenario_key(version: str, parameters: NamedTuple, master_seed: int, run: int) -> str:
+  """The content address of a single replication's result."""
+  scenario = {
+    "version": version,
+    "parameters": canonical(parameters._asdict()),
+    "master_seed": master_seed,
+    "run": run
+  }
+  encoded = json.dumps(scenario, sort_keys=True)
+  return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+class ResultCache:
+  """A content-addressed store of RunResults, one .npz file per result."""
+  def __init__(self, directory = CACHE_DIR) -> None:
+    self.directory = Path(directory)
+
+  def _path(self, key: str) -> Path:
+    return self.directory / key[:2] / f"{key}.npz"
+
+  def load(self, key: str, result_type) -> Optional[NamedTuple]:
+    path = self._path(key)
+    if not path.exists():
+      return None
+    with np.load(path, allow_pickle=False) as saved:
+      return result_type(**{field: saved[field].item() if saved[field].ndim == 0 else saved[field]
+        for field in result_type._fields})
+
+  def save(self, key: str, result: NamedTuple) -> None:
+    path = self._path(key)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    temporary = path.with_suffix(f".{os.getpid()}.tmp")
+    with open(temporary, "wb") as file:
+      np.savez(file, **{field: np.asarray(value) for field, value in result._asdict().items()})
+    os.replace(temporary, path)
+
+def sweep(run_model: Callable, base_parameters: NamedTuple, grid: dict, number_of_runs: int,
+          master_seed: int, result_type = None, cache_dir = CACHE_DIR, max_workers: Optional[int] = None,
+          version: Optional[str] = None, points: Optional[list] = None) -> pd.DataFrame:
+  """
+  Runs number_of_runs replications of run_model for every point of grid.
+  grid maps field names of the base_parameters NamedTuple to the values to
+  try. points replaces the grid's combinations with a list of points (each
+  a dictionary of fields to values), e.g. the ones analytic.screen() picked
+  out. result_type is the NamedTuple run_model returns; it's needed to read
+  results back from the cache and defaults to the return annotation of
+  run_model. version defaults to model_version(run_model).
+  """
+  if master_seed is None:
+    raise ValueError("A sweep needs a master_seed so its results can be cached.")
+  points = grid_points(grid) if points is None else list(points)
+  unknown = set(grid).union(*points) - set(base_parameters._fields)
+  if unknown:
+    raise ValueError(f"The grid has fields the parameters don't: {', '.join(sorted(unknown))}")
+  result_type = inspect.signature(run_model).return_annotation if result_type is None else result_type
+  if not hasattr(result_type, "_fields"):
+    raise ValueError("Pass the NamedTuple run_model returns as result_type.")
+  version = model_version(run_model) if version is None else version
+  cache = ResultCache(cache_dir)
+  seeds = replication_seeds(master_seed, number_of_runs)
+
+  # Look up every replication and collect the ones that still have to run.
+  rows = []
+  missing = []
+  for point in points:
+    parameters = base_parameters._replace(**point)
+    for run in range(1, number_of_runs + 1):
+      key = scenario_key(version, parameters, master_seed, run)
+      row = {**point, "run": run, "cached": True}
+      result = cache.load(key, result_type)
+      if result is None:
+        row["cached"] = False
+        missing.append((key, row, parameters, run))
+      else:
+        row.update(result._asdict())
+      rows.append(row)
+
+  max_workers = os.cpu_count() if max_workers is None else max_workers
+  if max_workers == 1:
+    for key, row, parameters, run in missing:
+      result = run_replication(run_model, run, seeds[run - 1], (parameters,))
+      cache.save(key, result)
+      row.update(result._asdict())
+  elif missing:
+    with ProcessPoolExecutor(max_workers = max_workers) as executor:
+      futures = {executor.submit(run_replication, run_model, run, seeds[run - 1], (parameters,)): (key, row)
+        for key, row, parameters, run in missing}
+      try:
+        for future in as_completed(futures):
+          key, row = futures[future]
+          result = future.result()
+          cache.save(key, result)
+          row.update(result._asdict())
+      finally:
+        # If the sweep is interrupted, what finished is already cached.
+        for future in futures:
+          future.cancel()
+
+  return pd.DataFrame(rows)
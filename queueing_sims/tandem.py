@@ -0,0 +1,117 @@
+###############################################################################
+# An engine for FIFO stations in series (e.g. registration -> nurse) where
+# each station has c identical servers. This replaces the SimPy process per
+# patient in linear-examples/nurse-with-registration-example.py.
+#
+# Each station keeps the times its servers become free. A customer starts
+# service at max(arrival, earliest free server) and that server is then busy
+# until start + service. The free times are kept
+# - in a heap for a single server or a handful of servers, or
+# - in a sorted array for many servers, where whole blocks of customers can
+#   be assigned at once. Customer i in a block takes the i-th earliest server
+#   as long as none of the customers ahead of it in the block free up a
+#   server sooner, which is checked with a running minimum.
+# A single server uses the closed form of the Lindley recursion.
+#
+# Customers leave a station in the order they finish, which with several
+# servers is not the order they arrived, so the next station sees them
+# sorted by departure time.
+###############################################################################
+
+import heapq
+from typing import List, NamedTuple, Optional
+
+import numpy as np
+
+from queueing_sims.lindley import Waits, service_start_times
+
+# Stations with at least this many servers use the sorted array strategy.
+SORTED_ARRAY_MIN_CAPACITY = 128
+
+class Station:
+  """A FIFO station with capacity identical servers."""
+  def __init__(self, name: str, capacity: int) -> None:
+    if capacity < 1:
+      raise ValueError(f"Station {name} needs at least one server.")
+    self.name = name
+    self.capacity = capacity
+    self.free_at = np.zeros(capacity) # Sorted times each server becomes free.
+
+  def push(self, arrivals, service_times) -> np.ndarray:
+    """
+    Pushes customers, sorted by arrival time, through the station and
+    returns the time each one started service.
+    """
+    arrivals = np.asarray(arrivals, dtype=np.float64)
+    service_times = np.asarray(service_times, dtype=np.float64)
+    if len(arrivals) == 0:
+      return np.empty(0)
+    if self.capacity == 1:
+      starts = service_start_times(arrivals, service_times, float(self.free_at[0]))
+      self.free_at[0] = starts[-1] + service_times[-1]
+      return starts
+    if self.capacity < SORTED_ARRAY_MIN_CAPACITY:
+      return self._push_with_heap(arrivals, service_times)
+    return self._push_with_sorted_array(arrivals, service_times)
+
+  def _push_with_heap(self, arrivals, service_times) -> np.ndarray:
+    free_at = self.free_at.tolist()
+    heapq.heapify(free_at)
+    starts = np.empty(len(arrivals))
+    for index, (arrival, service_time) in enumerate(zip(arrivals.tolist(), service_times.tolist())):
+      earliest = free_at[0]
+      start = arrival if arrival > earliest else earliest
+      heapq.heapreplace(free_at, start + service_time)
+      starts[index] = start
+    self.free_at = np.sort(free_at)
+    return starts
+
+  def _push_with_sorted_array(self, arrivals, service_times) -> np.ndarray:
+    count = len(arrivals)
+    starts = np.empty(count)
+    free_at = self.free_at
+    next_customer = 0
+    while next_customer < count:
+      block_size = min(self.capacity, count - next_customer)
+      block = slice(next_customer, next_customer + block_size)
+      block_starts = np.maximum(arrivals[block], free_at[:block_size])
+      block_departures = block_starts + service_times[block]
+
+      # Customer i keeps the i-th earliest server only if everyone ahead of it
+      # in the block is still busy when that server frees up.
+      valid = np.minimum.accumulate(block_departures[:-1]) >= free_at[1:block_size]
+      assigned = block_size if valid.all() else 1 + int(np.argmin(valid))
+
+      starts[next_customer:next_customer + assigned] = block_starts[:assigned]
+      free_at = np.sort(np.concatenate((free_at[assigned:], block_departures[:assigned])))
+      next_customer += assigned
+    self.free_at = free_at
+    return starts
+
+class TandemResult(NamedTuple):
+  stations: list # The name of each station in order.
+  waits: list # The Waits at each station, indexed by customer.
+
+def simulate(inter_arrival_times, service_times: list, capacities: list,
+             names: Optional[List[str]] = None) -> TandemResult:
+  """
+  Pushes a batch of customers through stations in series.
+  service_times holds an array per station with each customer's service time
+  there, and capacities holds the number of servers at each station.
+  """
+  if len(service_times) != len(capacities):
+    raise ValueError("Every station needs service times and a capacity.")
+  names = [f"station {index + 1}" for index in range(len(capacities))] if names is None else names
+  stations = [Station(name, capacity) for name, capacity in zip(names, capacities)]
+
+  arrivals = np.cumsum(np.asarray(inter_arrival_times, dtype=np.float64))
+  ids = np.arange(1, len(arrivals) + 1)
+  waits = []
+  for station, station_service_times in zip(stations, service_times):
+    station_service_times = np.asarray(station_service_times, dtype=np.float64)
+    order = np.argsort(arrivals, kind="stable")
+    starts = np.empty(len(arrivals))
+    starts[order] = station.push(arrivals[order], station_service_times[order])
+    waits.append(Waits(ids, arrivals, starts, starts - arrivals))
+    arrivals = starts + station_service_times
+  return TandemResult(names, waits)
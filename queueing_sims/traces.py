@@ -0,0 +1,136 @@
+###############################################################################
+# Arrival and service traces that can be recorded and replayed.
+#
+# A trace is a set of named float64 columns, one per random stream (e.g.
+# "arrivals" and "consultation"), holding the values the stream hands out
+# in order. Arrival columns hold the gaps between arrivals, which
+# inter_arrival_times computes from timestamps.
+#
+# The file is a small JSON header followed by the columns back to back, so
+# read_trace memory maps it: nothing is parsed or copied, and only the
+# pages a run actually reaches are read. That keeps traces of hundreds of
+# millions of arrivals cheap to open.
+#
+# Replaying: RandomStreams(trace = columns) hands out a trace column for
+# every stream it names instead of drawing from the stream's distribution.
+# When the arrivals run out the arrival generators stop creating entities.
+#
+# Recording: RandomStreams(seed, recorder = TraceRecorder(path)) saves every
+# value its streams hand out. Close the streams when the run is over to
+# write the file. Replaying a recorded trace reproduces the run exactly,
+# whatever engine or version replays it.
+#
+# Usage
+#   write_trace("incident.trace", {"arrivals": inter_arrival_times(timestamps),
+#                                  "consultation": durations})
+#   metadata, columns = read_trace("incident.trace")
+#   streams = RandomStreams(trace = columns)
+###############################################################################
+
+import json
+import os
+import struct
+from typing import Optional
+
+import numpy as np
+
+MAGIC = b"QSTRACE1"
+ALIGNMENT = 64 # The columns start on a 64 byte boundary.
+CHUNK_VALUES = 1 << 20 # How many values are copied at a time.
+
+def inter_arrival_times(timestamps) -> np.ndarray:
+  """
+  The gaps between sorted arrival timestamps. The models create their first
+  entity at time zero, so replaying the gaps reproduces the timestamps
+  relative to the first one.
+  """
+  return np.diff(np.asarray(timestamps, dtype=np.float64))
+
+def _header(columns: dict, metadata: Optional[dict]) -> tuple:
+  """The encoded header for columns of name => length, and where the data starts."""
+  offset = 0
+  layout = []
+  for name, length in columns.items():
+    layout.append({"name": name, "offset": offset, "length": length})
+    offset += length
+  header = json.dumps({"columns": layout, "metadata": metadata or {}}).encode("utf-8")
+  start = len(MAGIC) + 8 + len(header)
+  data_start = -(-start // ALIGNMENT) * ALIGNMENT
+  return MAGIC + struct.pack("<Q", len(header)) + header + bytes(data_start - start), data_start
+
+def _write_values(file, values) -> None:
+  for start in range(0, len(values), CHUNK_VALUES):
+    file.write(np.ascontiguousarray(values[start:start + CHUNK_VALUES], dtype="<f8").tobytes())
+
+def write_trace(path, columns: dict, metadata: Optional[dict] = None) -> None:
+  """Writes columns of name => values to path. The values can be memory mapped."""
+  header, _ = _header({name: len(values) for name, values in columns.items()}, metadata)
+  temporary = f"{path}.{os.getpid()}.tmp"
+  with open(temporary, "wb") as file:
+    file.write(header)
+    for values in columns.values():
+      _write_values(file, values)
+  os.replace(temporary, path)
+
+def read_trace(path) -> tuple:
+  """Returns the metadata of a trace and a dictionary of its memory mapped columns."""
+  with open(path, "rb") as file:
+    if file.read(len(MAGIC)) != MAGIC:
+      raise ValueError(f"{path} is not a trace.")
+    (length,) = struct.unpack("<Q", file.read(8))
+    header = json.loads(file.read(length))
+  layout = header["columns"]
+  _, data_start = _header({column["name"]: column["length"] for column in layout}, header["metadata"])
+  total = sum(column["length"] for column in layout)
+  if total == 0:
+    data = np.empty(0) # memmap can't map zero bytes.
+  else:
+    data = np.memmap(path, dtype="<f8", mode="r", offset=data_start, shape=(total,))
+  columns = {column["name"]: data[column["offset"]:column["offset"] + column["length"]] for column in layout}
+  return header["metadata"], columns
+
+class TraceRecorder:
+  """
+  Records the values of named columns as they're produced and writes them
+  to path as a trace when it's closed. Values are spooled to a temporary
+  file per column, so memory stays constant however long the run.
+  """
+  def __init__(self, path, metadata: Optional[dict] = None) -> None:
+    self.path = path
+    self.metadata = metadata
+    self._spools = {} # Column => (the temporary file, the values written).
+
+  def write(self, column: str, values) -> None:
+    if column not in self._spools:
+      spool = open(f"{self.path}.{len(self._spools)}.{os.getpid()}.tmp", "w+b")
+      self._spools[column] = [spool, 0]
+    spool = self._spools[column]
+    _write_values(spool[0], values)
+    spool[1] += len(values)
+
+  def close(self, lengths: Optional[dict] = None) -> None:
+    """
+    Writes the trace. lengths can cut columns short, e.g. to the values a
+    stream handed out rather than all it drew.
+    """
+    lengths = {} if lengths is None else lengths
+    columns = {column: min(lengths.get(column, written), written)
+      for column, (_, written) in self._spools.items()}
+    header, _ = _header(columns, self.metadata)
+    temporary = f"{self.path}.{os.getpid()}.tmp"
+    try:
+      with open(temporary, "wb") as file:
+        file.write(header)
+        for column, (spool, _) in self._spools.items():
+          spool.seek(0)
+          remaining = columns[column] * 8
+          while remaining > 0:
+            chunk = spool.read(min(remaining, CHUNK_VALUES * 8))
+            file.write(chunk)
+            remaining -= len(chunk)
+      os.replace(temporary, self.path)
+    finally:
+      for spool, _ in self._spools.values():
+        spool.close()
+        os.remove(spool.name)
+      self._spools = {}
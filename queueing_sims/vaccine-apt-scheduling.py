@@ -24,6 +24,27 @@
 # Model Details
 # - Unit of Time: Minutes
 # - Recommended number of runs to average across: ???
+#
+# Scaling
+# Surges bring millions of candidates an hour, so nothing here is per
+# candidate: no SimPy process, no object and no event.
+# - The waiting room is a fixed window rate limiter in front of a FIFO.
+#   The FIFO is a TimestampRing (see backlog.py) of arrival times, 8 bytes
+#   per waiting candidate. Candidates leave in arrival order, so their ids
+#   follow from how many have left and don't need storing.
+# - A single process runs once per window. It draws the window's arrivals
+#   as a block, releases up to max_outflow_threshold candidates (those
+#   already waiting at the start of the window, then new arrivals as they
+#   come) and queues the rest. Windows nobody waits or arrives in are
+#   skipped.
+# - candidate_arrival_time can be a rate from arrivals.py instead, for the
+#   waves of a registration opening. The arrivals are still drawn in
+#   blocks, sized by the expected arrivals up to the end of the window.
+# - Released candidates start registering at once. Their registration
+#   times are drawn as a block, and those who finish before the end of the
+#   run are counted as registered.
+# Memory grows with the number of candidates waiting, not with how many
+# arrive.
 """
 Thoughts on modeling.
 Everything we do in regards to performance is at the minute level. 
@@ -38,19 +59,35 @@ how long will it take to create 30 M articles?
 """
 ###############################################################################
 
+import math
+
 import simpy
-import random
 
-from typing import NamedTuple
+import numpy as np
+
+from typing import NamedTuple, Optional
+
+from queueing_sims.arrivals import expected_arrivals, inter_arrival_distribution
+from queueing_sims.backlog import TimestampRing
+from queueing_sims.distributions import Exponential, RandomStreams
+from queueing_sims.event_log import ARRIVED, NULL_LOG, STARTED
+from queueing_sims.replications import run_replications
+from queueing_sims.streaming_stats import RunningStats
+
+# The stations in the event log.
+STATIONS = ["waiting room", "registration"]
+WAITING_ROOM, REGISTRATION = range(len(STATIONS))
 
 class ModelParameters(NamedTuple):
   # Simulation Parameters
   number_of_runs: int = 1 
   sim_duration: int = 60 * 60 * 2 # Seconds * Minutes * Hours
+  master_seed: Optional[int] = None # Set to make the runs reproducible.
 
   # Waiting Room Parameters
-  candidate_arrival_time: int = 5 # The average amount of time until the next users arrives.
-  max_outflow_threshold: int = 10 # Number of users that can leave the waiting room per minute.
+  candidate_arrival_time: float = 5 # The average amount of time until the next users arrives, or a rate (see arrivals.py).
+  max_outflow_threshold: int = 10 # Number of users that can leave the waiting room per window.
+  window_size: int = 1 # The length of the waiting room's rate limiting window, in minutes.
   
   # Registration Parameters
   avg_registration_time: int = 5 # Number of minutes spent registering.
@@ -60,82 +97,169 @@ class ModelParameters(NamedTuple):
   #Scheduling Parameters
   avg_scheduling_time: int = 5 # Number of minutes spent registering.
 
-class Candidate:
-  def __init__(self, id) -> None:
-    self.id = id
-
-
 class WaitingRoom:
   """
   Leverages a fixed window rate limiter.
-  A counter is applied for the window duration. If the number of requests is 
-  greater than the max_outflow, then the inbound request is added to a queue.
+  At most max_outflow candidates leave per window of window_size. The
+  rest wait, first in first out, for a later window.
   """
-  def __init__(self, env, window_size:int, max_outflow: int) -> None:
+  def __init__(self, env, window_size: int, max_outflow: int, event_log = NULL_LOG) -> None:
+    if window_size <= 0:
+      raise ValueError("window_size must be greater than 0.")
     self.env = env
+    self.event_log = event_log
     self.window_size = window_size
     self.max_outflow = max_outflow
+    self.waiting = TimestampRing() # The arrival times of the candidates waiting, oldest first.
+    self.arrived = 0
+    self.released = 0
+    self.waits = RunningStats() # Time spent in the waiting room by the candidates released.
+    self.max_waiting = 0
 
-    # Perhaps use 2 stores. 1 for inbound, 1 for outbound.
-    # If the rate is low append to outbound.
-    # If the rate is high append to inbound
-    self.store = simpy.Store(self.env)
+  def __len__(self) -> int:
+    return len(self.waiting)
 
-  def waiting(self, candidate: Candidate) -> None:
-    # This is where I need to put the logic for waiting in the queue.
-    print(f"Candidate {candidate.id} is entering the waiting room.")
-    
-    yield self.env.timeout(1) # What should this be?
-    self.store.put(candidate)
+  def admit(self, arrivals: np.ndarray) -> tuple:
+    """
+    Runs the window starting now for the candidates arriving during it at
+    the sorted times arrivals. Returns the times the released candidates
+    leave and their ids, in the order they leave.
+    """
+    now = self.env.now
+    first_id = self.arrived + 1
+    self.arrived += len(arrivals)
 
-  def enter(self, candidate: Candidate) -> None:
-    self.env.process(self.waiting(candidate))
+    if not self.waiting and len(arrivals) <= self.max_outflow:
+      # The usual case when the site isn't busy: everyone walks straight through.
+      leave_times = arrivals
+      waits = np.zeros(len(arrivals))
+    else:
+      # Those already waiting go first, all at the start of the window. If
+      # that leaves room, new arrivals walk straight through until it's used up.
+      waited = self.waiting.pop_many(self.max_outflow)
+      room = self.max_outflow - len(waited)
+      walk_in = arrivals[:room]
+      self.waiting.extend(arrivals[room:])
+      self.max_waiting = max(self.max_waiting, len(self.waiting))
+      leave_times = np.concatenate((np.full(len(waited), now), walk_in))
+      waits = np.concatenate((now - waited, np.zeros(len(walk_in))))
+    self.waits.extend(waits)
+    ids = np.arange(self.released + 1, self.released + 1 + len(leave_times))
+    self.released += len(leave_times)
 
-  def exit(self):
-    """Returns a candidate if one is available."""
-    return self.store.get()
+    if self.event_log is not NULL_LOG:
+      times = np.concatenate((arrivals, leave_times))
+      order = np.argsort(times, kind="stable")
+      self.event_log.extend(times[order],
+        np.concatenate((np.arange(first_id, first_id + len(arrivals)), ids))[order],
+        np.concatenate((np.full(len(arrivals), WAITING_ROOM), np.full(len(ids), REGISTRATION)))[order],
+        np.concatenate((np.full(len(arrivals), ARRIVED), np.full(len(ids), STARTED)))[order])
+    return leave_times, ids
 
 class VaccineModel:
-  def __init__(self, parameters: ModelParameters, run_iteration: int) -> None:
+  def __init__(self, parameters: ModelParameters, run_iteration: int, rng = None, event_log = NULL_LOG,
+               streams = None) -> None:
     self.env = simpy.Environment()
+    self.event_log = event_log
     self.parameters = parameters
     self.run_iteration = run_iteration
-    self.candidate_counter = 0
+    # Pass streams to replay or record a trace (see traces.py).
+    self.streams = RandomStreams(rng) if streams is None else streams
+    self.candidate_arrivals = self.streams.add("arrivals", inter_arrival_distribution(parameters.candidate_arrival_time))
+    self.registration_times = self.streams.add("registration", Exponential(parameters.avg_registration_time))
+    self.registered = 0 # Candidates who finished registering before the end of the run.
+
+    # Arrival times drawn but not yet reached. The first candidate arrives at time zero.
+    self._upcoming = np.zeros(1)
+    self._arrivals_exhausted = False
 
     # Create the resources...
-    self.waiting_room = WaitingRoom(self.env, self.parameters.max_outflow_threshold)
+    self.waiting_room = WaitingRoom(self.env, self.parameters.window_size, self.parameters.max_outflow_threshold,
+                                    event_log = event_log)
+
+  @property
+  def candidate_counter(self) -> int:
+    return self.waiting_room.arrived
 
   def run(self) -> None:
     ## Set up the procceses
-    self.env.process(self._enforce_candidates_waiting_room())
-    self.env.process(self._user_registration())
+    self.env.process(self._run_waiting_room())
     self.env.run(until = self.parameters.sim_duration)
 
-  def _enforce_candidates_waiting_room(self) -> None:
-    """Creates candidates and has them enter the waiting room."""
+  def _draw_arrivals(self, end: float) -> None:
+    """Draws arrival times in blocks until one is at or after end."""
+    upcoming = self._upcoming
+    while not self._arrivals_exhausted and (len(upcoming) == 0 or upcoming[-1] < end):
+      last = upcoming[-1] if len(upcoming) else self.env.now
+      # Enough to get to end on average, and then some.
+      count = int(expected_arrivals(self.parameters.candidate_arrival_time, last, end) * 1.1) + 64
+      gaps = self.candidate_arrivals.take(count)
+      times = last + np.cumsum(gaps)
+      if len(gaps) < count or not np.isfinite(times[-1]):
+        # A replayed trace has no more arrivals, or the arrival rate has dropped to zero for good.
+        self._arrivals_exhausted = True
+        times = times[np.isfinite(times)]
+      upcoming = np.concatenate((upcoming, times))
+    self._upcoming = upcoming
+
+  def _arrivals_before(self, end: float) -> np.ndarray:
+    """The arrival times from the current window up to end."""
+    self._draw_arrivals(end)
+    cut = int(np.searchsorted(self._upcoming, end, side="left"))
+    arrivals = self._upcoming[:cut]
+    self._upcoming = self._upcoming[cut:]
+    return arrivals
+
+  def _run_waiting_room(self) -> None:
+    """Lets candidates out of the waiting room one window at a time and starts their registration."""
+    window_size = self.parameters.window_size
     while True:
-      # A new candiate arrives
-      self.candidate_counter += 1
-      self.waiting_room.enter(Candidate(self.candidate_counter))
-      
-      # Determine the arrival rate for the next candiate using an exponential distribution.
-      next_candidate_arrival_time = random.expovariate(1.0 / self.parameters.candidate_arrival_time)
-      yield self.env.timeout(next_candidate_arrival_time)
-
-  def _user_registration(self) -> None:
+      window_end = min(self.env.now + window_size, self.parameters.sim_duration)
+      leave_times, _ = self.waiting_room.admit(self._arrivals_before(window_end))
+      self._register(leave_times)
+      next_window = self.env.now + window_size
+      if len(self.waiting_room) == 0:
+        # Nobody is waiting, so skip ahead to the window of the next arrival.
+        self._draw_arrivals(next_window)
+        if len(self._upcoming) == 0:
+          return
+        next_window = max(next_window, math.floor(self._upcoming[0] / window_size) * window_size)
+      yield self.env.timeout(next_window - self.env.now)
+
+  def _register(self, start_times: np.ndarray) -> None:
     """Canidates leave the waiting room and go through the registration process"""
-    while True:
-      candidate = yield self.waiting_room.exit()
-      print(f"Candidate {candidate.id} has started registration.")
+    if len(start_times) == 0:
+      return
+    durations = self.registration_times.take(len(start_times))
+    finish_times = start_times[:len(durations)] + durations
+    self.registered += int(np.count_nonzero(finish_times < self.parameters.sim_duration))
+
+
+class RunResult(NamedTuple):
+  run: int
+  candidates_arrived: int
+  candidates_released: int # Candidates let out of the waiting room to register.
+  candidates_registered: int # Candidates who finished registering.
+  average_wait: float # Minutes in the waiting room, per candidate released.
+  max_waiting: int # The most candidates in the waiting room at the end of a window.
 
+def run_model(run, rng, parameters) -> RunResult:
+  """Runs a single replication. Called in a worker process."""
+  sim = VaccineModel(parameters, run, rng)
+  sim.run()
+  waiting_room = sim.waiting_room
+  return RunResult(run, sim.candidate_counter, waiting_room.released, sim.registered, waiting_room.waits.mean,
+                   waiting_room.max_waiting)
 
 def main():
   parameters = ModelParameters()
   run_results = []
-  for sim_run in range(parameters.number_of_runs):
-    iteration = sim_run + 1
-    sim = VaccineModel(parameters, iteration)
-    sim.run()
+  for run_result in run_replications(run_model, parameters.number_of_runs, parameters.master_seed, args = (parameters,)):
+    run_results.append(run_result)
+    print(f"Run {run_result.run}: {run_result.candidates_arrived} candidates arrived, "
+          f"{run_result.candidates_released} left the waiting room after {run_result.average_wait:.2f} minutes "
+          f"on average and {run_result.candidates_registered} registered. "
+          f"At most {run_result.max_waiting} were waiting.")
 
 if __name__ == "__main__":
   main()
\ No newline at end of file
@@ -0,0 +1,82 @@
+###############################################################################
+# Warm-up detection for output that starts from an empty system.
+#
+# The models start empty, so the first waits and queue depths are lower
+# than the steady state's and drag the run's average down. mser() finds
+# where to cut that transient off with MSER-5 (White's Marginal Standard
+# Error Rule on batches of 5):
+# - The series is averaged in batches of batch_size, which smooths it.
+# - For every truncation point d it computes the squared standard error of
+#   the mean of the batches after d. Cutting the transient lowers the
+#   variance faster than losing batches raises it, until the series has
+#   settled.
+# - The point with the smallest standard error is the truncation point.
+#
+# Only the first half of the series is considered. If the unrestricted
+# minimum is in the second half, the run is too short to have reached a
+# steady state and the truncation is marked as not reliable; run longer.
+#
+# Suffix sums make it a single pass, so it's cheap on millions of values.
+#
+# Usage
+#   truncation = mser(waits, times = arrival_times)
+#   print(truncation) # Where the transient ended and the mean without it.
+#   steady_waits = waits[truncation.index:]
+###############################################################################
+
+from typing import NamedTuple, Optional
+
+import numpy as np
+
+MSER_BATCH_SIZE = 5
+
+class Truncation(NamedTuple):
+  index: int # The observations before index are the transient.
+  time: Optional[float] # When the transient ended, if the observations' times were given.
+  batch_size: int
+  mean: float # The mean of the observations kept.
+  observations: int # The observations kept.
+  reliable: bool # False if the series hadn't settled by its second half.
+
+  def __str__(self) -> str:
+    if self.index == 0:
+      cut = "No warm-up to drop."
+    else:
+      until = "" if self.time is None else f" (until {self.time:g})"
+      cut = f"Dropped the first {self.index} observations{until} as warm-up."
+    warning = "" if self.reliable else " The run looks too short to have reached a steady state."
+    return f"{cut} The mean of the remaining {self.observations} is {self.mean:.4g}.{warning}"
+
+def mser(values, batch_size: int = MSER_BATCH_SIZE, times = None) -> Truncation:
+  """
+  The MSER truncation point of values, in the order they were observed.
+  times, the same length as values, gives the truncation point as a time.
+  """
+  values = np.asarray(values, dtype=np.float64)
+  if batch_size < 1:
+    raise ValueError("batch_size must be at least 1.")
+  if times is not None and len(times) != len(values):
+    raise ValueError("There must be a time for every value.")
+  if len(values) == 0:
+    return Truncation(0, None, batch_size, float("nan"), 0, False)
+
+  batches = len(values) // batch_size
+  index = 0
+  reliable = batches >= 4
+  if reliable:
+    means = values[:batches * batch_size].reshape(batches, batch_size).mean(axis=1)
+    means -= means.mean() # Centered, so the sums of squares don't lose precision.
+    # The sums over batches d.. for every d, and how many batches that is.
+    sums = np.cumsum(means[::-1])[::-1]
+    squares = np.cumsum((means * means)[::-1])[::-1]
+    remaining = np.arange(batches, 0, -1)
+    statistic = (squares - sums * sums / remaining) / (remaining * remaining)
+    # The last batch on its own has no variance, so it can't be a candidate.
+    best = int(np.argmin(statistic[:-1]))
+    half = batches // 2
+    reliable = best <= half
+    index = best * batch_size if reliable else int(np.argmin(statistic[:half + 1])) * batch_size
+
+  kept = values[index:]
+  time = None if times is None else float(times[index])
+  return Truncation(index, time, batch_size, float(kept.mean()), len(kept), reliable)
@@ -0,0 +1,46 @@
+###############################################################################
+# Straightforward per-customer implementations the fast engines are checked
+# against, and series with a known mean for the output analysis.
+###############################################################################
+
+import heapq
+
+import numpy as np
+
+def fifo_start_times(arrivals, service_times, capacity: int) -> np.ndarray:
+  """When each customer starts service at a FIFO station with capacity servers, one customer at a time."""
+  free_at = [0.0] * capacity
+  starts = np.empty(len(arrivals))
+  for index in np.argsort(arrivals, kind="stable"):
+    start = max(arrivals[index], heapq.heappop(free_at))
+    heapq.heappush(free_at, start + service_times[index])
+    starts[index] = start
+  return starts
+
+def tandem_waits(inter_arrival_times, service_times: list, capacities: list) -> list:
+  """Every customer's wait at each station of a series of FIFO stations."""
+  arrivals = np.cumsum(inter_arrival_times)
+  waits = []
+  for station_service_times, capacity in zip(service_times, capacities):
+    starts = fifo_start_times(arrivals, station_service_times, capacity)
+    waits.append(starts - arrivals)
+    arrivals = starts + station_service_times
+  return waits
+
+MEAN = 5.0
+
+def autocorrelated(count: int, seed: int, correlation: float = 0.9) -> np.ndarray:
+  """A stationary AR(1) series with mean MEAN and unit marginal variance."""
+  rng = np.random.default_rng(seed)
+  noise = rng.normal(0, np.sqrt(1 - correlation ** 2), count)
+  values = np.empty(count)
+  values[0] = rng.normal()
+  for index in range(1, count):
+    values[index] = correlation * values[index - 1] + noise[index]
+  return MEAN + values
+
+def with_transient(values: np.ndarray, length: int) -> np.ndarray:
+  """values starting from zero and climbing to their level over length observations, as an empty system does."""
+  values = values.copy()
+  values[:length] *= np.linspace(0, 1, length)
+  return values
@@ -0,0 +1,59 @@
+import math
+from typing import NamedTuple
+
+import pytest
+
+from queueing_sims import analytic
+from queueing_sims.distributions import Exponential, RandomStreams, Uniform
+from queueing_sims.network import Network, Station
+
+def test_erlang_c_by_hand():
+  assert analytic.erlang_c(1, 0.6) == pytest.approx(0.6)
+  # Erlang B is 1.125 / 3.625 for 2 servers and 1.5 erlangs.
+  assert analytic.erlang_c(2, 1.5) == pytest.approx(9 / 14)
+  assert analytic.erlang_c(3, 3.0) == 1.0
+
+@pytest.mark.parametrize("seed", [1, 2])
+@pytest.mark.parametrize("servers, mean_service", [(1, 0.7), (2, 1.5), (4, 3.2)])
+def test_an_mmc_station_matches_the_simulation(seed, servers, mean_service):
+  network = Network([Station("server", servers, Exponential(mean_service))], Exponential(1), routing = [[0]])
+  solution = analytic.solve(network)
+  assert solution.product_form and solution.stable
+  result = network.simulate(200_000, RandomStreams(seed))
+  stats = result.station("server")
+  assert stats.waits.mean == pytest.approx(solution.mean_wait, rel = 0.08)
+  assert stats.utilization == pytest.approx(solution.station("server").utilization, rel = 0.02)
+  assert stats.mean_queue_length == pytest.approx(solution.station("server").mean_queue_length, rel = 0.08)
+
+def test_a_jackson_network_matches_the_simulation():
+  # Registration, a nurse, then a doctor who sends a fifth back to the nurse.
+  network = Network([Station("registration", 1, Exponential(2)), Station("nurse", 3, Exponential(5)),
+    Station("doctor", 5, Exponential(8))], Exponential(3), routing = [[0, 1, 0], [0, 0, 1], [0, 0.2, 0]])
+  solution = analytic.solve(network)
+  assert solution.station("nurse").arrival_rate == pytest.approx(1 / 3 / 0.8)
+  result = network.simulate(300_000, RandomStreams(3))
+  assert result.waited.mean == pytest.approx(solution.mean_wait, rel = 0.08)
+  assert result.sojourn.mean == pytest.approx(solution.mean_sojourn, rel = 0.05)
+
+def test_unstable_and_estimated_solutions():
+  unstable = analytic.solve(Network([Station("server", 1, Exponential(2))], Exponential(1), routing = [[0]]))
+  assert not unstable.stable and math.isinf(unstable.mean_wait)
+  estimate = analytic.solve(Network([Station("server", 1, Uniform(0, 1))], Exponential(1), routing = [[0]]))
+  assert not estimate.product_form and estimate.station("server").utilization == pytest.approx(0.5)
+
+def test_routing_that_never_exits_is_rejected():
+  with pytest.raises(ValueError):
+    analytic.solve(Network([Station("server", 1, Exponential(1))], Exponential(1), routing = [[1]]))
+
+class Parameters(NamedTuple):
+  servers: int = 1
+
+def build_network(parameters: Parameters) -> Network:
+  return Network([Station("server", parameters.servers, Exponential(1.5))], Exponential(1), routing = [[0]])
+
+def test_screen_picks_the_promising_stable_points():
+  screened = analytic.screen(build_network, Parameters(), {"servers": [1, 2, 3]},
+    lambda solution: solution.mean_wait < 1)
+  assert screened["servers"].tolist() == [1, 2, 3]
+  assert screened["stable"].tolist() == [False, True, True]
+  assert screened["simulate"].tolist() == [False, False, True]
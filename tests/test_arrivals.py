@@ -0,0 +1,90 @@
+import math
+
+import numpy as np
+import pytest
+
+from queueing_sims.arrivals import (NonHomogeneousPoisson, PiecewiseRate, SinusoidalRate, expected_arrivals,
+  inter_arrival_distribution)
+from queueing_sims.distributions import Exponential
+
+def arrival_times(rate, count: int, seed: int) -> np.ndarray:
+  return np.cumsum(NonHomogeneousPoisson(rate).sample(np.random.default_rng(seed), count))
+
+class ThinnedOnly:
+  """A rate without inverse_cumulative, so arrivals are drawn by thinning."""
+  def __init__(self, rate) -> None:
+    self.wrapped = rate
+    self.max_rate = rate.max_rate
+    self.average_rate = rate.average_rate
+
+  def rate(self, t):
+    return self.wrapped.rate(t)
+
+  def cumulative(self, t):
+    return self.wrapped.cumulative(t)
+
+@pytest.mark.parametrize("thinned", [False, True])
+@pytest.mark.parametrize("seed", [1, 2])
+def test_counts_in_each_piece_match_the_rate(seed, thinned):
+  rate = PiecewiseRate([0, 100, 150, 300], [2, 20, 0, 5], period = 400)
+  times = arrival_times(ThinnedOnly(rate) if thinned else rate, 60_000, seed)
+  times = times[times < 20 * 400] # 20 periods.
+  counts = np.bincount(np.searchsorted(rate.starts, times % 400, side="right") - 1, minlength = 4)
+  expected = 20 * np.array([2 * 100, 20 * 50, 0, 5 * 100])
+  assert counts[2] == 0
+  # Within 4 standard deviations of a Poisson count.
+  assert np.all(np.abs(counts - expected) <= 4 * np.sqrt(np.maximum(expected, 1)))
+
+def test_arrivals_stop_when_the_rate_drops_to_zero():
+  rate = PiecewiseRate.from_counts([3, 5], 10)
+  gaps = NonHomogeneousPoisson(rate).sample(np.random.default_rng(1), 200)
+  times = np.cumsum(gaps)
+  assert np.all(times[np.isfinite(times)] < 20)
+  assert math.isinf(gaps[-1])
+
+def test_inverse_cumulative_undoes_cumulative():
+  rate = PiecewiseRate([0, 9, 10], [12, 600, 60], period = 24)
+  times = np.array([0.0, 4.5, 9.0, 9.25, 10.0, 23.9, 24.0, 50.5])
+  np.testing.assert_allclose(rate.inverse_cumulative(rate.cumulative(times)), times)
+  assert rate.average_rate == pytest.approx((12 * 9 + 600 + 60 * 14) / 24)
+
+def test_from_arrival_times_counts_per_interval():
+  rate = PiecewiseRate.from_arrival_times([0.5, 1.5, 1.7, 3.2], 1.0)
+  np.testing.assert_array_equal(rate.rates, [1, 2, 0, 1, 0])
+  assert rate.cumulative(10.0) == 4
+
+def integrated(rate, times: np.ndarray) -> np.ndarray:
+  """The integral of rate.rate from 0 to each time, by the trapezoid rule."""
+  grid = np.linspace(0, times.max(), 400_001)
+  values = rate.rate(grid)
+  return np.interp(times, grid, np.concatenate(([0.0], np.cumsum((values[1:] + values[:-1]) / 2 * np.diff(grid)))))
+
+@pytest.mark.parametrize("rate", [
+  SinusoidalRate(8, 6, 500),
+  SinusoidalRate(2, 5, 100, phase = -1.0), # Clipped at zero for part of the cycle.
+  SinusoidalRate(2, -5, 100, phase = 2.5),
+  SinusoidalRate(0, 3, 10),
+])
+def test_sinusoidal_cumulative_integrates_the_rate(rate):
+  times = np.array([1.0, 13.3, 250.0, 399.0, 730.0])
+  np.testing.assert_allclose(rate.cumulative(times), integrated(rate, times), rtol = 1e-6)
+  assert rate.average_rate == pytest.approx(integrated(rate, np.array([rate.period]))[0] / rate.period, rel = 1e-6)
+
+def test_a_clipped_sinusoid_averages_more_than_its_mean():
+  # Above zero for a third of the cycle.
+  rate = SinusoidalRate(1, 2, 2 * math.pi)
+  assert rate.average_rate == pytest.approx((2 * math.sqrt(3) + 4 * math.pi / 3) / (2 * math.pi))
+
+@pytest.mark.parametrize("seed", [1, 2])
+def test_sinusoidal_arrivals_follow_the_cumulative(seed):
+  rate = SinusoidalRate(2, 5, 100)
+  times = arrival_times(rate, 20_000, seed)
+  for end in [25.0, 50.0, 1000.0, 5000.0]:
+    expected = float(rate.cumulative(end))
+    assert abs(np.sum(times < end) - expected) <= 4 * math.sqrt(expected)
+
+def test_a_mean_or_a_rate():
+  assert inter_arrival_distribution(0.5) == Exponential(0.5)
+  assert isinstance(inter_arrival_distribution(SinusoidalRate(8, 6, 500)), NonHomogeneousPoisson)
+  assert expected_arrivals(0.5, 10, 20) == 20
+  assert expected_arrivals(PiecewiseRate([0, 10], [1, 3]), 5, 15) == pytest.approx(5 + 15)
@@ -0,0 +1,82 @@
+from collections import deque
+
+import numpy as np
+import pytest
+import simpy
+
+from queueing_sims.backlog import CountingStore, TimestampRing, TimestampStore
+
+def test_append_and_pop_wrap_around():
+  ring = TimestampRing(4)
+  expected = deque()
+  # Keep two or three waiting so the head goes round the buffer many times.
+  for value in range(100):
+    ring.append(float(value))
+    expected.append(float(value))
+    if len(expected) > 2:
+      assert ring.pop() == expected.popleft()
+  assert ring.nbytes == 4 * 8
+  assert ring.to_array().tolist() == list(expected)
+
+def test_grows_when_full_and_shrinks_when_a_quarter_full():
+  ring = TimestampRing(4)
+  ring.append(-1.0)
+  ring.pop() # Move the head off zero so growing has to unwrap.
+  for value in range(1000):
+    ring.append(float(value))
+  assert ring.nbytes == 1024 * 8
+  assert ring.to_array().tolist() == [float(value) for value in range(1000)]
+  for value in range(990):
+    assert ring.pop() == float(value)
+  assert ring.nbytes == 32 * 8
+  assert [ring[index] for index in range(len(ring))] == [float(value) for value in range(990, 1000)]
+  assert ring[-1] == 999.0
+
+@pytest.mark.parametrize("seed", [1, 2, 3])
+def test_matches_a_deque(seed):
+  rng = np.random.default_rng(seed)
+  ring = TimestampRing(8)
+  expected = deque()
+  clock = 0.0
+  for _ in range(3000):
+    operation = rng.integers(4)
+    if operation == 0:
+      clock += 1
+      ring.append(clock)
+      expected.append(clock)
+    elif operation == 1:
+      values = clock + np.arange(1, rng.integers(0, 300) + 1)
+      clock += len(values)
+      ring.extend(values)
+      expected.extend(values.tolist())
+    elif operation == 2 and expected:
+      assert ring.pop() == expected.popleft()
+    else:
+      count = int(rng.integers(0, 300))
+      popped = ring.pop_many(count)
+      assert popped.tolist() == [expected.popleft() for _ in range(min(count, len(popped)))]
+    assert len(ring) == len(expected)
+    assert bool(ring) == bool(expected)
+  assert ring.to_array().tolist() == list(expected)
+
+def test_pop_from_empty_raises():
+  with pytest.raises(IndexError):
+    TimestampRing().pop()
+  with pytest.raises(IndexError):
+    TimestampRing()[0]
+
+@pytest.mark.parametrize("backlog", [simpy.Store, TimestampStore, CountingStore])
+def test_stores_hand_out_requests_in_order(backlog):
+  env = simpy.Environment()
+  store = backlog(env)
+  received = []
+  def consumer():
+    while True:
+      received.append((yield store.get()))
+      yield env.timeout(1)
+  for arrived in [0.0, 0.0, 0.5]:
+    store.put(arrived)
+  env.process(consumer())
+  env.run(until = 10)
+  expected = [None] * 3 if backlog is CountingStore else [0.0, 0.0, 0.5]
+  assert received == expected
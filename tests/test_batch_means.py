@@ -0,0 +1,44 @@
+import numpy as np
+import pytest
+
+from queueing_sims.batch_means import BatchMeans
+from tests.reference import MEAN, autocorrelated, with_transient
+
+@pytest.mark.parametrize("seed", [1, 2, 3])
+def test_batch_means_interval_covers_the_mean(seed):
+  batches = BatchMeans()
+  batches.extend(with_transient(autocorrelated(200_000, seed), 1000))
+  estimate = batches.estimate()
+  assert not estimate.correlated
+  assert estimate.batches >= batches.min_batches
+  assert estimate.lag1 <= batches.max_lag1
+  assert estimate.warmup > 0
+  assert estimate.observations + estimate.warmup <= batches.count
+  for interval in (estimate.nonoverlapping, estimate.overlapping):
+    assert interval.lower <= MEAN <= interval.upper
+    assert interval.relative_half_width < 0.02
+  assert estimate.overlapping.observations == estimate.batches
+
+def test_extend_matches_add():
+  values = autocorrelated(50_000, 4)
+  one_at_a_time = BatchMeans()
+  for value in values.tolist():
+    one_at_a_time.add(value)
+  in_blocks = BatchMeans()
+  for block in np.array_split(values, 37):
+    in_blocks.extend(block)
+  assert in_blocks.count == one_at_a_time.count == len(values)
+  assert in_blocks.cell_size == one_at_a_time.cell_size
+  np.testing.assert_allclose(in_blocks._cells, one_at_a_time._cells, rtol=1e-12)
+
+def test_batch_means_memory_is_bounded():
+  batches = BatchMeans(max_cells = 64)
+  batches.extend(autocorrelated(100_000, 5))
+  assert len(batches._cells) < 64
+
+def test_too_little_data_gives_an_infinite_interval():
+  batches = BatchMeans()
+  batches.extend([1.0, 2.0, 3.0])
+  estimate = batches.estimate()
+  assert estimate.correlated
+  assert estimate.overlapping.half_width == np.inf
@@ -0,0 +1,54 @@
+from typing import NamedTuple
+
+import numpy as np
+import pytest
+
+from queueing_sims.comparison import compare_scenarios
+from queueing_sims.distributions import Exponential, RandomStreams
+
+class Parameters(NamedTuple):
+  service_time: float
+
+class RunResult(NamedTuple):
+  run: int
+  average_wait: float
+
+def run_model(run, rng, parameters: Parameters) -> RunResult:
+  """The mean wait of 200 customers at a single server, by Lindley's recursion."""
+  streams = RandomStreams(rng)
+  gaps = streams.add("arrivals", Exponential(1.0)).take(200)
+  services = streams.add("service", Exponential(parameters.service_time)).take(200)
+  wait, total = 0.0, 0.0
+  for gap, service in zip(gaps[1:].tolist(), services[:-1].tolist()):
+    wait = max(wait + service - gap, 0.0)
+    total += wait
+  return RunResult(run, total / 200)
+
+SCENARIOS = {"slow": Parameters(0.5), "fast": Parameters(0.4)}
+
+def compare(method: str, scenarios: dict = SCENARIOS):
+  return compare_scenarios(run_model, scenarios, "average_wait", 30, 42, method, max_workers = 1)
+
+def test_common_random_numbers_narrow_the_difference():
+  independent = compare("independent").scenarios[1].difference
+  crn = compare("crn").scenarios[1].difference
+  assert crn.half_width < independent.half_width / 1.5
+  assert crn.upper < 0 # The faster server waits less.
+
+def test_the_same_scenario_twice_differs_by_nothing_with_crn():
+  comparison = compare("crn", {"baseline": Parameters(0.8), "again": Parameters(0.8)})
+  np.testing.assert_array_equal(comparison.observations["baseline"], comparison.observations["again"])
+  assert comparison.scenarios[1].difference.mean == 0
+
+def test_antithetic_pairs_average_a_run_and_its_mirror():
+  comparison = compare("antithetic")
+  assert comparison.runs == 60
+  crn = compare("crn")
+  assert comparison.scenarios[0].interval.half_width < crn.scenarios[0].interval.half_width
+  assert "fast" in comparison.report() and comparison.scenarios[0].difference is None
+
+def test_comparing_needs_two_scenarios_and_a_known_method():
+  with pytest.raises(ValueError):
+    compare("crn", {"slow": Parameters(0.8)})
+  with pytest.raises(ValueError):
+    compare("paired")
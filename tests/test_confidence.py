@@ -0,0 +1,66 @@
+from typing import NamedTuple
+
+import numpy as np
+import pytest
+
+from queueing_sims.confidence import confidence_interval, student_t_cdf, student_t_quantile, welch_interval
+from queueing_sims.replications import SequentialReplications, run_replications
+from queueing_sims.streaming_stats import RunningStats
+
+class RunResult(NamedTuple):
+  run: int
+  value: float
+
+def run_model(run, rng, mean = 10.0) -> RunResult:
+  return RunResult(run, float(rng.normal(mean, 2.0)))
+
+# From a table of the t distribution.
+@pytest.mark.parametrize("degrees_of_freedom, expected", [(1, 12.7062), (4, 2.7764), (10, 2.2281), (30, 2.0423)])
+def test_t_quantiles_match_the_table(degrees_of_freedom, expected):
+  assert student_t_quantile(0.975, degrees_of_freedom) == pytest.approx(expected, abs = 1e-4)
+  assert student_t_quantile(0.025, degrees_of_freedom) == pytest.approx(-expected, abs = 1e-4)
+  assert student_t_cdf(expected, degrees_of_freedom) == pytest.approx(0.975, abs = 1e-5)
+
+def test_an_interval_by_hand():
+  interval = confidence_interval([1, 2, 3, 4, 5])
+  assert interval.mean == 3 and interval.observations == 5
+  assert interval.half_width == pytest.approx(2.7764 * np.sqrt(2.5) / np.sqrt(5), abs = 1e-4)
+  assert confidence_interval([4.0]).half_width == np.inf
+
+def test_intervals_cover_the_mean_about_as_often_as_they_claim():
+  rng = np.random.default_rng(1)
+  covered = 0
+  for _ in range(2000):
+    interval = confidence_interval(rng.normal(10.0, 3.0, 8))
+    covered += interval.lower <= 10.0 <= interval.upper
+  assert 0.93 <= covered / 2000 <= 0.97
+
+def test_welch_covers_the_difference():
+  rng = np.random.default_rng(2)
+  covered = 0
+  for _ in range(2000):
+    first, second = RunningStats(), RunningStats()
+    first.extend(rng.normal(5.0, 1.0, 6))
+    second.extend(rng.normal(3.0, 4.0, 20))
+    interval = welch_interval(first, second)
+    covered += interval.lower <= 2.0 <= interval.upper
+  assert 0.93 <= covered / 2000 <= 0.97
+
+def test_sequential_replications_stop_once_precise():
+  replications = SequentialReplications(run_model, "value", master_seed = 42, absolute_precision = 0.5,
+    batch_size = 3, max_workers = 1)
+  results = list(replications)
+  assert replications.converged and replications.interval.half_width <= 0.5
+  assert [result.run for result in results] == list(range(1, replications.runs + 1))
+  # Run n gets the same seed as it would from run_replications.
+  expected = list(run_replications(run_model, replications.runs, 42, max_workers = 1))
+  assert results == expected
+
+def test_sequential_replications_stop_at_the_budget():
+  replications = SequentialReplications(run_model, "value", master_seed = 42, relative_precision = 1e-6,
+    max_runs = 7, max_workers = 1)
+  assert len(list(replications)) == 7 and not replications.converged
+
+def test_sequential_replications_need_a_precision():
+  with pytest.raises(ValueError):
+    SequentialReplications(run_model, "value")
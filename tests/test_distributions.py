@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+
+from queueing_sims.distributions import (AntitheticGenerator, Empirical, Exponential, Lognormal, RandomStreams,
+  Uniform)
+
+def draws(streams: RandomStreams, name: str, distribution, count: int) -> list:
+  stream = streams.add(name, distribution)
+  return [stream.sample() for _ in range(count)]
+
+def test_a_stream_depends_only_on_the_seed_and_its_name():
+  alone = draws(RandomStreams(42), "arrivals", Exponential(5), 100)
+  streams = RandomStreams(42)
+  other = streams.add("service", Exponential(3))
+  other.take(1000)
+  assert draws(streams, "arrivals", Exponential(5), 100) == alone
+  assert draws(RandomStreams(43), "arrivals", Exponential(5), 100) != alone
+  assert draws(RandomStreams(42), "service", Exponential(5), 100) != alone
+
+def test_blocks_are_invisible():
+  small = draws(RandomStreams(1, block_size = 7), "arrivals", Exponential(5), 100)
+  large = draws(RandomStreams(1), "arrivals", Exponential(5), 100)
+  np.testing.assert_allclose(small, large)
+
+def test_take_continues_where_sample_left_off():
+  expected = draws(RandomStreams(1), "arrivals", Exponential(5), 50)
+  stream = RandomStreams(1, block_size = 16).add("arrivals", Exponential(5))
+  head = [stream.sample() for _ in range(10)]
+  np.testing.assert_allclose(np.concatenate((head, stream.take(40))), expected)
+  assert stream.consumed == 50
+
+def test_antithetic_streams_mirror_the_uniforms():
+  seed = np.random.SeedSequence(7)
+  ordinary = RandomStreams(np.random.default_rng(seed)).add("routing", Uniform()).take(1000)
+  mirrored = RandomStreams(AntitheticGenerator(np.random.PCG64(seed))).add("routing", Uniform()).take(1000)
+  np.testing.assert_allclose(ordinary + mirrored, 1.0)
+
+@pytest.mark.parametrize("distribution, mean, stdev", [
+  (Exponential(5), 5, 5),
+  (Uniform(2, 4), 3, 2 / np.sqrt(12)),
+  (Lognormal(10, 4), 10, 4),
+])
+def test_moments(distribution, mean, stdev):
+  values = RandomStreams(1).add("values", distribution).take(400_000)
+  assert values.mean() == pytest.approx(mean, rel = 0.01)
+  assert values.std() == pytest.approx(stdev, rel = 0.02)
+
+def test_empirical_draws_in_proportion_to_the_weights():
+  values = RandomStreams(1).add("values", Empirical([1.0, 2.0, 3.0], [1, 0, 3])).take(100_000)
+  counts = np.array([np.sum(values == value) for value in (1.0, 2.0, 3.0)])
+  assert counts[1] == 0
+  assert counts[0] / len(values) == pytest.approx(0.25, abs = 0.01)
+  with pytest.raises(ValueError):
+    Empirical([])
@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+
+from queueing_sims.event_log import ARRIVED, FINISHED, NULL_LOG, RECORD, STARTED, EventLog, format_events, read_log
+
+STATIONS = ["registration", "nurse"]
+
+def test_events_round_trip(tmp_path):
+  path = tmp_path / "run.evlog"
+  with EventLog(path, "debug", STATIONS, buffer_records = 2) as log:
+    nurse = log.station_id("nurse")
+    log.info(0.5, 1, nurse, ARRIVED)
+    log.info(1.25, 1, nurse, STARTED)
+    log.debug(2.0, 1, nurse, FINISHED)
+    log.extend(np.array([3.0, 4.0]), np.array([2, 3]), log.station_id("registration"), ARRIVED)
+  header, records = read_log(path)
+  assert header == {"stations": STATIONS, "events": ["arrived", "started", "finished"]}
+  assert records.dtype == RECORD
+  assert records.tolist() == [(0.5, 1, 1, ARRIVED), (1.25, 1, 1, STARTED), (2.0, 1, 1, FINISHED),
+    (3.0, 2, 0, ARRIVED), (4.0, 3, 0, ARRIVED)]
+
+def test_events_below_the_level_are_dropped(tmp_path):
+  path = tmp_path / "run.evlog"
+  with EventLog(path, "info", STATIONS) as log:
+    log.debug(1.0, 1, 0, FINISHED)
+    log.extend([1.0], [1], 0, FINISHED, level = "debug")
+    log.info(2.0, 1, 0, ARRIVED)
+  _, records = read_log(path)
+  assert records.tolist() == [(2.0, 1, 0, ARRIVED)]
+
+def test_an_empty_log_reads_back_empty(tmp_path):
+  path = tmp_path / "run.evlog"
+  EventLog(path, stations = STATIONS).close()
+  header, records = read_log(path)
+  assert header["stations"] == STATIONS and len(records) == 0
+
+def test_the_null_log_records_nothing():
+  assert not NULL_LOG.enabled
+  NULL_LOG.info(1.0, 1, 0, ARRIVED)
+  assert NULL_LOG._pending == []
+
+def test_not_a_log(tmp_path):
+  path = tmp_path / "other.bin"
+  path.write_bytes(b"not a log at all")
+  with pytest.raises(ValueError):
+    read_log(path)
+
+def test_started_events_show_the_wait(tmp_path):
+  path = tmp_path / "run.evlog"
+  with EventLog(path, stations = STATIONS) as log:
+    log.info(0.5, 7, 1, ARRIVED)
+    log.info(2.0, 7, 1, STARTED)
+  header, records = read_log(path)
+  lines = list(format_events(header, records, keep = np.array([False, True])))
+  assert len(lines) == 1
+  assert "nurse" in lines[0] and "started" in lines[0] and "entity 7  waited 1.5000" in lines[0]
@@ -0,0 +1,23 @@
+import pytest
+
+from queueing_sims import fixed_window_vectorized
+from queueing_sims.arrivals import SinusoidalRate
+from queueing_sims.distributions import RandomStreams
+
+@pytest.mark.parametrize("seed", [1, 2, 3])
+@pytest.mark.parametrize("window_size, max_threshold, avg_arrival_speed", [
+  (1, 10, 0.12), # Mostly idle.
+  (1, 10, 0.08), # Overloaded: the backlog keeps growing.
+  (5, 3, 1.5), # Long windows and a small threshold.
+])
+def test_cross_check_agrees_with_simpy(seed, window_size, max_threshold, avg_arrival_speed):
+  # cross_check raises an AssertionError if any wait or delay differs.
+  metrics = fixed_window_vectorized.cross_check(2000, window_size, max_threshold, avg_arrival_speed,
+    streams = RandomStreams(seed))
+  assert metrics["requests_processed"] > 0
+
+@pytest.mark.parametrize("seed", [1, 2])
+def test_cross_check_agrees_with_simpy_on_waves(seed):
+  metrics = fixed_window_vectorized.cross_check(2000, 1, 10, SinusoidalRate(8, 6, 500),
+    streams = RandomStreams(seed))
+  assert metrics["requests_processed"] > 0
@@ -0,0 +1,48 @@
+import numpy as np
+import pytest
+import simpy
+
+from queueing_sims import fixed_window, kernel
+from queueing_sims.backlog import TimestampRing
+from queueing_sims.distributions import RandomStreams
+
+def run_fixed_window(backend, seed: int) -> tuple:
+  """The same wiring as fixed_window.simulate with the "ring" backlog, on backend."""
+  parameters = fixed_window.Parameters()
+  env = backend.Environment()
+  store = backend.Store(env)
+  store.items = TimestampRing()
+  metrics = fixed_window.new_metrics(reservoir_size = 100_000)
+  env.process(fixed_window.generate_requests(env, parameters.avg_arrival_speed, store, metrics, RandomStreams(seed)))
+  env.process(fixed_window.fixed_widow_processor(env, parameters.window_size, parameters.max_threshold, store, metrics))
+  env.run(until = 2000)
+  return (metrics["requests_submitted"], metrics["requests_processed"], metrics["queue_delays"].sample,
+    metrics["threshold_exceeded_wait_times"].sample)
+
+def run_resource(backend, seed: int) -> list:
+  """Customers sharing two servers, logging when each starts and finishes."""
+  env = backend.Environment()
+  servers = backend.Resource(env, capacity = 2)
+  rng = np.random.default_rng(seed)
+  log = []
+  def customer(id, service_time):
+    with servers.request() as request:
+      yield request
+      log.append((id, "start", env.now))
+      yield env.timeout(service_time)
+      log.append((id, "finish", env.now))
+  def arrivals():
+    for id, (gap, service_time) in enumerate(zip(rng.exponential(1.0, 500), rng.exponential(1.8, 500))):
+      yield env.timeout(gap)
+      env.process(customer(id, service_time))
+  env.process(arrivals())
+  env.run()
+  return log
+
+@pytest.mark.parametrize("seed", [1, 2, 3])
+def test_fixed_window_is_identical_on_both_backends(seed):
+  assert run_fixed_window(kernel, seed) == run_fixed_window(simpy, seed)
+
+@pytest.mark.parametrize("seed", [1, 2])
+def test_resources_serve_in_the_same_order_on_both_backends(seed):
+  assert run_resource(kernel, seed) == run_resource(simpy, seed)
@@ -0,0 +1,75 @@
+import math
+
+import numpy as np
+import pytest
+
+from queueing_sims import limiters
+
+# Limiter arithmetic can land a request a hair before a window boundary.
+TOLERANCE = 1e-9
+
+def admitted_times(limiter, arrivals) -> np.ndarray:
+  """When each request goes, with requests acquired in order the way rate_limited_processor does."""
+  times = np.empty(len(arrivals))
+  ready = 0.0 # The processor takes the next request once the last one went.
+  for index, arrival in enumerate(arrivals.tolist()):
+    now = max(arrival, ready)
+    ready = now + limiter.acquire(now)
+    times[index] = ready
+  return times
+
+def bursty_arrivals(seed: int) -> np.ndarray:
+  """Quiet spells and bursts far over the limit."""
+  rng = np.random.default_rng(seed)
+  gaps = np.where(rng.random(20_000) < 0.5, rng.exponential(0.01, 20_000), rng.exponential(0.5, 20_000))
+  return np.cumsum(gaps)
+
+def most_in_any_window(times: np.ndarray, window_size: float) -> int:
+  """The most requests in any window (t - window_size, t]."""
+  earliest = np.searchsorted(times, times - window_size + TOLERANCE, side="left")
+  return int((np.arange(1, len(times) + 1) - earliest).max())
+
+@pytest.mark.parametrize("name", ["fixed-window", "sliding-window-log", "sliding-window-counter", "leaky-bucket"])
+@pytest.mark.parametrize("max_threshold, window_size", [(10, 1.0), (3, 2.5)])
+def test_admitted_per_window_is_at_most_the_threshold(name, max_threshold, window_size):
+  times = admitted_times(limiters.LIMITERS[name](max_threshold, window_size), bursty_arrivals(max_threshold))
+  assert np.all(np.diff(times) >= 0)
+  windows = np.floor((times + TOLERANCE) / window_size).astype(np.int64)
+  assert np.bincount(windows).max() <= max_threshold
+
+@pytest.mark.parametrize("name", ["sliding-window-log", "leaky-bucket"])
+def test_admitted_per_sliding_window_is_at_most_the_threshold(name):
+  times = admitted_times(limiters.LIMITERS[name](10, 1.0), bursty_arrivals(5))
+  assert most_in_any_window(times, 1.0) <= 10
+
+@pytest.mark.parametrize("burst", [None, 1, 25])
+def test_token_bucket_admits_at_most_a_burst_and_a_window_of_refills(burst):
+  limiter = limiters.TokenBucketLimiter(10, 1.0, burst)
+  times = admitted_times(limiter, bursty_arrivals(6))
+  assert most_in_any_window(times, 1.0) <= limiter.burst + 10
+
+def test_leaky_bucket_spaces_requests_evenly():
+  times = admitted_times(limiters.LeakyBucketLimiter(4, 1.0), bursty_arrivals(7))
+  assert np.diff(times).min() >= 0.25 - TOLERANCE
+
+@pytest.mark.parametrize("name", sorted(limiters.LIMITERS))
+def test_simulate_processes_at_most_what_was_submitted(name):
+  metrics = limiters.simulate(limiters.LIMITERS[name](10, 1.0), 500, 0.08)
+  assert 0 < metrics["requests_processed"] <= metrics["requests_submitted"]
+  # Overloaded, so a limiter that keeps to its rate processes about 10 a tick.
+  assert metrics["requests_processed"] <= 10 * 500 * 1.2
+
+def test_a_limiter_must_allow_a_request():
+  with pytest.raises(ValueError):
+    limiters.FixedWindowLimiter(0, 1.0)
+
+def test_a_limiter_must_implement_acquire():
+  class Incomplete(limiters.RateLimiter):
+    pass
+  with pytest.raises(TypeError):
+    Incomplete(1, 1.0)
+
+def test_fixed_window_waits_for_the_next_window():
+  limiter = limiters.FixedWindowLimiter(2, 1.0)
+  assert [limiter.acquire(0.5), limiter.acquire(0.5)] == [0.0, 0.0]
+  assert math.isclose(limiter.acquire(0.5), 0.5)
@@ -0,0 +1,39 @@
+import numpy as np
+import pytest
+
+from queueing_sims import lindley
+from tests.reference import fifo_start_times
+
+def customers(count: int, seed: int, utilization: float = 0.95) -> tuple:
+  rng = np.random.default_rng(seed)
+  return rng.exponential(1.0, count), rng.exponential(utilization, count)
+
+@pytest.mark.parametrize("seed", [1, 2, 3])
+def test_single_server_queue_matches_the_reference(seed):
+  inter_arrival_times, service_times = customers(5000, seed)
+  expected = fifo_start_times(np.cumsum(inter_arrival_times), service_times, 1)
+
+  waits = lindley.SingleServerQueue().push(inter_arrival_times, service_times)
+
+  np.testing.assert_allclose(waits.stop_wait, expected, rtol=1e-12)
+  np.testing.assert_array_equal(waits.ids, np.arange(1, 5001))
+
+@pytest.mark.parametrize("seed", [1, 2, 3])
+def test_split_batches_match_one_batch(seed):
+  inter_arrival_times, service_times = customers(5000, seed)
+  expected = fifo_start_times(np.cumsum(inter_arrival_times), service_times, 1)
+
+  queue = lindley.SingleServerQueue()
+  cuts = np.sort(np.random.default_rng(seed).choice(np.arange(1, 5000), 20, replace=False))
+  batches = [queue.push(arrivals, services)
+    for arrivals, services in zip(np.split(inter_arrival_times, cuts), np.split(service_times, cuts))]
+
+  np.testing.assert_allclose(np.concatenate([waits.stop_wait for waits in batches]), expected, rtol=1e-12)
+  np.testing.assert_array_equal(np.concatenate([waits.ids for waits in batches]), np.arange(1, 5001))
+  assert queue.customer_counter == 5000
+
+def test_simulate_only_keeps_customers_seen_before_the_end():
+  inter_arrival_times, service_times = lindley.exponential_samples(7, 6, 1000, np.random.default_rng(4))
+  results = lindley.simulate(inter_arrival_times, service_times, 1000)
+  assert (results["P_STOP_WAIT_FOR_NURSE_TIME"] < 1000).all()
+  assert (results["P_TOTAL_WAIT_FOR_NURSE_TIME"] >= 0).all()
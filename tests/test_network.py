@@ -0,0 +1,61 @@
+import numpy as np
+import pytest
+
+from queueing_sims.distributions import Exponential, RandomStreams, Trace
+from queueing_sims.network import Network, Station
+
+from tests.reference import tandem_waits
+
+@pytest.mark.parametrize("seed", [1, 2])
+def test_a_tandem_matches_the_reference(seed):
+  rng = np.random.default_rng(seed)
+  count = 2000
+  gaps = rng.exponential(1.0, count)
+  service_times = [rng.exponential(0.9, count + 1), rng.exponential(1.7, count + 1)]
+  # Served in arrival order at both stations, since the first has one server.
+  network = Network([Station("first", 1, Trace(service_times[0])), Station("second", 2, Trace(service_times[1]))],
+    Trace(np.append(gaps, 1e9)), routing = [[0, 1], [0, 0]])
+  result = network.simulate(1e8, RandomStreams(seed))
+  expected = tandem_waits(np.concatenate(([0.0], gaps)), service_times, [1, 2])
+  assert result.arrived == result.exited == count + 1
+  for stats, waits in zip(result.stations, expected):
+    assert stats.waits.count == count + 1
+    assert stats.waits.mean == pytest.approx(waits.mean())
+    assert stats.waits.max == pytest.approx(waits.max())
+  assert result.waited.mean == pytest.approx((expected[0] + expected[1]).mean())
+
+def test_routing_splits_in_proportion():
+  network = Network([Station("triage", 4, Exponential(1)), Station("a", 4, Exponential(1)),
+    Station("b", 4, Exponential(1))], Exponential(1), routing = [[0, 0.3, 0.7], [0, 0, 0], [0, 0, 0]])
+  result = network.simulate(20_000, RandomStreams(1))
+  arrived = result.station("triage").arrivals
+  assert result.station("a").arrivals + result.station("b").arrivals == pytest.approx(arrived, abs = 10)
+  # Within 4 standard deviations of a binomial count.
+  assert abs(result.station("a").arrivals - 0.3 * arrived) <= 4 * np.sqrt(arrived * 0.3 * 0.7)
+
+def test_feedback_loops_revisit():
+  # Half the patients go back to the nurse, so there are two visits each on average.
+  network = Network([Station("nurse", 5, Exponential(1))], Exponential(1), routing = [[0.5]])
+  result = network.simulate(20_000, RandomStreams(2))
+  assert result.station("nurse").arrivals / result.arrived == pytest.approx(2, rel = 0.05)
+
+def test_utilization_matches_the_offered_load():
+  network = Network([Station("server", 2, Exponential(1.5))], Exponential(1), routing = [[0]])
+  result = network.simulate(50_000, RandomStreams(3))
+  assert result.station("server").utilization == pytest.approx(0.75, rel = 0.03)
+
+def test_runs_are_reproducible():
+  network = Network([Station("server", 1, Exponential(0.5))], Exponential(1), routing = [[0]])
+  first, second = (network.simulate(1000, RandomStreams(4)) for _ in range(2))
+  assert (first.exited, first.waited.mean) == (second.exited, second.waited.mean)
+
+@pytest.mark.parametrize("stations, routing", [
+  ([], []),
+  ([Station("a", 1, Exponential(1)), Station("a", 1, Exponential(1))], [[0, 0], [0, 0]]),
+  ([Station("a", 0, Exponential(1))], [[0]]),
+  ([Station("a", 1, Exponential(1))], [[0, 0]]),
+  ([Station("a", 1, Exponential(1)), Station("b", 1, Exponential(1))], [[0.6, 0.6], [0, 0]]),
+])
+def test_malformed_networks_are_rejected(stations, routing):
+  with pytest.raises(ValueError):
+    Network(stations, Exponential(1), routing)
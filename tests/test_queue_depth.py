@@ -0,0 +1,77 @@
+import numpy as np
+import pytest
+import simpy
+
+from queueing_sims.queue_depth import track
+
+def run_store(until: float = 10):
+  """Depth 0 for 1 tick, 1 for 1 tick, 2 for 2 ticks, then 0 until the end."""
+  env = simpy.Environment()
+  store = simpy.Store(env)
+  tracker = track(store, resolution = 1, history = 100)
+  def schedule():
+    yield env.timeout(1)
+    yield store.put("a")
+    yield env.timeout(1)
+    yield store.put("b")
+    yield env.timeout(2)
+    yield store.get()
+    yield store.get()
+  env.process(schedule())
+  env.run(until = until)
+  return tracker
+
+def test_time_weighted_mean_and_max():
+  tracker = run_store()
+  assert tracker.time_weighted_mean == pytest.approx((1 * 1 + 2 * 2) / 10)
+  assert tracker.max_depth == 2
+  assert tracker.depth == 0
+
+@pytest.mark.parametrize("percent, expected", [(50, 0), (70, 0), (75, 1), (80, 1), (95, 2), (100, 2)])
+def test_percentile_is_the_smallest_depth_covering_percent_of_the_time(percent, expected):
+  depth = run_store().percentile(percent)
+  assert depth == expected and isinstance(depth, int)
+
+def test_percentile_before_any_time_has_passed():
+  env = simpy.Environment()
+  store = simpy.Store(env)
+  tracker = track(store)
+  store.put("a")
+  assert tracker.percentile(50) == 1
+
+def test_series_has_a_bucket_per_resolution():
+  # The last bucket is the partial current one.
+  series = run_store(until = 9.5).series()
+  np.testing.assert_array_equal(series.starts, np.arange(10))
+  np.testing.assert_allclose(series.means, [0, 1, 2, 2, 0, 0, 0, 0, 0, 0])
+  np.testing.assert_array_equal(series.maxs[:5], [0, 1, 2, 2, 2])
+
+def test_the_ring_buffer_keeps_the_latest_buckets():
+  env = simpy.Environment()
+  store = simpy.Store(env)
+  tracker = track(store, resolution = 1, history = 4)
+  def schedule():
+    for _ in range(10):
+      yield store.put("item")
+      yield env.timeout(1)
+  env.process(schedule())
+  env.run(until = 10)
+  series = tracker.series()
+  # The three latest finished buckets and the current one.
+  np.testing.assert_array_equal(series.starts, [7, 8, 9, 10])
+  np.testing.assert_allclose(series.means, [8, 9, 10, 10])
+
+def test_resource_depth_counts_waiting_requests():
+  env = simpy.Environment()
+  servers = simpy.Resource(env, capacity = 1)
+  tracker = track(servers)
+  def customer():
+    with servers.request() as request:
+      yield request
+      yield env.timeout(1)
+  for _ in range(3):
+    env.process(customer())
+  env.run()
+  # Two wait for 1 tick, then one waits for 1 tick, then nobody waits for 1 tick.
+  assert tracker.max_depth == 2
+  assert tracker.time_weighted_mean == pytest.approx((2 + 1 + 0) / 3)
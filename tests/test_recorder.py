@@ -0,0 +1,50 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from queueing_sims.recorder import Recorder
+
+FIELDS = {"P_ID": np.int64, "WAIT": np.float64}
+
+def test_appended_rows_survive_growing():
+  recorder = Recorder(FIELDS, index = "P_ID", capacity = 2)
+  for p_id in range(1, 101):
+    recorder.append(p_id, p_id / 2)
+  assert len(recorder) == 100
+  np.testing.assert_array_equal(recorder.column("P_ID"), np.arange(1, 101))
+  assert recorder.total("WAIT") == pytest.approx(np.arange(1, 101).sum() / 2)
+  assert recorder.mean("WAIT") == pytest.approx(25.25)
+
+def test_extend_matches_append():
+  appended = Recorder(FIELDS, capacity = 1)
+  extended = Recorder(FIELDS, capacity = 1)
+  waits = np.random.default_rng(1).exponential(3.0, 500)
+  for p_id, wait in enumerate(waits):
+    appended.append(p_id, wait)
+  extended.extend(P_ID = np.arange(250), WAIT = waits[:250])
+  extended.extend(WAIT = waits[250:], P_ID = np.arange(250, 500))
+  pd.testing.assert_frame_equal(appended.to_frame(), extended.to_frame())
+  assert extended.mean("WAIT") == pytest.approx(waits.mean())
+
+def test_the_frame_is_indexed_and_shares_memory():
+  recorder = Recorder(FIELDS, index = "P_ID")
+  recorder.append(7, 1.5)
+  recorder.append(9, 2.5)
+  frame = recorder.to_frame()
+  assert frame.index.name == "P_ID" and frame.index.tolist() == [7, 9]
+  assert list(frame.columns) == ["WAIT"]
+  assert np.shares_memory(frame["WAIT"].to_numpy(), recorder.column("WAIT"))
+
+def test_an_empty_recorder_has_no_mean():
+  assert np.isnan(Recorder(FIELDS).mean("WAIT"))
+
+def test_rows_must_be_complete():
+  recorder = Recorder(FIELDS)
+  with pytest.raises(ValueError):
+    recorder.append(1)
+  with pytest.raises(ValueError):
+    recorder.extend(P_ID = [1, 2])
+  with pytest.raises(ValueError):
+    recorder.extend(P_ID = [1, 2], WAIT = [1.0])
+  with pytest.raises(ValueError):
+    Recorder(FIELDS, index = "MISSING")
@@ -0,0 +1,77 @@
+import random
+
+import numpy as np
+import pytest
+
+from queueing_sims.streaming_stats import QuantileSketch, Reservoir, RunningStats, StreamingMetric
+
+def values(seed: int, count: int = 10_000) -> np.ndarray:
+  rng = np.random.default_rng(seed)
+  return np.concatenate((rng.exponential(2.0, count // 2), rng.normal(-5.0, 3.0, count // 2)))
+
+@pytest.mark.parametrize("seed", [1, 2])
+def test_running_stats_match_numpy(seed):
+  data = values(seed)
+  one_at_a_time = RunningStats()
+  for value in data.tolist():
+    one_at_a_time.add(value)
+  # Merged from uneven chunks, some empty, some added one at a time.
+  merged = RunningStats()
+  for chunk in np.split(data, [0, 1, 7, 7, 4000, 9999]):
+    part = RunningStats()
+    if len(chunk) == 1:
+      part.add(float(chunk[0]))
+    else:
+      part.extend(chunk)
+    merged.merge(part)
+  for stats in (one_at_a_time, merged):
+    assert stats.count == len(data)
+    assert stats.mean == pytest.approx(data.mean(), rel = 1e-12)
+    assert stats.variance == pytest.approx(data.var(ddof = 1), rel = 1e-10)
+    assert (stats.min, stats.max) == (data.min(), data.max())
+
+def test_running_stats_of_one_value_have_no_variance():
+  stats = RunningStats()
+  stats.add(3.0)
+  assert np.isnan(stats.variance) and np.isnan(stats.stdev)
+
+@pytest.mark.parametrize("q", [0, 0.01, 0.25, 0.5, 0.9, 0.99, 1])
+def test_quantiles_are_within_the_relative_accuracy(q):
+  data = values(3)
+  sketch = QuantileSketch(0.01)
+  sketch.extend(data[:6000])
+  for value in data[6000:].tolist():
+    sketch.add(value)
+  exact = np.quantile(data, q, method = "lower")
+  assert abs(sketch.quantile(q) - exact) <= 0.01 * abs(exact)
+
+def test_merged_sketches_match_one_sketch():
+  data = values(4)
+  whole = QuantileSketch()
+  whole.extend(data)
+  merged = QuantileSketch()
+  for chunk in np.array_split(data, 3):
+    part = QuantileSketch()
+    part.extend(chunk)
+    merged.merge(part)
+  assert [merged.quantile(q) for q in (0.1, 0.5, 0.9)] == [whole.quantile(q) for q in (0.1, 0.5, 0.9)]
+  with pytest.raises(ValueError):
+    merged.merge(QuantileSketch(0.05))
+
+def test_the_reservoir_keeps_everything_until_it_is_full():
+  reservoir = Reservoir(5, random.Random(1))
+  reservoir.extend(np.arange(3.0))
+  assert reservoir.values == [0.0, 1.0, 2.0]
+  reservoir.extend(np.arange(3.0, 1000.0))
+  assert reservoir.seen == 1000 and len(reservoir.values) == 5
+  assert set(reservoir.values) <= set(np.arange(1000.0).tolist())
+
+def test_percentiles_are_clamped_to_the_observed_range():
+  metric = StreamingMetric(reservoir_size = 10)
+  metric.extend([2.5, 2.5])
+  # The sketch's bucket for 2.5 is only near it, but there's nothing else.
+  assert metric.percentile(0) == metric.percentile(100) == 2.5
+  metric.add(3.0)
+  assert len(metric) == 3 and metric.mean == pytest.approx(8 / 3)
+  assert metric.sample == [2.5, 2.5, 3.0]
+  assert np.isnan(StreamingMetric().mean)
@@ -0,0 +1,66 @@
+from typing import NamedTuple
+
+import numpy as np
+import pytest
+
+from queueing_sims import fixed_window
+from queueing_sims.arrivals import PiecewiseRate
+from queueing_sims.sweeps import ResultCache, model_version, package_dependencies, scenario_key, sweep
+
+class Parameters(NamedTuple):
+  servers: int = 1
+  arrivals: object = 5.0
+
+class RunResult(NamedTuple):
+  run: int
+  servers: int
+  draw: float
+
+def run_model(run, rng, parameters) -> RunResult:
+  return RunResult(run, parameters.servers, float(rng.random()))
+
+def test_the_version_covers_the_package_modules_the_model_uses():
+  dependencies = package_dependencies(fixed_window.run_model.__globals__)
+  # Imported by fixed_window directly, and through batch_means.
+  assert {"queueing_sims.distributions", "queueing_sims.warmup"} <= set(dependencies)
+  # Not used by the model, so editing them keeps its cached results.
+  assert "queueing_sims.sweeps" not in dependencies
+  assert "queueing_sims.network" not in dependencies
+
+def test_the_version_is_stable():
+  assert model_version(fixed_window.run_model) == model_version(fixed_window.run_model)
+  assert model_version(fixed_window.run_model) != model_version(run_model)
+
+def test_parameters_are_keyed_by_value():
+  first = Parameters(arrivals = PiecewiseRate([0, 60], [1, 10]))
+  second = Parameters(arrivals = PiecewiseRate([0.0, 60.0], [1.0, 10.0]))
+  assert scenario_key("v", first, 42, 1) == scenario_key("v", second, 42, 1)
+  assert scenario_key("v", first, 42, 1) != scenario_key("v", Parameters(arrivals = PiecewiseRate([0, 60], [1, 11])),
+    42, 1)
+  assert scenario_key("v", first, 42, 1) != scenario_key("v", first, 42, 2)
+  assert scenario_key("v", first, 42, 1) != scenario_key("w", first, 42, 1)
+
+def test_parameters_without_a_stable_form_are_rejected():
+  with pytest.raises(TypeError):
+    scenario_key("v", Parameters(arrivals = object()), 42, 1)
+
+def test_the_cache_round_trips_results(tmp_path):
+  cache = ResultCache(tmp_path)
+  result = RunResult(3, 2, 0.25)
+  assert cache.load("ab" * 32, RunResult) is None
+  cache.save("ab" * 32, result)
+  assert cache.load("ab" * 32, RunResult) == result
+
+def test_a_sweep_only_runs_new_points(tmp_path):
+  first = sweep(run_model, Parameters(), {"servers": [1, 2]}, 3, 42, cache_dir = tmp_path, max_workers = 1)
+  assert len(first) == 6 and not first["cached"].any()
+
+  second = sweep(run_model, Parameters(), {"servers": [1, 2, 3]}, 3, 42, cache_dir = tmp_path, max_workers = 1)
+  assert second["cached"].tolist() == [True] * 6 + [False] * 3
+  np.testing.assert_array_equal(second["draw"][:6], first["draw"])
+  # Every point sees the same seeds, so the draws repeat across points.
+  np.testing.assert_array_equal(second["draw"][6:], first["draw"][:3])
+
+def test_a_sweep_needs_a_seed(tmp_path):
+  with pytest.raises(ValueError):
+    sweep(run_model, Parameters(), {"servers": [1]}, 1, None, cache_dir = tmp_path)
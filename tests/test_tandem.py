@@ -0,0 +1,44 @@
+import numpy as np
+import pytest
+
+from queueing_sims import tandem
+from tests.reference import fifo_start_times, tandem_waits
+
+def busy_station(count: int, capacity: int, seed: int) -> tuple:
+  """Arrivals that keep capacity servers about 95% busy, and their service times."""
+  rng = np.random.default_rng(seed)
+  arrivals = np.cumsum(rng.exponential(1.0 / capacity, count))
+  return arrivals, rng.exponential(0.95, count)
+
+@pytest.mark.parametrize("capacity", [1, 5, tandem.SORTED_ARRAY_MIN_CAPACITY - 1,
+                                      tandem.SORTED_ARRAY_MIN_CAPACITY, 300])
+def test_station_matches_the_reference(capacity):
+  arrivals, service_times = busy_station(20_000, capacity, capacity)
+  starts = tandem.Station("nurses", capacity).push(arrivals, service_times)
+  np.testing.assert_allclose(starts, fifo_start_times(arrivals, service_times, capacity), rtol=1e-12)
+
+@pytest.mark.parametrize("capacity", [1, 5, 200])
+def test_split_batches_match_one_batch(capacity):
+  arrivals, service_times = busy_station(20_000, capacity, capacity + 1)
+  station = tandem.Station("nurses", capacity)
+  cuts = np.sort(np.random.default_rng(capacity).choice(np.arange(1, 20_000), 30, replace=False))
+  starts = np.concatenate([station.push(batch_arrivals, batch_service_times)
+    for batch_arrivals, batch_service_times in zip(np.split(arrivals, cuts), np.split(service_times, cuts))])
+  np.testing.assert_allclose(starts, fifo_start_times(arrivals, service_times, capacity), rtol=1e-12)
+
+@pytest.mark.parametrize("capacities", [[1, 1], [3, 7], [150, 300], [200, 1]])
+def test_simulate_matches_the_reference(capacities):
+  rng = np.random.default_rng(sum(capacities))
+  count = 10_000
+  inter_arrival_times = rng.exponential(1.0 / min(capacities), count)
+  service_times = [rng.exponential(0.9, count) for _ in capacities]
+
+  result = tandem.simulate(inter_arrival_times, service_times, capacities)
+
+  assert result.stations == ["station 1", "station 2"]
+  for waits, expected in zip(result.waits, tandem_waits(inter_arrival_times, service_times, capacities)):
+    np.testing.assert_allclose(waits.total_wait, expected, rtol=1e-9, atol=1e-9)
+
+def test_station_needs_a_server():
+  with pytest.raises(ValueError):
+    tandem.Station("nobody", 0)
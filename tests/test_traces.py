@@ -0,0 +1,64 @@
+import numpy as np
+import pytest
+
+from queueing_sims.distributions import Exponential, RandomStreams, TraceExhausted
+from queueing_sims.traces import TraceRecorder, inter_arrival_times, read_trace, write_trace
+
+def test_write_and_read_round_trip(tmp_path):
+  path = tmp_path / "incident.trace"
+  columns = {
+    "arrivals": np.random.default_rng(1).exponential(5, 10_000),
+    "consultation": np.array([1.5, 2.5, np.inf]),
+    "empty": np.empty(0)
+  }
+  write_trace(path, columns, {"source": "test"})
+
+  metadata, read = read_trace(path)
+
+  assert metadata == {"source": "test"}
+  assert list(read) == list(columns)
+  for name, values in columns.items():
+    np.testing.assert_array_equal(read[name], values)
+  assert isinstance(read["arrivals"], np.memmap)
+
+def test_an_empty_trace_round_trips(tmp_path):
+  path = tmp_path / "empty.trace"
+  write_trace(path, {"arrivals": []})
+  _, read = read_trace(path)
+  assert len(read["arrivals"]) == 0
+
+def test_only_traces_are_read(tmp_path):
+  path = tmp_path / "not.trace"
+  path.write_bytes(b"something else entirely")
+  with pytest.raises(ValueError):
+    read_trace(path)
+
+def test_inter_arrival_times():
+  np.testing.assert_array_equal(inter_arrival_times([3.0, 4.0, 6.5]), [1.0, 2.5])
+
+def test_a_recorded_run_replays_exactly(tmp_path):
+  path = tmp_path / "run.trace"
+  recorded = RandomStreams(7, recorder = TraceRecorder(path, {"seed": 7}))
+  arrivals = recorded.add("arrivals", Exponential(5), block_size = 64)
+  consultations = recorded.add("consultation", Exponential(6), block_size = 64)
+  drawn = [arrivals.sample() for _ in range(100)]
+  consulted = consultations.take(30).tolist()
+  recorded.close()
+
+  metadata, columns = read_trace(path)
+  assert metadata == {"seed": 7}
+  # Only what was handed out is kept, not the rest of the last block.
+  assert len(columns["arrivals"]) == 100
+  assert len(columns["consultation"]) == 30
+
+  replayed = RandomStreams(trace = columns)
+  arrivals = replayed.add("arrivals", Exponential(5))
+  assert [arrivals.sample() for _ in range(100)] == drawn
+  assert replayed.add("consultation", Exponential(6)).take(50).tolist() == consulted
+
+def test_an_exhausted_trace_keeps_raising():
+  arrivals = RandomStreams(trace = {"arrivals": [1.0, 2.0]}).add("arrivals", Exponential(5), block_size = 1)
+  assert arrivals.take(5).tolist() == [1.0, 2.0]
+  for _ in range(3):
+    with pytest.raises(TraceExhausted):
+      arrivals.sample()
@@ -0,0 +1,27 @@
+import numpy as np
+import pytest
+
+from queueing_sims.warmup import mser
+from tests.reference import MEAN, autocorrelated, with_transient
+
+@pytest.mark.parametrize("seed", [1, 2, 3])
+def test_mser_cuts_the_transient(seed):
+  values = with_transient(autocorrelated(40_000, seed, correlation = 0.5), 1000)
+  truncation = mser(values, times = np.arange(len(values)) * 0.5)
+  assert truncation.reliable
+  assert 500 <= truncation.index <= 1500
+  assert truncation.index % truncation.batch_size == 0
+  assert truncation.time == truncation.index * 0.5
+  assert truncation.observations == len(values) - truncation.index
+  assert abs(truncation.mean - MEAN) < 0.05
+  assert abs(truncation.mean - MEAN) < abs(values.mean() - MEAN)
+
+def test_mser_flags_a_series_that_never_settles():
+  truncation = mser(np.linspace(0, 100, 1000) ** 2)
+  assert not truncation.reliable
+  assert truncation.index <= 500
+
+def test_mser_on_nothing():
+  truncation = mser([])
+  assert truncation.observations == 0
+  assert not truncation.reliable